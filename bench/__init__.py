@@ -0,0 +1,6 @@
+"""
+Benchmarks of the performance-sensitive parts of the project.
+
+Every module is a standalone script, run it from the repository's root:
+`python -m bench.<module>`
+"""
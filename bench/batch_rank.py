@@ -0,0 +1,68 @@
+"""
+Ranking candidates one by one with `Knowledge.rank` versus all at once with
+`BatchRanker`.
+
+The cold batch has to compile its weights first, as it does whenever the
+knowledge has changed since the last call (for an agent, after almost every
+turn), the warm one reuses them. The speedup is the cold batch's.
+
+`python -m bench.batch_rank`
+"""
+
+from random import Random
+from time import perf_counter
+
+from client.ai.batch import BatchRanker
+from client.ai.knowledge import Knowledge
+
+CANDIDATE_COUNTS = (10, 100, 1000, 10000)
+VOCABULARY = 40
+LEARNED = 300
+REPEATS = 5
+
+class Object:
+    def __init__(self, traits):
+        self.traits = traits
+
+def best_of(function):
+    best = None
+    for _ in range(REPEATS):
+        start = perf_counter()
+        function()
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    random = Random(0)
+    names = [f"trait{i}" for i in range(VOCABULARY)]
+
+    knowledge = Knowledge()
+    for _ in range(LEARNED):
+        traits = random.sample(names, random.randint(2, 6))
+        knowledge.learn(Object(traits), random.uniform(-10, 10))
+
+    print(f"{'candidates':>10} {'per object [ms]':>16} {'batch [ms]':>11} {'cold batch [ms]':>16} {'speedup':>8}")
+    for n in CANDIDATE_COUNTS:
+        candidates = [
+            Object(random.sample(names, random.randint(3, 6))) for _ in range(n)
+        ]
+
+        def per_object():
+            sorted(
+                candidates,
+                key=lambda c: knowledge.rank(c.traits),
+                reverse=True
+            )
+
+        cold = best_of(lambda: BatchRanker(knowledge).rank(candidates))
+
+        ranker = BatchRanker(knowledge)
+        batch = best_of(lambda: ranker.rank(candidates))
+        single = best_of(per_object)
+
+        print(f"{n:>10} {single*1000:>16.3f} {batch*1000:>11.3f} {cold*1000:>16.3f} {single/cold:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Broadcasting a world to many clients, encoding it for every client (the way
+`ServerNetwork.broadcast` used to) versus once per codec (`broadcast` and
+`flush`).
+
+Only the server's side of the work is measured: encoding and queueing the
+data for every client's sender.
+
+`python -m bench.broadcast`
+"""
+
+import asyncio
+from random import Random
+from time import perf_counter
+
+from server.net.network import Client, ServerNetwork
+from shared.net.codec import BinaryCodec, JsonCodec
+from shared.net.cave_world_protocol import world
+from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+from shared.packing import pack_world
+
+CLIENT_COUNTS = (1, 10, 100, 1000)
+WORLD_SIZE = 64
+REPEATS = 3
+
+class Tile:
+    def __init__(self, type, z):
+        self.type = type
+        self.z = z
+        self.object = None
+
+class World:
+    def __init__(self, random, size):
+        self.w = size
+        self.h = size
+        self.data = [
+            [Tile(random.randint(0, 2), float(random.randint(-8, 8))) for _ in range(size)]
+            for _ in range(size)
+        ]
+
+def best_of(function, network):
+    best = None
+    for _ in range(REPEATS):
+        start = perf_counter()
+        function()
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+        for client in network.clients.values():
+            client.send_queue.items.clear()
+    return best
+
+def per_client(network, message):
+    for client in network.clients.values():
+        client._send_data(client.codec.encode(message))
+
+def encode_once(network, message):
+    network.broadcast(message)
+    network.flush()
+
+async def run():
+    protocol = CaveWorldProtocol()
+    message = world.PackedDataResponse(version=0, **pack_world(World(Random(0), WORLD_SIZE)))
+
+    print(f"World of {WORLD_SIZE}x{WORLD_SIZE}, every 10th client using JSON")
+    print(f"{'clients':>8} {'per client [ms]':>16} {'encode once [ms]':>17} {'speedup':>8}")
+    for count in CLIENT_COUNTS:
+        network = ServerNetwork(protocol)
+        network.clients = {
+            i: Client(i, None, JsonCodec(protocol) if i % 10 == 9 else BinaryCodec(protocol))
+            for i in range(count)
+        }
+
+        before = best_of(lambda: per_client(network, message), network)
+        after = best_of(lambda: encode_once(network, message), network)
+        print(f"{count:>8} {before*1000:>16.2f} {after*1000:>17.2f} {before/after:>7.1f}x")
+
+def main():
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
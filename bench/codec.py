@@ -0,0 +1,132 @@
+"""
+Size of the encoded messages and the time of encoding and decoding them with
+the `JsonCodec` and the `BinaryCodec`, per message type.
+
+`python -m bench.codec`
+"""
+
+from random import Random
+from time import perf_counter
+
+from shared.net.codec import BinaryCodec, JsonCodec
+from shared.net.cave_world_protocol import actor, client, world
+from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+from shared.packing import PackedWorld, pack_world
+
+REPEATS = 5
+TRAITS = ("fruit", "red", "green", "small", "big", "round", "stone", "sweet")
+
+def best_of(function, count):
+    best = None
+    for _ in range(REPEATS):
+        start = perf_counter()
+        for _ in range(count):
+            function()
+        elapsed = (perf_counter() - start) / count
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def prepare_turn_request(random, sensations):
+    def sense():
+        return [
+            {
+                "traits": random.sample(TRAITS, random.randint(1, 4)),
+                "x": random.randint(-100, 100),
+                "y": random.randint(-100, 100),
+            }
+            for _ in range(sensations)
+        ]
+
+    return actor.PrepareTurnRequest(actor={
+        "type": "caveman",
+        "x": 10,
+        "y": 20,
+        "senses": {"sight": sense(), "hearing": [], "smell": sense()},
+        "condition": {
+            "hunger": 10.0, "thirst": 0.0, "temperature": 36.6, "health": 100.0
+        },
+    })
+
+def data_response(random, size):
+    return world.DataResponse(
+        width=size,
+        height=size,
+        tiles=[
+            [
+                {
+                    "type": random.randint(0, 2),
+                    "z": random.uniform(-5, 5),
+                    "object": {"repr": "stone"} if random.random() < 0.05 else None,
+                }
+                for _ in range(size)
+            ]
+            for _ in range(size)
+        ]
+    )
+
+class Tile:
+    def __init__(self, type, z, object):
+        self.type = type
+        self.z = z
+        self.object = object
+
+class Object:
+    def __init__(self, representation):
+        self._representation = representation
+
+    def representation(self):
+        return self._representation
+
+class World:
+    """
+    The server's world of the same tiles as the `DataResponse`.
+    """
+    def __init__(self, response):
+        self.w = response.width
+        self.h = response.height
+        self.data = [
+            [
+                Tile(t.type, t.z, t.object and Object(t.object.repr))
+                for t in column
+            ]
+            for column in response.tiles
+        ]
+
+def packed_data_response(response):
+    return world.PackedDataResponse(version=0, **pack_world(World(response)))
+
+def main():
+    random = Random(0)
+    protocol = CaveWorldProtocol()
+    codecs = (JsonCodec(protocol), BinaryCodec(protocol))
+
+    cases = [
+        ("TurnRequest", actor.TurnRequest(action={"type": "move", "dx": 1, "dy": 0}), 2000),
+        ("TurnResult", actor.TurnResult(success=True, error=None), 2000),
+        ("Introduction", client.Introduction(name="caveman"), 2000),
+        ("PrepareTurnRequest (10)", prepare_turn_request(random, 10), 500),
+        ("PrepareTurnRequest (100)", prepare_turn_request(random, 100), 50),
+        ("DataResponse (32x32)", data_response(random, 32), 10),
+        ("DataResponse (128x128)", data_response(random, 128), 1),
+    ]
+    cases += [
+        (f"Packed{name}", packed_data_response(message), count * 10)
+        for name, message, count in cases[-2:]
+    ]
+
+    print(f"{'message':>30} {'codec':>17} {'bytes':>9} {'encode [us]':>12} {'decode [us]':>12}")
+    for name, message, count in cases:
+        for codec in codecs:
+            data = codec.encode(message)
+            size = len(data.encode() if isinstance(data, str) else data)
+            encode = best_of(lambda: codec.encode(message), count)
+            if isinstance(message, world.PackedDataResponse):
+                # Including the decoding into arrays
+                decode = best_of(lambda: PackedWorld.from_message(codec.decode(data)), count)
+            else:
+                decode = best_of(lambda: codec.decode(data), count)
+            print(f"{name:>30} {codec.name:>17} {size:>9} {encode*1e6:>12.1f} {decode*1e6:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Compression ratio and CPU time of the `ZlibCodec` per message type and
+compression level, for tuning `ZlibCodec.THRESHOLD` and `ZlibCodec.LEVEL`.
+
+`python -m bench.compression`
+"""
+
+from random import Random
+from time import perf_counter
+import zlib
+
+from bench.codec import data_response, packed_data_response, prepare_turn_request
+from shared.net.codec import BinaryCodec, JsonCodec
+from shared.net.cave_world_protocol import actor
+from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+
+LEVELS = (1, 6, 9)
+REPEATS = 5
+
+def best_of(function, count):
+    best = None
+    for _ in range(REPEATS):
+        start = perf_counter()
+        for _ in range(count):
+            function()
+        elapsed = (perf_counter() - start) / count
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    random = Random(0)
+    protocol = CaveWorldProtocol()
+    codecs = (JsonCodec(protocol), BinaryCodec(protocol))
+
+    cases = [
+        ("TurnResult", actor.TurnResult(success=False, error="The target tile is occupied")),
+        ("PrepareTurnRequest (10)", prepare_turn_request(random, 10)),
+        ("PrepareTurnRequest (100)", prepare_turn_request(random, 100)),
+        ("PackedDataResponse (64x64)", packed_data_response(data_response(random, 64))),
+    ]
+
+    print(f"{'message':>26} {'codec':>17} {'level':>5} {'bytes':>8} {'ratio':>6} "
+          f"{'compress [us]':>14} {'decompress [us]':>16}")
+    for name, message in cases:
+        for codec in codecs:
+            data = codec.encode(message)
+            raw = data.encode() if codec.text else data
+            count = max(1, 200000 // len(raw))
+
+            for level in LEVELS:
+                compressed = zlib.compress(raw, level)
+                compress = best_of(lambda: zlib.compress(raw, level), count)
+                decompress = best_of(lambda: zlib.decompress(compressed), count)
+                print(f"{name:>26} {codec.name:>17} {level:>5} {len(raw):>8} "
+                      f"{len(compressed)/len(raw):>6.2f} {compress*1e6:>14.1f} {decompress*1e6:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cost of `Knowledge.learn` and `Knowledge.rank` versus the number of traits
+of the learned objects, for various bounds of the learned subsets' order,
+and the cost of `Knowledge.rank` versus the amount of learned objects.
+
+`python -m bench.knowledge`
+"""
+
+from random import Random
+from time import perf_counter
+
+from client.ai.knowledge import Knowledge
+
+TRAIT_COUNTS = (2, 4, 8, 12, 16, 20)
+MAX_ORDERS = (None, 1, 2, 3)
+"""
+Learning every subset of more traits than this takes way too long.
+"""
+UNBOUNDED_LIMIT = 16
+
+LEARNED_COUNTS = (100, 1000, 10000, 50000)
+VOCABULARY = 200
+QUERIES = 1000
+
+class Object:
+    def __init__(self, traits):
+        self.traits = traits
+
+def measure(max_order, n):
+    knowledge = Knowledge(max_order=max_order)
+    traits = [f"trait{i}" for i in range(n)]
+
+    start = perf_counter()
+    knowledge.learn(Object(traits), 1.0)
+    learn = perf_counter() - start
+
+    start = perf_counter()
+    knowledge.rank(traits)
+    rank = perf_counter() - start
+
+    return learn, rank, len(knowledge)
+
+def measure_memory(learned):
+    random = Random(0)
+    names = [f"trait{i}" for i in range(VOCABULARY)]
+    knowledge = Knowledge()
+
+    for _ in range(learned):
+        traits = random.sample(names, random.randint(2, 8))
+        knowledge.learn(Object(traits), random.uniform(-10, 10))
+
+    queries = [random.sample(names, 6) for _ in range(QUERIES)]
+    start = perf_counter()
+    for traits in queries:
+        knowledge.rank(traits)
+    rank = (perf_counter() - start) / QUERIES
+
+    return rank, len(knowledge)
+
+def main():
+    print(f"{'max_order':>9} {'traits':>6} {'entries':>9} {'learn [ms]':>11} {'rank [ms]':>10}")
+    for max_order in MAX_ORDERS:
+        for n in TRAIT_COUNTS:
+            if max_order is None and n > UNBOUNDED_LIMIT:
+                continue
+
+            learn, rank, entries = measure(max_order, n)
+            print(f"{str(max_order):>9} {n:>6} {entries:>9} {learn*1000:>11.3f} {rank*1000:>10.3f}")
+
+    print()
+    print(f"{'learned':>9} {'entries':>9} {'rank [ms]':>10}")
+    for learned in LEARNED_COUNTS:
+        rank, entries = measure_memory(learned)
+        print(f"{learned:>9} {entries:>9} {rank*1000:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Throughput of validating the received messages (`Model.load`), the way they
+are constructed from the decoded dicts, compared to the trusted construction
+of the locally produced ones (`Model.trusted`), and of encoding them as JSON
+through `as_dict` compared to serializing the trusted ones directly, per
+message type. Then the throughput of `Model.as_dict` itself.
+
+`python -m bench.model`
+"""
+
+from random import Random
+import json
+
+from bench.codec import best_of, data_response, prepare_turn_request
+from shared.net.codec import JsonCodec
+from shared.net.cave_world_protocol import actor, world
+from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+
+def delta(random, count):
+    return world.Delta(base=0, version=1, tiles=[
+        {
+            "x": random.randint(0, 127),
+            "y": random.randint(0, 127),
+            "type": random.randint(0, 2),
+            "z": random.uniform(-5, 5),
+            "object": {"repr": "stone"} if random.random() < 0.05 else None,
+        }
+        for _ in range(count)
+    ])
+
+def main():
+    random = Random(0)
+    cases = [
+        ("TurnResult", actor.TurnResult(success=False, error="The target tile is occupied")),
+        ("PrepareTurnRequest (10)", prepare_turn_request(random, 10)),
+        ("PrepareTurnRequest (100)", prepare_turn_request(random, 100)),
+        ("Delta (100)", delta(random, 100)),
+        ("DataResponse (64x64)", data_response(random, 64)),
+    ]
+
+    protocol = CaveWorldProtocol()
+    codec = JsonCodec(protocol)
+
+    print(f"{'message':>26} {'load [us]':>12} {'messages/s':>12} {'trusted [us]':>13} "
+          f"{'as_dict json [us]':>18} {'trusted json [us]':>18}")
+    for name, message in cases:
+        message_class = message.__class__
+        d = message.as_dict()
+        count = max(1, 20000 // len(repr(d)) * 10)
+
+        load = best_of(lambda: message_class(d), count)
+        trusted = best_of(lambda: message_class.trusted(d), count)
+        as_dict = best_of(lambda: json.dumps(protocol.wrap(message), default=codec.default), count)
+        trusted_message = message_class.trusted(d)
+        direct = best_of(lambda: codec.encode(trusted_message), count)
+        print(f"{name:>26} {load*1e6:>12.1f} {1/load:>12.0f} {trusted*1e6:>13.1f} "
+              f"{as_dict*1e6:>18.1f} {direct*1e6:>18.1f}")
+
+    print()
+    print(f"{'message':>26} {'as_dict [us]':>13} {'messages/s':>12}")
+    for name, message in cases:
+        count = max(1, 20000 // len(repr(message.as_dict())) * 10)
+        elapsed = best_of(message.as_dict, count)
+        print(f"{name:>26} {elapsed*1e6:>13.1f} {1/elapsed:>12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Decision making of the client's agents: learning what the sensed objects are
+worth and choosing what to do about them.
+"""
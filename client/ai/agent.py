@@ -0,0 +1,131 @@
+"""
+A simple agent which decides about its actor's turns from what it senses.
+
+The agent eats the best ranked objects (walking towards them when they are
+too far away) and learns how satisfying they were from the change of its
+actor's condition in the next turn.
+"""
+
+from random import Random
+
+from client.ai.knowledge import Knowledge
+from shared import rules
+from shared.net.cave_world_protocol import actor as protocol
+
+class Sensed:
+    """
+    An object sensed at a position, with traits of all the senses merged.
+    """
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.traits = set()
+
+    def __repr__(self):
+        return f"Sensed({self.x}, {self.y}, {sorted(self.traits)})"
+
+def sensed_objects(senses):
+    """
+    Merges the sensations of all the senses (the protocol's `Senses`) into
+    a list of `Sensed` objects.
+    """
+    objects = {}
+    for sensations in (senses.sight, senses.hearing, senses.smell):
+        for sensation in sensations:
+            position = (sensation.x, sensation.y)
+            if position not in objects:
+                objects[position] = Sensed(*position)
+            objects[position].traits.update(sensation.traits)
+
+    return list(objects.values())
+
+def step_towards(x, y, target_x, target_y):
+    """
+    Returns the direction of the first step on the straight line towards
+    the target.
+    """
+    def sign(v):
+        return (v > 0) - (v < 0)
+    return sign(target_x - x), sign(target_y - y)
+
+class Agent:
+    """
+    Decides about the actions of a single actor.
+    """
+    def __init__(self, knowledge=None, random=None):
+        self.knowledge = knowledge if knowledge is not None else Knowledge()
+        self.random = random or Random()
+
+        self.condition = None
+        self.eaten = None
+
+    def experience(self, condition):
+        """
+        Learns the satisfaction of the last eaten object from the change of
+        the condition (the protocol's `Condition`) since the last turn.
+        """
+        if self.eaten is not None and self.condition is not None:
+            satisfaction = (self.condition.hunger - condition.hunger) \
+                + (condition.health - self.condition.health)
+            self.knowledge.learn(self.eaten, satisfaction)
+
+        self.eaten = None
+        self.condition = condition
+
+    def refused(self, action):
+        """
+        Called when the server refused the action. Objects which can't be eaten
+        are learned as slightly unsatisfying.
+        """
+        if action.type == "eat" and self.eaten is not None:
+            self.knowledge.learn(self.eaten, -1)
+        self.eaten = None
+
+    def scores(self, objects):
+        """
+        Returns the predicted satisfactions of the objects, ranked one by one
+        with `Knowledge.rank`: there are only a few sensed objects, new every
+        turn, and the knowledge changes as often, so the weights compiled by
+        a `BatchRanker` would hardly ever be reused.
+        """
+        rank = self.knowledge.rank
+        return [rank(o.traits) for o in objects]
+
+    def choose(self, actor, objects):
+        """
+        Returns the best object to go for (an unknown one is worth trying),
+        the nearest one when there are more equally good, or None.
+        """
+        scores = self.scores(objects)
+        best = None
+        best_key = None
+        for o, score in zip(objects, scores):
+            if score < 0:
+                continue
+            key = (-score, max(abs(o.x - actor.x), abs(o.y - actor.y)))
+            if best is None or key < best_key:
+                best = o
+                best_key = key
+        return best
+
+    def decide(self, actor):
+        """
+        Returns the action (the protocol's `Action`) for the actor's turn
+        (the protocol's `Actor`).
+        """
+        self.experience(actor.condition)
+
+        target = self.choose(actor, sensed_objects(actor.senses))
+        if target is None:
+            dx, dy = self.random.choice(rules.DIRECTIONS)
+            return protocol.Action(type="move", dx=dx, dy=dy)
+
+        dx, dy = step_towards(actor.x, actor.y, target.x, target.y)
+        if (dx, dy) == (0, 0):
+            return protocol.Action(type="wait", dx=0, dy=0)
+
+        if max(abs(target.x - actor.x), abs(target.y - actor.y)) == 1:
+            self.eaten = target
+            return protocol.Action(type="eat", dx=dx, dy=dy)
+
+        return protocol.Action(type="move", dx=dx, dy=dy)
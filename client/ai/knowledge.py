@@ -0,0 +1,150 @@
+"""
+Agent's knowledge about the world.
+
+Every time an agent experiences an object (e.g. eats it) it learns how
+satisfying it was. The satisfaction is attributed to the object's whole set
+of traits and, proportionally to their size, to its subsets, so that objects
+which were never seen before can still be ranked by the traits they share
+with the known ones.
+"""
+
+import itertools
+
+class Knowledge:
+    """
+    Satisfaction learned per set of traits.
+
+    `max_order` bounds the size of the subsets of traits which get learned,
+    (the full set of traits is always learned), which keeps the cost of
+    learning polynomial instead of exponential in the number of traits.
+    `None` means no bound.
+
+    The storage is sparse: only non-zero weights are kept in `wisdom`.
+    Everything learned is also appended to the `store` (see
+    `client.ai.store.KnowledgeStore.load`), when there is one.
+
+    Ranking looks up the subsets of the queried traits directly, the sets
+    bigger than `max_order` (which can't be enumerated cheaply) are found
+    through `index`, which maps the pair of a set's (alphabetically) first
+    two traits to such sets.
+    """
+    def __init__(self, max_order=3):
+        if max_order is not None and max_order < 1:
+            raise ValueError("max_order has to be at least 1")
+
+        self.max_order = max_order
+        self.wisdom = {}
+        self.index = {}
+        self.store = None
+
+        """
+        Incremented on every change, allows caching anything derived from
+        the knowledge.
+        """
+        self.version = 0
+
+    def is_indexed(self, traits):
+        return self.max_order is not None and len(traits) > self.max_order
+
+    @staticmethod
+    def index_key(traits):
+        return tuple(sorted(traits)[:2])
+
+    def contributions(self, traits, satisfaction):
+        """
+        Yields `(traits_subset, weight)` pairs which learning the provided
+        traits with the provided satisfaction adds to the knowledge.
+        """
+        traits = frozenset(traits)
+        if not traits or satisfaction == 0:
+            return
+
+        yield traits, satisfaction
+
+        n = len(traits)
+        order = n - 1
+        if self.max_order is not None:
+            order = min(order, self.max_order)
+
+        ordered = sorted(traits)
+        for i in range(1, order + 1):
+            weight = satisfaction*(i/n)
+            for t in itertools.combinations(ordered, i):
+                yield frozenset(t), weight
+
+    def add(self, traits, weight):
+        """
+        Adds the weight to the set of traits, dropping it when it reaches 0.
+        """
+        self.version += 1
+        known = traits in self.wisdom
+        value = self.wisdom.get(traits, 0) + weight
+        if value == 0:
+            if known:
+                del self.wisdom[traits]
+                if self.is_indexed(traits):
+                    key = self.index_key(traits)
+                    self.index[key].discard(traits)
+                    if not self.index[key]:
+                        del self.index[key]
+            return
+
+        self.wisdom[traits] = value
+        if not known and self.is_indexed(traits):
+            self.index.setdefault(self.index_key(traits), set()).add(traits)
+
+    def learn(self, object, satisfaction):
+        """
+        Learns the satisfaction provided by the object, which is expected to
+        have a collection of `traits`.
+        """
+        contributions = list(self.contributions(object.traits, satisfaction))
+        for traits, weight in contributions:
+            self.add(traits, weight)
+
+        if self.store is not None:
+            self.store.append(contributions)
+
+    def subsets(self, traits):
+        """
+        Yields `(learned_traits, weight)` pairs for every learned set which
+        is a subset of the provided traits.
+
+        The cost depends on the number of the provided traits (and the
+        indexed sets starting with their pairs), not on the size of the
+        knowledge.
+        """
+        traits = frozenset(traits)
+
+        order = len(traits)
+        if self.max_order is not None:
+            order = min(order, self.max_order)
+
+        wisdom = self.wisdom
+        for i in range(1, order + 1):
+            for t in itertools.combinations(traits, i):
+                t = frozenset(t)
+                weight = wisdom.get(t)
+                if weight is not None:
+                    yield t, weight
+
+        if self.is_indexed(traits) and self.index:
+            for key in itertools.combinations(sorted(traits), 2):
+                for indexed in self.index.get(key, ()):
+                    if indexed <= traits:
+                        yield indexed, wisdom[indexed]
+
+    def rank(self, traits):
+        """
+        Predicts the satisfaction of an object with the provided traits.
+        Every learned subset of the traits contributes its weight times its
+        size.
+        """
+        result = 0
+        for learned, weight in self.subsets(traits):
+            result += weight*len(learned)
+
+        return result
+
+    def __len__(self):
+        return len(self.wisdom)
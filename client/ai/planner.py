@@ -0,0 +1,195 @@
+"""
+Time-budgeted planning of the client's turns.
+
+The planner combines the sensed objects, ranked by the agent's `Knowledge`,
+with pathing over the client's copy of the world. The search runs on a worker
+thread, so the main (rendering) thread only takes a snapshot of the data it
+needs and later picks up the result.
+
+The search is an *anytime* breadth-first search: it always holds the best
+decision found so far and returns it as soon as the time budget runs out,
+or when the whole neighbourhood was searched.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from client.ai.agent import sensed_objects
+from shared import rules
+from shared.net.cave_world_protocol import actor as protocol
+
+class Decision:
+    """
+    Result of planning: the action to perform and the object it's aimed at
+    (None when not aimed at any).
+    """
+    def __init__(self, action, target=None):
+        self.action = action
+        self.target = target
+
+    def __repr__(self):
+        return f"Decision({self.action.as_dict()}, {self.target})"
+
+class View:
+    """
+    The part of the world the search needs, safe to be read from the worker
+    thread: the movement tables and the occupied positions around the actor.
+    """
+    def __init__(self, w, h, moves, occupied):
+        self.w = w
+        self.h = h
+        self.moves = moves
+        self.occupied = occupied
+
+    def can_move(self, x, y, dx, dy):
+        if x < 0 or x >= self.w or y < 0 or y >= self.h:
+            return False
+        if not self.moves[x * self.h + y] & rules.DIRECTION_BITS[(dx, dy)]:
+            return False
+        return (x + dx, y + dy) not in self.occupied
+
+class Planner:
+    """
+    Plans the turns of the agent's actor.
+
+    `budget` is the time (in seconds) the search may take, `radius` bounds
+    the searched area around the actor, `step_cost` is the value lost for
+    every step needed to reach an object.
+    """
+
+    """
+    How often (in expanded tiles) the deadline is checked.
+    """
+    DEADLINE_CHECK = 32
+
+    def __init__(self, agent, budget=0.05, radius=12, step_cost=0.5):
+        self.agent = agent
+        self.budget = budget
+        self.radius = radius
+        self.step_cost = step_cost
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        self._terrain_key = None
+        self._moves = None
+
+    def snapshot(self, world, x, y):
+        """
+        Returns a `View` of the world around the provided position. The
+        movement tables are only rebuilt when a new world was loaded, or after
+        `invalidate` was called.
+        """
+        if self._terrain_key != id(world.data):
+            self._moves, _ = rules.movement_tables(world)
+            self._terrain_key = id(world.data)
+
+        occupied = set()
+        for ox in range(max(0, x - self.radius - 1), min(world.w, x + self.radius + 2)):
+            column = world.data[ox]
+            for oy in range(max(0, y - self.radius - 1), min(world.h, y + self.radius + 2)):
+                if column[oy].object is not None:
+                    occupied.add((ox, oy))
+
+        return View(world.w, world.h, self._moves, occupied)
+
+    def invalidate(self):
+        """
+        Has to be called when the terrain of the current world changes.
+        """
+        self._terrain_key = None
+
+    def plan(self, world, state):
+        """
+        Learns from the actor's state (the protocol's `Actor`), ranks the
+        sensed objects and starts searching for the best action in the
+        background.
+
+        Returns a `concurrent.futures.Future` of a `Decision`, which has to be
+        passed to `accept` once it's done.
+        """
+        self.agent.experience(state.condition)
+
+        objects = sensed_objects(state.senses)
+        scores = self.agent.scores(objects)
+        targets = {
+            (o.x, o.y): (o, float(score))
+            for o, score in zip(objects, scores) if score >= 0
+        }
+
+        view = self.snapshot(world, state.x, state.y)
+        deadline = perf_counter() + self.budget
+        return self.executor.submit(
+            self.search, view, state.x, state.y, targets, deadline
+        )
+
+    def accept(self, decision):
+        """
+        Called from the main thread when the decision is going to be sent.
+        """
+        if decision.action.type == "eat":
+            self.agent.eaten = decision.target
+
+    def search(self, view, x, y, targets, deadline):
+        """
+        Searches the tiles reachable from `(x, y)`, nearest first, for the
+        best valued object to eat (its score minus the cost of the steps
+        needed to get next to it) until the deadline.
+        """
+        best = None
+        best_value = None
+
+        first_step = {(x, y): None}
+        queue = deque([(x, y, 0)])
+        expanded = 0
+
+        while queue:
+            if expanded % self.DEADLINE_CHECK == 0 and perf_counter() >= deadline:
+                break
+
+            cx, cy, distance = queue.popleft()
+            expanded += 1
+            step = first_step[(cx, cy)]
+
+            for dx, dy in rules.DIRECTIONS:
+                nx, ny = cx + dx, cy + dy
+
+                target = targets.get((nx, ny))
+                if target is not None:
+                    o, score = target
+                    value = score - distance*self.step_cost
+                    if best_value is None or value > best_value:
+                        best_value = value
+                        if step is None:
+                            best = Decision(protocol.Action(type="eat", dx=dx, dy=dy), o)
+                        else:
+                            best = Decision(protocol.Action(type="move", dx=step[0], dy=step[1]), o)
+
+                if (nx, ny) in first_step \
+                    or max(abs(nx - x), abs(ny - y)) > self.radius \
+                    or not view.can_move(cx, cy, dx, dy):
+                    continue
+
+                first_step[(nx, ny)] = step or (dx, dy)
+                queue.append((nx, ny, distance + 1))
+
+        if best is not None:
+            return best
+
+        return self.explore(view, x, y)
+
+    def explore(self, view, x, y):
+        """
+        Returns a random possible move, when there is nothing worth going for.
+        """
+        directions = [
+            d for d in rules.DIRECTIONS if view.can_move(x, y, *d)
+        ]
+        if not directions:
+            return Decision(protocol.Action(type="wait", dx=0, dy=0))
+
+        dx, dy = self.agent.random.choice(directions)
+        return Decision(protocol.Action(type="move", dx=dx, dy=dy))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,217 @@
+"""
+Persistent storage of the agents' `Knowledge`.
+
+The store is a directory with:
+- `current`, the generation number of the files below,
+- `sets.<generation>.jsonl`, the interned sets of traits, one JSON list of
+  traits per line, the line number is the set's id,
+- `records.<generation>.bin`, a header followed by fixed-width records of
+  `(set id, weight)`, one for every weight learned.
+
+Learning only appends records, loading memory-maps the records and sums the
+weights per set in one go. Compaction rewrites the files with a single record
+per set (dropping the ones which summed up to 0) as a new generation, which
+replaces the old one atomically.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from client.ai.knowledge import Knowledge
+
+class StoreException(Exception):
+    """
+    Thrown when the store's files are not in the expected format.
+    """
+    pass
+
+class KnowledgeStore:
+    MAGIC = b"CWKS"
+    VERSION = 1
+
+    HEADER = struct.Struct("<4sI")
+    RECORD = struct.Struct("<Id")
+    RECORD_DTYPE = np.dtype([("set", "<u4"), ("weight", "<f8")])
+
+    def __init__(self, path):
+        self.path = path
+        self.sets = []
+        self.set_ids = {}
+
+        self.sets_file = None
+        self.records_file = None
+
+        os.makedirs(path, exist_ok=True)
+        self.generation = self.read_generation()
+        self.open()
+
+    def file_path(self, name, generation=None):
+        if generation is None:
+            generation = self.generation
+        return os.path.join(self.path, name.format(generation))
+
+    def read_generation(self):
+        try:
+            with open(os.path.join(self.path, "current")) as f:
+                return int(f.read())
+        except FileNotFoundError:
+            return 0
+
+    def write_generation(self, generation):
+        current = os.path.join(self.path, "current")
+        with open(current + ".tmp", "w") as f:
+            f.write(str(generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(current + ".tmp", current)
+
+    def open(self):
+        """
+        Opens the current generation's files for appending, creating them when
+        they don't exist.
+        """
+        sets_path = self.file_path("sets.{}.jsonl")
+        records_path = self.file_path("records.{}.bin")
+
+        self.sets = []
+        self.set_ids = {}
+        if os.path.exists(sets_path):
+            with open(sets_path, "r+b") as f:
+                size = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Interrupted write, no record can refer to it
+                        break
+                    self.intern_loaded(frozenset(json.loads(line)))
+                    size += len(line)
+                f.truncate(size)
+
+        if not os.path.exists(records_path):
+            with open(records_path, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+        else:
+            with open(records_path, "r+b") as f:
+                header = f.read(self.HEADER.size)
+                if len(header) < self.HEADER.size:
+                    raise StoreException(f"{records_path} is too short to be a knowledge store")
+
+                magic, version = self.HEADER.unpack(header)
+                if magic != self.MAGIC or version != self.VERSION:
+                    raise StoreException(f"{records_path} is not a knowledge store of version {self.VERSION}")
+
+                # Drop an incomplete record left by an interrupted write
+                size = os.fstat(f.fileno()).st_size - self.HEADER.size
+                f.truncate(self.HEADER.size + size - size % self.RECORD.size)
+
+        self.sets_file = open(sets_path, "a")
+        self.records_file = open(records_path, "ab")
+
+    def close(self):
+        if self.sets_file is not None:
+            self.sets_file.close()
+            self.records_file.close()
+            self.sets_file = None
+            self.records_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def intern_loaded(self, traits):
+        self.set_ids[traits] = len(self.sets)
+        self.sets.append(traits)
+
+    def intern(self, traits):
+        """
+        Returns the id of the set of traits, adding it to the store when it's
+        seen for the first time.
+        """
+        id = self.set_ids.get(traits)
+        if id is None:
+            id = len(self.sets)
+            self.intern_loaded(traits)
+            self.sets_file.write(json.dumps(sorted(traits)) + "\n")
+        return id
+
+    def append(self, contributions):
+        """
+        Appends the `(traits, weight)` pairs, as yielded by
+        `Knowledge.contributions`, to the store.
+        """
+        data = b"".join(
+            self.RECORD.pack(self.intern(traits), weight)
+            for traits, weight in contributions
+        )
+        # The sets have to be stored before the records referring to them
+        self.sets_file.flush()
+        self.records_file.write(data)
+        self.records_file.flush()
+
+    def weights(self):
+        """
+        Returns an array of the summed weights of every interned set, indexed
+        by the sets' ids.
+        """
+        self.records_file.flush()
+        with open(self.file_path("records.{}.bin"), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                count = (len(data) - self.HEADER.size) // self.RECORD.size
+                records = np.frombuffer(data, self.RECORD_DTYPE, count, self.HEADER.size)
+                weights = np.bincount(
+                    records["set"],
+                    weights=records["weight"],
+                    minlength=len(self.sets)
+                )
+                del records
+
+        return weights[:len(self.sets)]
+
+    def load(self, knowledge=None):
+        """
+        Adds the stored weights to the knowledge (a new one when it's not
+        provided) and attaches the store to it, so that anything it learns
+        from now on is stored as well.
+        """
+        if knowledge is None:
+            knowledge = Knowledge()
+
+        weights = self.weights()
+        for id in np.flatnonzero(weights):
+            knowledge.add(self.sets[id], float(weights[id]))
+
+        knowledge.store = self
+        return knowledge
+
+    def compact(self):
+        """
+        Rewrites the store with a single record per set with a non-zero
+        weight.
+        """
+        weights = self.weights()
+        generation = self.generation + 1
+
+        with open(self.file_path("sets.{}.jsonl", generation), "w") as sets:
+            with open(self.file_path("records.{}.bin", generation), "wb") as records:
+                records.write(self.HEADER.pack(self.MAGIC, self.VERSION))
+                for new_id, id in enumerate(np.flatnonzero(weights)):
+                    sets.write(json.dumps(sorted(self.sets[id])) + "\n")
+                    records.write(self.RECORD.pack(new_id, float(weights[id])))
+
+                for f in (sets, records):
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        self.close()
+        self.write_generation(generation)
+
+        for name in ("sets.{}.jsonl", "records.{}.bin"):
+            os.remove(self.file_path(name))
+
+        self.generation = generation
+        self.open()
@@ -0,0 +1,62 @@
+from .agent import Agent, sensed_objects
+from .knowledge import Knowledge
+from shared.net.cave_world_protocol import actor as protocol
+import unittest
+
+def state(x, y, sight=(), smell=(), hunger=0.0, health=100.0):
+    return protocol.Actor({
+        "type": "caveman",
+        "x": x,
+        "y": y,
+        "senses": {
+            "sight": [{"traits": t, "x": sx, "y": sy} for sx, sy, t in sight],
+            "hearing": [],
+            "smell": [{"traits": t, "x": sx, "y": sy} for sx, sy, t in smell],
+        },
+        "condition": {
+            "hunger": hunger,
+            "thirst": 0.0,
+            "temperature": 0.0,
+            "health": health
+        }
+    })
+
+class TestAgent(unittest.TestCase):
+    def test_sensed_objects(self):
+        objects = sensed_objects(state(
+            0, 0,
+            sight=[(1, 1, ["red"]), (2, 2, ["gray"])],
+            smell=[(1, 1, ["bitter"])]
+        ).senses)
+
+        self.assertEqual(
+            {(o.x, o.y): o.traits for o in objects},
+            {(1, 1): {"red", "bitter"}, (2, 2): {"gray"}}
+        )
+
+    def test_eats_adjacent(self):
+        action = Agent().decide(state(5, 5, sight=[(6, 4, ["green"])]))
+        self.assertEqual((action.type, action.dx, action.dy), ("eat", 1, -1))
+
+    def test_walks_towards(self):
+        action = Agent().decide(state(5, 5, sight=[(9, 5, ["green"])]))
+        self.assertEqual((action.type, action.dx, action.dy), ("move", 1, 0))
+
+    def test_avoids_bad(self):
+        knowledge = Knowledge()
+        agent = Agent(knowledge)
+        agent.decide(state(5, 5, sight=[(6, 5, ["red"])], hunger=10.0))
+        agent.decide(state(5, 5, hunger=11.0, health=80.0))
+
+        self.assertLess(knowledge.rank({"red"}), 0)
+
+        action = agent.decide(state(5, 5, sight=[(6, 5, ["red"]), (3, 5, ["green"])]))
+        self.assertEqual((action.type, action.dx, action.dy), ("move", -1, 0))
+
+    def test_refused(self):
+        knowledge = Knowledge()
+        agent = Agent(knowledge)
+        action = agent.decide(state(5, 5, sight=[(6, 5, ["gray"])]))
+        agent.refused(action)
+
+        self.assertLess(knowledge.rank({"gray"}), 0)
@@ -0,0 +1,77 @@
+from .batch import BatchRanker
+from .knowledge import Knowledge
+from random import Random
+import unittest
+
+class Object:
+    def __init__(self, traits):
+        self.traits = traits
+
+class TestBatchRanker(unittest.TestCase):
+    def setUp(self):
+        random = Random(0)
+        names = [str(i) for i in range(16)]
+
+        self.knowledge = Knowledge()
+        for _ in range(100):
+            traits = random.sample(names, random.randint(1, 6))
+            self.knowledge.learn(Object(traits), random.uniform(-5, 5))
+
+        self.candidates = [
+            Object(random.sample(names + ["unknown"], random.randint(0, 8)))
+            for _ in range(200)
+        ]
+
+    def test_scores_match_rank(self):
+        ranker = BatchRanker(self.knowledge)
+        scores = ranker.scores(self.candidates)
+
+        for candidate, score in zip(self.candidates, scores):
+            self.assertAlmostEqual(score, self.knowledge.rank(candidate.traits), places=6)
+
+    def test_chunks(self):
+        ranker = BatchRanker(self.knowledge)
+        expected = ranker.scores(self.candidates)
+
+        ranker.CHUNK_ELEMENTS = 1
+        for score, other in zip(ranker.scores(self.candidates), expected):
+            self.assertAlmostEqual(score, other, places=6)
+
+    def test_rank_sorted(self):
+        ranked = BatchRanker(self.knowledge).rank(self.candidates)
+
+        self.assertEqual(len(ranked), len(self.candidates))
+        scores = [score for _, score in ranked]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_cache_invalidation(self):
+        ranker = BatchRanker(self.knowledge)
+        candidate = Object(["0", "1"])
+        before = ranker.scores([candidate])[0]
+
+        self.knowledge.learn(candidate, 10)
+        self.assertAlmostEqual(ranker.scores([candidate])[0], before + 30, places=6)
+
+    def test_cache_column_order(self):
+        knowledge = Knowledge()
+        knowledge.learn(Object(["a"]), 10)
+        ranker = BatchRanker(knowledge)
+
+        self.assertEqual(list(ranker.scores([Object(["a"]), Object(["b"])])), [10.0, 0.0])
+        self.assertEqual(list(ranker.scores([Object(["b"]), Object(["a"])])), [0.0, 10.0])
+
+    def test_unbounded_order(self):
+        knowledge = Knowledge(max_order=None)
+        names = [str(i) for i in range(40)]
+        knowledge.learn(Object(names[:4]), 1)
+
+        # 40 traits in total, but only the candidates' own subsets are looked up
+        candidates = [Object(names[i:i + 4]) for i in range(0, 40, 4)]
+        scores = BatchRanker(knowledge).scores(candidates)
+        for candidate, score in zip(candidates, scores):
+            self.assertAlmostEqual(score, knowledge.rank(candidate.traits), places=6)
+
+    def test_empty(self):
+        ranker = BatchRanker(Knowledge())
+        self.assertEqual(ranker.rank([Object(["a"])])[0][1], 0.0)
+        self.assertEqual(ranker.rank([]), [])
@@ -0,0 +1,80 @@
+from .agent import Agent
+from .knowledge import Knowledge
+from .planner import Planner
+from .test_agent import state
+from time import perf_counter
+import unittest
+
+class Tile:
+    def __init__(self, z=0.0):
+        self.type = 0
+        self.z = z
+        self.object = None
+
+class World:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.data = [[Tile() for _ in range(h)] for _ in range(w)]
+
+class Object:
+    def __init__(self, traits):
+        self.traits = traits
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        self.world = World(16, 16)
+        self.knowledge = Knowledge()
+        self.planner = Planner(Agent(self.knowledge), budget=1.0)
+
+    def tearDown(self):
+        self.planner.shutdown()
+
+    def decide(self, state):
+        decision = self.planner.plan(self.world, state).result()
+        self.planner.accept(decision)
+        return decision
+
+    def test_eat_adjacent(self):
+        self.world.data[6][5].object = object()
+        decision = self.decide(state(5, 5, sight=[(6, 5, ["green"])]))
+
+        action = decision.action
+        self.assertEqual((action.type, action.dx, action.dy), ("eat", 1, 0))
+        self.assertIs(self.planner.agent.eaten, decision.target)
+
+    def test_path_around_wall(self):
+        # A cliff between the actor and the object
+        for y in range(0, 15):
+            self.world.data[7][y].z = 10.0
+        self.world.data[10][5].object = object()
+
+        decision = self.decide(state(5, 5, sight=[(10, 5, ["green"])]))
+        action = decision.action
+        self.assertEqual(action.type, "move")
+        self.assertEqual(action.dy, 1)
+
+    def test_prefers_better(self):
+        self.knowledge.learn(Object(["red"]), -10)
+        self.knowledge.learn(Object(["blue"]), 10)
+        self.world.data[6][5].object = object()
+        self.world.data[5][8].object = object()
+
+        decision = self.decide(state(5, 5, sight=[(6, 5, ["red"]), (5, 8, ["blue"])]))
+        action = decision.action
+        self.assertEqual((action.type, action.dy), ("move", 1))
+        self.assertEqual(decision.target.traits, {"blue"})
+
+    def test_budget(self):
+        planner = Planner(Agent(), budget=0.0)
+        start = perf_counter()
+        decision = planner.plan(World(64, 64), state(32, 32)).result()
+        planner.shutdown()
+
+        self.assertLess(perf_counter() - start, 0.5)
+        self.assertEqual(decision.action.type, "move")
+
+    def test_empty_world(self):
+        decision = self.decide(state(3, 3))
+        self.assertEqual(decision.action.type, "move")
+        self.assertEqual(Planner(Agent()).plan(World(0, 0), state(3, 3)).result().action.type, "wait")
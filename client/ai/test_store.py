@@ -0,0 +1,95 @@
+from .knowledge import Knowledge
+from .store import KnowledgeStore, StoreException
+from tempfile import TemporaryDirectory
+import os
+import unittest
+
+class Object:
+    def __init__(self, traits):
+        self.traits = traits
+
+class TestKnowledgeStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def learn(self, knowledge):
+        knowledge.learn(Object({"small", "hard"}), -10)
+        knowledge.learn(Object({"small", "squishy", "soft"}), 10)
+        knowledge.learn(Object({"small", "hard"}), -10)
+
+    def test_load(self):
+        with KnowledgeStore(self.path) as store:
+            knowledge = store.load()
+            self.learn(knowledge)
+
+        with KnowledgeStore(self.path) as store:
+            loaded = store.load()
+
+        self.assertEqual(loaded.wisdom.keys(), knowledge.wisdom.keys())
+        for traits, weight in knowledge.wisdom.items():
+            self.assertAlmostEqual(loaded.wisdom[traits], weight)
+
+    def test_append_after_load(self):
+        with KnowledgeStore(self.path) as store:
+            self.learn(store.load())
+
+        with KnowledgeStore(self.path) as store:
+            store.load().learn(Object({"small", "hard"}), 20)
+
+        with KnowledgeStore(self.path) as store:
+            knowledge = store.load()
+
+        expected = Knowledge()
+        self.learn(expected)
+        expected.learn(Object({"small", "hard"}), 20)
+
+        self.assertNotIn(frozenset({"small", "hard"}), knowledge.wisdom)
+        self.assertEqual(knowledge.wisdom.keys(), expected.wisdom.keys())
+
+    def test_compact(self):
+        with KnowledgeStore(self.path) as store:
+            knowledge = store.load()
+            self.learn(knowledge)
+            knowledge.learn(Object({"small", "hard"}), 20)
+
+            records = os.path.getsize(store.file_path("records.{}.bin"))
+            store.compact()
+            self.assertLess(os.path.getsize(store.file_path("records.{}.bin")), records)
+            self.assertEqual(len(store.sets), len(knowledge))
+
+            knowledge.learn(Object({"wooden"}), 1)
+
+        with KnowledgeStore(self.path) as store:
+            loaded = store.load()
+
+        self.assertEqual(loaded.wisdom.keys(), knowledge.wisdom.keys())
+
+    def test_interrupted_write(self):
+        with KnowledgeStore(self.path) as store:
+            self.learn(store.load())
+            path = store.file_path("records.{}.bin")
+
+        with open(path, "ab") as f:
+            f.write(b"\x01\x02")
+
+        with KnowledgeStore(self.path) as store:
+            self.assertEqual(len(store.load()), 9)
+
+    def test_wrong_format(self):
+        with open(os.path.join(self.path, "records.0.bin"), "wb") as f:
+            f.write(b"somethingelse")
+
+        with self.assertRaises(StoreException):
+            KnowledgeStore(self.path)
+
+    def test_truncated_header(self):
+        for data in (b"", b"CAVE"):
+            with open(os.path.join(self.path, "records.0.bin"), "wb") as f:
+                f.write(data)
+
+            with self.assertRaises(StoreException):
+                KnowledgeStore(self.path)
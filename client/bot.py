@@ -0,0 +1,175 @@
+"""
+Headless bots for load-testing the server.
+
+Every bot is a separate connection with its own actor, controlled by an
+`Agent`. All of the bots run as tasks of a single event loop, so hundreds of
+them fit in one process.
+
+`python -m client.bot [address [port]] [--agents N] [--think SECONDS]`
+"""
+
+import argparse
+import asyncio
+import logging
+from random import Random
+from time import monotonic
+
+from client.ai.agent import Agent
+from client.net.network import ClientNetwork, Connected, Disconnected
+from shared.net.codec import ZLIB
+from shared.net.network.requests import RequestStats
+from shared.net.cave_world_protocol import actor, client
+from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+
+class Bot:
+    """
+    A single headless client. `think_time` is the mean time (in seconds) the
+    bot waits before answering to its turn, the actual time is random, between
+    half and one and a half of it. `compression` is the compression mode
+    requested from the server (see `shared.net.codec`). The latencies of the
+    turns are measured in `request_stats`.
+    """
+    def __init__(self, name, think_time=0.0, knowledge=None, random=None,
+                 compression=ZLIB, request_stats=None):
+        self.name = name
+        self.think_time = think_time
+        self.random = random or Random()
+        self.agent = Agent(knowledge, self.random)
+
+        self.network = ClientNetwork(
+            CaveWorldProtocol(), threaded=False, compression=compression,
+            request_stats=request_stats
+        )
+        self.network.bind({
+            Connected: self.on_connected,
+            Disconnected: self.on_disconnected,
+            actor.PrepareTurnRequest: self.on_prepare_turn_request,
+        })
+
+        self.connected = False
+        self.turns = 0
+        self.failures = 0
+
+    async def run(self, address, port):
+        await self.network.run(address, port)
+
+    def on_connected(self, message):
+        self.connected = True
+        self.network.send(client.Introduction(name=self.name))
+        self.network.send(actor.ActorRequest(type="caveman"))
+
+    def on_disconnected(self, message):
+        self.connected = False
+
+    def on_prepare_turn_request(self, message):
+        asyncio.ensure_future(self.take_turn(message.actor))
+
+    async def take_turn(self, state):
+        if self.think_time > 0:
+            await asyncio.sleep(self.think_time * self.random.uniform(0.5, 1.5))
+
+        await self.act(self.agent.decide(state))
+
+    async def act(self, action):
+        while True:
+            try:
+                result = await self.network.request(actor.TurnRequest(action=action))
+            except ConnectionError:
+                return
+
+            if result.success:
+                self.turns += 1
+                return
+
+            self.failures += 1
+            # The turn is still ours, unless waiting failed as well
+            if action.type == "wait":
+                return
+            self.agent.refused(action)
+            action = actor.Action(type="wait", dx=0, dy=0)
+
+async def report(bots, interval, request_stats):
+    last_turns = 0
+    last_time = monotonic()
+    while True:
+        await asyncio.sleep(interval)
+
+        turns = sum(bot.turns for bot in bots)
+        now = monotonic()
+        connected = sum(bot.connected for bot in bots)
+        print(f"{connected}/{len(bots)} bots connected, {turns} turns, "
+              f"{(turns - last_turns)/(now - last_time):.1f} turns/s, "
+              f"turn latency {request_stats.latency.mean * 1000:.1f} ms")
+        request_stats.latency.reset()
+        last_turns, last_time = turns, now
+
+async def run_bots(address, port, count, think_time,
+                   knowledge=None, spawn_interval=0.01, report_interval=10.0,
+                   compression=ZLIB):
+    """
+    Connects `count` bots to the server and runs them until all of them get
+    disconnected. The bots share the provided knowledge, or each has its own
+    one when it's None.
+    """
+    request_stats = RequestStats()
+    bots = [
+        Bot(f"bot{i}", think_time, knowledge, Random(i), compression, request_stats)
+        for i in range(count)
+    ]
+
+    reporter = asyncio.ensure_future(report(bots, report_interval, request_stats))
+
+    tasks = []
+    for bot in bots:
+        tasks.append(asyncio.ensure_future(bot.run(address, port)))
+        await asyncio.sleep(spawn_interval)
+
+    try:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        reporter.cancel()
+
+    return bots
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs headless bots connected to the server")
+    parser.add_argument("address", nargs="?", default="localhost")
+    parser.add_argument("port", nargs="?", type=int, default=5505)
+    parser.add_argument("--agents", type=int, default=100,
+        help="number of bots to run")
+    parser.add_argument("--think", type=float, default=0.1,
+        help="mean time in seconds a bot takes to decide about its turn")
+    parser.add_argument("--spawn-interval", type=float, default=0.01,
+        help="time in seconds between connecting consecutive bots")
+    parser.add_argument("--report-interval", type=float, default=10.0,
+        help="time in seconds between printing the statistics")
+    parser.add_argument("--knowledge",
+        help="directory of a knowledge store shared by all of the bots")
+    parser.add_argument("--compression", choices=("zlib", "deflate", "none"),
+        default="zlib", help="compression of the messages requested from the server")
+    parser.add_argument("--debug", action="store_true",
+        help="log every sent packet")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+
+    store = None
+    knowledge = None
+    if args.knowledge:
+        from client.ai.store import KnowledgeStore
+        store = KnowledgeStore(args.knowledge)
+        knowledge = store.load()
+
+    print("Connecting", args.agents, "bots to", args.address, ":", args.port)
+    try:
+        asyncio.run(run_bots(
+            args.address, args.port, args.agents, args.think,
+            knowledge, args.spawn_interval, args.report_interval,
+            None if args.compression == "none" else args.compression
+        ))
+    finally:
+        if store is not None:
+            store.close()
+
+if __name__ == "__main__":
+    main()
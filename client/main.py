@@ -6,11 +6,14 @@ from shared.state import State
 from shared.world import World, Tile
 from client.world import Object
 from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+from client.replica import WorldReplica
 from .net.network import ClientNetwork, Connected, Disconnected
 from shared.net.cave_world_protocol import \
     actor, client, world
 
 from server.actor import Actor
+from client.ai.agent import Agent
+from client.ai.planner import Planner
 
 import asyncio
 import websockets
@@ -18,6 +21,11 @@ import threading
 
 
 class Main(State):
+    """
+    The most chunks of the streamed world in flight.
+    """
+    STREAM_WINDOW = 32
+
     def __init__(self, engine : Engine):
         self.engine = engine
         self.canvas = Canvas(engine.get_renderer())
@@ -31,20 +39,33 @@ class Main(State):
             Disconnected: self.on_disconnected,
             actor.ActorResponse: self.on_actor_response,
             actor.PrepareTurnRequest: self.on_prepare_turn_request,
+            actor.TurnResult: self.on_turn_result,
             world.DataResponse: self.on_world_data_response,
+            world.PackedDataResponse: self.on_packed_world_data_response,
+            world.Delta: self.on_world_delta,
+            world.StreamStart: self.on_stream_start,
+            world.Chunk: self.on_chunk,
         })
 
-        
+
         self.world = World(self.canvas, 0, 0)
+        self.replica = WorldReplica(
+            self.world, Tile, lambda r: Object(representation=r)
+        )
         self.actor = None
 
+        self.agent = Agent()
+        self.planner = Planner(self.agent)
+        self.plan = None
+        self.last_action = None
+
     def connect(self, address, port):
         self.network.connect(address, port)
 
     def on_connected(self, message):
         print("Successfully connected!!!")
         self.network.send(client.Introduction(name="foo"))
-        self.network.send(world.DataRequest())
+        self.request_world()
         self.network.send(actor.ActorRequest(type="caveman"))
 
     def on_disconnected(self, message):
@@ -63,17 +84,67 @@ class Main(State):
                         representation=tile.object.repr
                     )
 
+    def on_packed_world_data_response(self, message):
+        self.replica.load(message)
+        self.terrain_updated()
+
+    def on_stream_start(self, message):
+        self.replica.start(message)
+        self.terrain_updated()
+
+    def on_chunk(self, message):
+        self.replica.load_chunk(message)
+        self.network.send(world.StreamAck(count=1))
+        self.terrain_updated()
+
+    def on_world_delta(self, message):
+        if self.replica.apply(message):
+            print("Missed world changes, requesting the whole world")
+            self.request_world()
+        self.terrain_updated()
+
+    def request_world(self):
+        # Streamed around the actor, which is drawn as soon as its chunks arrive
+        self.replica.request()
+        self.network.send(world.StreamRequest(
+            x=0, y=0, width=0, height=0, window=self.STREAM_WINDOW
+        ))
+
+    def terrain_updated(self):
+        if self.replica.terrain_changed:
+            self.replica.terrain_changed = False
+            self.planner.invalidate()
+
     def on_actor_response(self, message):
         print("Actor response!")
         pass
 
     def on_prepare_turn_request(self, message):
-        print("Prepare turn request!", message.as_dict())
-        pass
+        # Planning runs in the background, the result is sent in `update`
+        self.plan = self.planner.plan(self.world, message.actor)
+
+    def on_turn_result(self, message):
+        if message.success or self.last_action is None:
+            return
+
+        print("Turn failed:", message.error)
+        if self.last_action.type != "wait":
+            self.agent.refused(self.last_action)
+            self.send_action(actor.Action(type="wait", dx=0, dy=0))
+
+    def send_action(self, action):
+        self.last_action = action
+        self.network.send(actor.TurnRequest(action=action))
 
     def update(self, dt):
         self.network.process()
 
+        if self.plan is not None and self.plan.done():
+            decision = self.plan.result()
+            self.plan = None
+            self.planner.accept(decision)
+            self.send_action(decision.action)
+
     def draw(self):
         self.canvas.set_color_rgb(32, 32, 32)
         self.canvas.clear()
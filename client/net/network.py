@@ -1,13 +1,22 @@
 import asyncio
-import json
+import logging
+import time
 import websockets
 
+from shared.net.codec import ZLIB, CompressionStats, JsonCodec, codec_for, \
+    subprotocols, websocket_compression
+from shared.net.cave_world_protocol.session import ResumeResult, Session
 from shared.net.network.network import Network
+from shared.net.network.replay import ReplayBuffer
+from shared.net.network.requests import CLIENT, Requests, RequestStats, correlate
+from shared.net.network.send_queue import COALESCE, QueueStats, SendQueue
 from shared.net.protocol import Protocol
 
 from queue import Queue, Empty
 from threading import Thread
 
+log = logging.getLogger(__name__)
+
 class Connected:
     """
     Marker message which gets 'emitted' upon successful connection.
@@ -15,31 +24,97 @@ class Connected:
 
 class Disconnected:
     """
-    Marker message which gets 'emitted' upon successful connection.
+    Marker message which gets 'emitted' upon disconnection.
     """
 
 class ClientNetwork(Network):
-    def __init__(self, protocol : Protocol):
+    """
+    Network of a single client connection.
+
+    By default (`threaded=True`) the connection runs on its own thread, started
+    by `connect`, and the received messages are queued until `process` is
+    called from the main thread.
+
+    With `threaded=False` the connection is expected to be run as a task of
+    an already running event loop (`run`), shared e.g. by many clients, and
+    the bound callbacks are called right upon receiving the messages, on the
+    event loop.
+
+    `compression` is the compression mode requested from the server (see
+    `shared.net.codec`), the measurements of the `ZLIB` one are collected in
+    `compression_stats`.
+
+    The send queue holds at most `queue_limit` messages, what happens when
+    the server doesn't keep up is decided by the `policy` (see
+    `shared.net.network.send_queue`).
+
+    When the connection drops, the client keeps reconnecting for up to
+    `resume_grace` seconds to resume its session (see `ServerNetwork`): the
+    frames missed by either side are sent again (at most `replay_limit` of
+    the last ones are kept) and the application doesn't notice. When the
+    session can't be resumed a new one is started, which is signalled with
+    `Disconnected` followed by `Connected`. A zero `resume_grace` disables
+    reconnecting.
+
+    The client can `request` a response from the server, and answers the
+    server's requests with `respond` (see `shared.net.network.requests`),
+    their latencies are measured in `request_stats`, which can be shared by
+    many clients.
+    """
+
+    """
+    Delay between the attempts to reconnect, in seconds.
+    """
+    RECONNECT_DELAY = 0.5
+
+    def __init__(self, protocol : Protocol, threaded=True, compression=ZLIB,
+                 queue_limit=256, policy=COALESCE, resume_grace=30.0,
+                 replay_limit=1024, request_stats=None):
         super().__init__()
         self.thread = None
+        self.threaded = threaded
         self.protocol = protocol
+        self.codec = JsonCodec(protocol)
+        self.compression = compression
+        self.compression_stats = CompressionStats()
+
+        self.websocket = None
+        self.loop = None
 
         self.receive_queue = Queue()
-        self.send_queue = Queue()
+        self.queue_stats = QueueStats()
+        self.send_queue = SendQueue(limit=queue_limit, policy=policy, stats=self.queue_stats)
+
+        self.resume_grace = resume_grace
+        self.closed = False
+        # Whether the application was sent `Connected`, but not `Disconnected` yet
+        self.announced = False
+        # Token of the session, None until the server has sent it
+        self.token = None
+        # Number of the frames received from the server in the session
+        self.received = 0
+        # Frames sent to the server, numbered (see `shared.net.network.replay`)
+        self.replay = ReplayBuffer(replay_limit)
+
+        self.request_stats = request_stats if request_stats is not None else RequestStats()
+        # The requests waiting for the server's responses
+        self.requests = Requests(CLIENT, threaded, self.request_stats)
 
     async def receiver(self, ws):
         while True:
             msg = await ws.recv()
+            self.received += 1
             self.receive(msg)
 
     async def sender(self, ws):
         while True:
-            await asyncio.sleep(0.01)
-            try:
-                msg = self.send_queue.get_nowait()
-                await ws.send(msg)
-            except Empty:
-                pass
+            # Everything queued meanwhile goes out as a single frame
+            messages = await self.send_queue.get_all()
+            frame = self.codec.join([
+                self.codec.encode_piece(message) for message in messages
+            ])
+            self.replay.add(frame)
+            await ws.send(frame)
 
     def receive(self, data):
         """
@@ -47,40 +122,177 @@ class ClientNetwork(Network):
         unwrapped by the corresponding protocol.
         """
 
-        message = self.protocol.unwrap(json.loads(data))
-        self.receive_queue.put(message)
+        for message in self.codec.decode_all(data):
+            if isinstance(message, Session):
+                self.token = message.token
+                continue
+            self.receive_message(message)
 
     def receive_message(self, message):
         """
         Called when a proper message was received, and is supposed to
         be processed without any unwrapping.
         """
+        if not self.threaded:
+            self.dispatch(message)
+            return
+
         self.receive_queue.put(message)
 
+    def dispatch(self, message):
+        if not self.requests.complete(message):
+            self.call(message)
+
     def send(self, message):
-        data = self.protocol.wrap(message)
-        print("Sending", data)
-        self.send_queue.put(json.dumps(data))
-    
+        """
+        Queues the message, it gets encoded by the sender with the codec
+        negotiated at connection.
+        """
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Sending %s", self.protocol.wrap(message))
+        if not self.send_queue.put(message, message.critical):
+            log.warning("The send queue is full, disconnecting")
+            self.close()
 
-    def connect(self, address, port):
-        async def client():
-            async with websockets.connect(f"ws://{address}:{port}") as ws:
-                print("Successfully connected!")
+    def request(self, message):
+        """
+        Sends the message (built for this request only), returns the future of
+        the server's response, which isn't passed to the bound callback. It
+        fails with `ConnectionError` if the session ends first.
+        """
+        future = self.requests.start(message)
+        self.send(message)
+        return future
+
+    def respond(self, request, message):
+        """
+        Sends the message in response to the server's request. The message
+        has to be built for this response only (see `correlate`).
+        """
+        correlate(message, request.correlation)
+        self.send(message)
+
+    def close(self):
+        """
+        Closes the connection, without reconnecting, can be called from any
+        thread.
+        """
+        self.closed = True
+        if self.websocket is not None:
+            asyncio.run_coroutine_threadsafe(self.websocket.close(), self.loop)
 
-                self.receive_message(Connected())
+    def reset_session(self):
+        """
+        Forgets the session, the next connection starts a new one. The
+        messages queued for the old one are dropped.
+        """
+        self.token = None
+        self.received = 0
+        self.replay.clear()
+        self.send_queue.clear()
+        self.requests.fail(ConnectionError("The session has ended"))
 
-                await asyncio.gather(
-                    self.sender(ws),
-                    self.receiver(ws)
-                )
+    def announce(self, connected):
+        """
+        Tells the application that a session has started or ended, only once.
+        """
+        if connected != self.announced:
+            self.announced = connected
+            self.receive_message(Connected() if connected else Disconnected())
+
+    async def run(self, address, port):
+        """
+        Connects to the server and handles the connection until it's closed,
+        reconnecting meanwhile if it drops.
+        """
+        self.loop = asyncio.get_event_loop()
+        self.send_queue.bind(self.loop)
+
+        connected = False
+        dropped = None
+        while True:
+            try:
+                if await self.connection(address, port):
+                    connected = True
+                    dropped = None
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                if not connected:
+                    raise
+                log.info("Reconnecting failed: %s", e)
 
-                self.receive_message(Disconnected())
-            
+            if self.closed or self.token is None or self.resume_grace <= 0:
+                break
+
+            now = time.monotonic()
+            if dropped is None:
+                dropped = now
+            elif now - dropped > self.resume_grace:
+                break
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+        self.requests.fail(ConnectionError("Disconnected"))
+        self.announce(False)
+
+    async def connection(self, address, port):
+        """
+        Handles a single connection of the session, resuming it if there
+        is one. Returns whether it was established.
+        """
+        uri = f"ws://{address}:{port}"
+        resuming = self.token is not None
+        if resuming:
+            uri += f"/resume?token={self.token}&received={self.received}"
+
+        async with websockets.connect(
+            uri,
+            subprotocols=subprotocols(self.compression),
+            compression=websocket_compression(self.compression)
+        ) as ws:
+            codec = codec_for(ws.subprotocol, self.protocol, self.compression_stats)
+            frames = None
+            if resuming:
+                result = next(iter(codec.decode_all(await ws.recv())), None)
+                if not isinstance(result, ResumeResult):
+                    raise websockets.exceptions.ProtocolError(f"Unexpected {result}")
+                if result.success and codec.name == self.codec.name:
+                    frames = self.replay.since(result.received)
+
+                if frames is None:
+                    log.info("The session can't be resumed, starting a new one")
+                    self.reset_session()
+                    self.announce(False)
+                    if result.success:
+                        # Resumed by the server, but not by us: closing the
+                        # connection normally ends it, a new one starts on
+                        # a new connection
+                        await ws.close()
+                        return await self.connection(address, port)
+
+            self.websocket = ws
+            self.codec = codec
+            if frames is None:
+                log.info("Connected to %s:%s (%s)", address, port, self.codec.name)
+                self.announce(True)
+            else:
+                log.info("Resumed the session with %s:%s", address, port)
+                for frame in frames:
+                    await ws.send(frame)
+
+            sender = asyncio.ensure_future(self.sender(ws))
+            try:
+                await self.receiver(ws)
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            finally:
+                sender.cancel()
+                self.websocket = None
+            return True
+
+    def connect(self, address, port):
         def thread():
             asyncio.set_event_loop(asyncio.new_event_loop())
-            asyncio.get_event_loop().run_until_complete(client())
-        
+            asyncio.get_event_loop().run_until_complete(self.run(address, port))
+
         self.thread = Thread(target=thread)
         self.thread.start()
 
@@ -88,6 +300,6 @@ class ClientNetwork(Network):
         while True:
             try:
                 message = self.receive_queue.get_nowait()
-                self.call(message)
+                self.dispatch(message)
             except Empty:
                 break
\ No newline at end of file
@@ -0,0 +1,119 @@
+from .network import ClientNetwork, Connected, Disconnected
+from server.net.network import ClientConnected, ClientDisconnected, ServerNetwork
+from shared.net.codec import DEFLATE
+from shared.net.cave_world_protocol import actor
+from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+import asyncio
+import unittest
+
+async def until(condition, timeout=5.0):
+    """
+    Waits until the condition holds.
+    """
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise TimeoutError("The condition doesn't hold")
+        await asyncio.sleep(0.01)
+
+def turn_request(dx):
+    return actor.TurnRequest(action={"type": "move", "dx": dx, "dy": 0})
+
+def run_session(test, **kvargs):
+    """
+    Runs the test with a server and a client connected to it, passing it
+    the server (of the default settings), the client (of the provided ones)
+    and the lists of their events.
+    """
+    async def run():
+        server = ServerNetwork(CaveWorldProtocol(), threaded=False)
+        server_events = []
+        server.bind({
+            ClientConnected: lambda message, client: server_events.append("connected"),
+            ClientDisconnected: lambda message, client: server_events.append("disconnected"),
+            actor.TurnRequest: lambda message, client: server_events.append(message.action.dx),
+        })
+        listener = await server.serve("localhost", 0)
+        port = listener.sockets[0].getsockname()[1]
+
+        network = ClientNetwork(CaveWorldProtocol(), threaded=False, **kvargs)
+        network.RECONNECT_DELAY = 0.01
+        events = []
+        network.bind({
+            Connected: lambda message: events.append("connected"),
+            Disconnected: lambda message: events.append("disconnected"),
+        })
+        task = asyncio.ensure_future(network.run("localhost", port))
+        await until(lambda: network.token is not None)
+
+        try:
+            await test(server, network, server_events, events)
+        finally:
+            network.close()
+            await asyncio.wait_for(task, 5)
+            listener.close()
+            await listener.wait_closed()
+
+        assert events[-1] == "disconnected"
+
+    asyncio.run(run())
+
+class TestResume(unittest.TestCase):
+    def test_resume(self):
+        async def test(server, network, server_events, events):
+            session = server.clients[0]
+            network.send(turn_request(1))
+            await until(lambda: session.received == 1)
+
+            session.websocket.transport.abort()
+            await until(lambda: network.websocket is None)
+            network.send(turn_request(-1))
+
+            await until(lambda: session.received == 2)
+            self.assertIs(server.clients[0], session)
+            self.assertEqual(server_events, ["connected", 1, -1])
+            self.assertEqual(events, ["connected"])
+
+        run_session(test)
+
+    def test_replay_unavailable(self):
+        async def test(server, network, server_events, events):
+            token = network.token
+            session = server.clients[0]
+            for dx in (1, 0, -1):
+                network.send(turn_request(dx))
+                await until(lambda: network.replay.sent == 2 - dx)
+            await until(lambda: session.received == 3)
+
+            # The server has missed the frames, which the client doesn't keep
+            session.received = 0
+            session.websocket.transport.abort()
+
+            await until(lambda: len(events) == 3)
+            self.assertEqual(events, ["connected", "disconnected", "connected"])
+            await until(lambda: network.token is not None)
+            self.assertNotEqual(network.token, token)
+
+            # The half resumed session has ended right away
+            await until(lambda: len(server_events) == 6)
+            self.assertEqual(server_events[4:], ["disconnected", "connected"])
+            self.assertEqual(list(server.sessions), [network.token])
+
+        run_session(test, replay_limit=1)
+
+class TestCompression(unittest.TestCase):
+    def test_deflate(self):
+        async def test(server, network, server_events, events):
+            extensions = [extension.name for extension in network.websocket.extensions]
+            self.assertEqual(extensions, ["permessage-deflate"])
+            self.assertEqual(network.codec.name, "caveworld.binary")
+
+        run_session(test, compression=DEFLATE)
+
+    def test_zlib(self):
+        async def test(server, network, server_events, events):
+            self.assertEqual(network.websocket.extensions, [])
+            self.assertEqual(network.codec.name, "caveworld.binary+zlib")
+
+        run_session(test)
@@ -0,0 +1,127 @@
+"""
+The client's copy of the server's world, kept in sync by the full snapshots
+(`world.PackedDataResponse`, or the streamed `world.Chunk`s) and the
+`world.Delta`s applied in place.
+"""
+
+from shared.net.model import ValidationException
+from shared.packing import PackedWorld
+
+class WorldReplica:
+    """
+    Loads the snapshots and applies the deltas to the `world` (like
+    `shared.world.World`), creating its tiles with `tile(type, z)` and the
+    objects with `object(representation)`.
+
+    `version` is the version of the world's copy, None until the first
+    snapshot was loaded. `requested` is True while a snapshot is on its way,
+    `terrain_changed` is set whenever the tiles' types or heights have changed.
+    `remaining` is the number of the chunks of the streamed world still to be
+    received.
+    """
+    def __init__(self, world, tile, object):
+        self.world = world
+        self.tile = tile
+        self.object = object
+
+        self.version = None
+        self.requested = False
+        self.terrain_changed = False
+        self.remaining = 0
+
+    def request(self):
+        """
+        Called when a snapshot gets requested, so the deltas received
+        meanwhile don't request another one.
+        """
+        self.requested = True
+
+    def load(self, message):
+        """
+        Replaces the world with the snapshot of a `world.PackedDataResponse`.
+        """
+        packed = PackedWorld.from_message(message)
+
+        self.world.new(packed.w, packed.h)
+
+        columns = zip(packed.types.tolist(), packed.heights.tolist())
+        for x, (types, heights) in enumerate(columns):
+            self.world.data[x] = [
+                self.tile(type, z) for type, z in zip(types, heights)
+            ]
+
+        for x, y, representation in packed.objects:
+            self.world.data[x][y].object = self.object(representation)
+
+        self.version = message.version
+        self.requested = False
+        self.terrain_changed = True
+        self.remaining = 0
+
+    def start(self, message):
+        """
+        Starts the streamed world of a `world.StreamStart`, the tiles are
+        empty until their chunks are loaded. The deltas apply meanwhile, the
+        chunks are always newer.
+        """
+        self.world.new(message.width, message.height)
+
+        self.version = message.version
+        self.requested = False
+        self.terrain_changed = True
+        self.remaining = message.chunks
+
+    def load_chunk(self, message):
+        """
+        Replaces the tiles of the streamed world with the `world.Chunk`.
+        """
+        packed = PackedWorld.from_message(message)
+        x0, y0 = message.x, message.y
+        if x0 < 0 or y0 < 0 or x0 + packed.w > self.world.w or y0 + packed.h > self.world.h:
+            raise ValidationException(f"Chunk outside of the world at {x0}, {y0}")
+
+        columns = zip(packed.types.tolist(), packed.heights.tolist())
+        for x, (types, heights) in enumerate(columns):
+            self.world.data[x0 + x][y0:y0 + packed.h] = [
+                self.tile(type, z) for type, z in zip(types, heights)
+            ]
+
+        for x, y, representation in packed.objects:
+            self.world.data[x0 + x][y0 + y].object = self.object(representation)
+
+        self.remaining = max(self.remaining - 1, 0)
+        self.terrain_changed = True
+
+    def apply(self, message):
+        """
+        Applies the `world.Delta` in place, when it's based on the current
+        version (the server may send the tiles which entered the client's area
+        of interest without advancing the version). Deltas already included in
+        the loaded snapshot are ignored.
+
+        Returns True when some deltas were missed and a snapshot has to be
+        requested (`request` should be called then).
+        """
+        if message.base != self.version:
+            if self.version is not None and message.version <= self.version:
+                return False
+            return not self.requested
+
+        for change in message.tiles:
+            tile = self.world.get(change.x, change.y)
+            if tile is None:
+                continue
+
+            if tile.type != change.type or tile.z != change.z:
+                tile.type = change.type
+                tile.z = change.z
+                self.terrain_changed = True
+
+            if change.object is None:
+                tile.object = None
+            elif tile.object is None \
+                or tile.object.representation() != change.object.repr:
+                tile.object = self.object(change.object.repr)
+
+        self.version = message.version
+        return False
@@ -1,8 +1,10 @@
 import unittest
 
-import itertools
+from random import Random
 from uuid import uuid4
 
+from client.ai.knowledge import Knowledge
+
 class Object:
     def __init__(self, traits=None, satisfaction=0):
         self.traits = traits or []
@@ -11,64 +13,86 @@ class Object:
 
     def act_on(self, actor):
         actor.satisfy(self, self.satisfaction)
-    
+
     def get_traits(self):
         return self.traits
 
-class Knowledge:
-    def __init__(self):
-        self.wisdom = {}
-
-    def learn(self, object, satisfaction):
-        traits = frozenset(object.traits)
-        
-        self.wisdom[traits] = self.wisdom.get(traits, 0) + satisfaction
-
-        for i in range(1, len(traits)):
-            for t in itertools.combinations(traits, i):
-                t = frozenset(t)
-                self.wisdom[t] = self.wisdom.get(t, 0) + satisfaction*(i/len(traits))
-
-    def rank(self, traits):
-        traits = frozenset(traits)
-        result = 0
-        for wisdom, rank in self.wisdom.items():
-            if wisdom <= traits:
-                print(wisdom, "contributes", rank, "times", len(wisdom), "=", rank*len(wisdom))
-                result += rank*len(wisdom)
-            else:
-                print(wisdom, "not in", traits)
-
-        return result
-
 
 class Actor:
-    def __init__(self):
+    def __init__(self, knowledge=None):
         self.satisfaction = 0
-        self.knowledge = Knowledge()
+        self.knowledge = knowledge if knowledge is not None else Knowledge()
 
     def satisfy(self, source, satisfaction):
         self.satisfaction += satisfaction
-        self.knowledge.learn(source, satisfaction)        
+        self.knowledge.learn(source, satisfaction)
 
 class TestAI(unittest.TestCase):
-    def test_ai(self):
-        a = Actor()
-
-        o_bad = Object(
+    def setUp(self):
+        self.o_bad = Object(
             {"small", "hard"}, -10
         )
-        
-        o_good = Object(
+
+        self.o_good = Object(
             {"small", "squishy", "soft"}, 10
         )
 
-        o_unknown = Object(
+        self.o_unknown = Object(
             {"small", "squishy", "wooden"}, -20
         )
 
-        o_bad.act_on(a)
-        o_bad.act_on(a)
-        o_good.act_on(a)
+    def test_ai(self):
+        a = Actor()
+
+        self.o_bad.act_on(a)
+        self.o_bad.act_on(a)
+        self.o_good.act_on(a)
         print(a.knowledge.wisdom)
-        print('prediction for', o_unknown.traits, a.knowledge.rank(o_unknown.traits))
\ No newline at end of file
+        print('prediction for', self.o_unknown.traits, a.knowledge.rank(self.o_unknown.traits))
+
+        self.assertAlmostEqual(a.knowledge.rank(self.o_unknown.traits), 10.0)
+        self.assertLess(a.knowledge.rank(self.o_bad.traits), 0)
+        self.assertGreater(a.knowledge.rank(self.o_good.traits), 0)
+
+    def test_max_order(self):
+        a = Actor(Knowledge(max_order=1))
+
+        self.o_bad.act_on(a)
+        self.o_bad.act_on(a)
+        self.o_good.act_on(a)
+
+        self.assertEqual(len(a.knowledge), 6)
+        self.assertAlmostEqual(a.knowledge.rank(self.o_unknown.traits), -10/3)
+
+    def test_many_traits(self):
+        knowledge = Knowledge(max_order=2)
+        knowledge.learn(Object({str(i) for i in range(20)}), 1)
+
+        self.assertEqual(len(knowledge), 1 + 20 + 190)
+
+    def test_sparse(self):
+        a = Actor()
+
+        self.o_good.act_on(a)
+        Object(self.o_good.traits, -10).act_on(a)
+
+        self.assertEqual(len(a.knowledge), 0)
+
+    def test_rank_matches_scan(self):
+        random = Random(0)
+        names = [str(i) for i in range(12)]
+
+        for max_order in (None, 1, 2, 3):
+            knowledge = Knowledge(max_order=max_order)
+            for _ in range(50):
+                traits = random.sample(names, random.randint(1, 8))
+                knowledge.learn(Object(traits), random.choice([-3, -1, 2, 5]))
+
+            for _ in range(50):
+                traits = frozenset(random.sample(names, random.randint(1, 10)))
+                expected = sum(
+                    rank*len(wisdom)
+                    for wisdom, rank in knowledge.wisdom.items()
+                    if wisdom <= traits
+                )
+                self.assertAlmostEqual(knowledge.rank(traits), expected)
@@ -0,0 +1,120 @@
+from client.replica import WorldReplica
+from shared.net.cave_world_protocol import world as protocol
+from shared.net.model import ValidationException
+from shared.packing import pack_region, pack_world
+import unittest
+
+class Object:
+    def __init__(self, representation):
+        self._representation = representation
+
+    def representation(self):
+        return self._representation
+
+class Tile:
+    def __init__(self, type, z=0.0):
+        self.type = type
+        self.z = z
+        self.object = None
+
+class World:
+    def __init__(self, w, h):
+        self.new(w, h)
+
+    def new(self, w, h):
+        self.w = w
+        self.h = h
+        self.data = [[Tile(0) for _ in range(h)] for _ in range(w)]
+
+    def get(self, x, y):
+        if x < 0 or x >= self.w or y < 0 or y >= self.h:
+            return None
+        return self.data[x][y]
+
+def change(x, y, representation=None, type=0, z=0.0):
+    return {
+        "x": x, "y": y, "type": type, "z": z,
+        "object": {"repr": representation} if representation else None
+    }
+
+def delta(base, version, *tiles):
+    return protocol.Delta(base=base, version=version, tiles=list(tiles))
+
+def chunk(world, x, y, width, height):
+    return protocol.Chunk(x=x, y=y, **pack_region(world, x, y, width, height))
+
+class TestWorldReplica(unittest.TestCase):
+    def setUp(self):
+        server = World(3, 3)
+        server.data[1][1].object = Object("stone")
+
+        self.world = World(0, 0)
+        self.replica = WorldReplica(self.world, Tile, Object)
+        self.replica.load(protocol.PackedDataResponse(version=5, **pack_world(server)))
+        self.replica.terrain_changed = False
+
+    def test_load(self):
+        self.assertEqual(self.replica.version, 5)
+        self.assertEqual((self.world.w, self.world.h), (3, 3))
+        self.assertEqual(self.world.data[1][1].object.representation(), "stone")
+
+    def test_apply(self):
+        self.assertFalse(self.replica.apply(delta(5, 6,
+            change(1, 1),
+            change(0, 2, "caveman"),
+        )))
+        self.assertEqual(self.replica.version, 6)
+        self.assertIsNone(self.world.data[1][1].object)
+        self.assertEqual(self.world.data[0][2].object.representation(), "caveman")
+        self.assertFalse(self.replica.terrain_changed)
+
+        self.replica.apply(delta(6, 7, change(2, 2, type=1, z=3.0)))
+        self.assertEqual((self.world.data[2][2].type, self.world.data[2][2].z), (1, 3.0))
+        self.assertTrue(self.replica.terrain_changed)
+
+    def test_stale(self):
+        # Already included in the snapshot
+        self.assertFalse(self.replica.apply(delta(4, 5, change(1, 1))))
+        self.assertEqual(self.world.data[1][1].object.representation(), "stone")
+
+    def test_gap(self):
+        self.assertTrue(self.replica.apply(delta(6, 7, change(1, 1))))
+        self.assertEqual(self.replica.version, 5)
+        self.assertEqual(self.world.data[1][1].object.representation(), "stone")
+
+        self.replica.request()
+        self.assertFalse(self.replica.apply(delta(7, 8, change(1, 1))))
+
+    def test_same_version(self):
+        # Tiles which entered the area of interest, without any changes
+        self.assertFalse(self.replica.apply(delta(5, 5, change(1, 1))))
+        self.assertIsNone(self.world.data[1][1].object)
+        self.assertEqual(self.replica.version, 5)
+
+    def test_stream(self):
+        server = World(4, 4)
+        server.data[3][2].object = Object("stone")
+        for x in range(4):
+            for y in range(4):
+                server.data[x][y].type = x
+                server.data[x][y].z = float(y)
+
+        self.replica.start(protocol.StreamStart(version=8, width=4, height=4, chunks=4))
+        self.assertEqual((self.world.w, self.world.h), (4, 4))
+        self.assertEqual((self.replica.version, self.replica.remaining), (8, 4))
+
+        self.replica.load_chunk(chunk(server, 2, 2, 2, 2))
+        self.assertEqual(self.world.data[3][2].object.representation(), "stone")
+        self.assertEqual((self.world.data[3][3].type, self.world.data[3][3].z), (3, 3.0))
+        self.assertEqual(self.world.data[1][1].type, 0)
+        self.assertEqual(self.replica.remaining, 3)
+
+        # The deltas apply to the chunks not received yet as well
+        self.assertFalse(self.replica.apply(delta(8, 9, change(0, 0, "caveman"))))
+        self.assertEqual(self.world.data[0][0].object.representation(), "caveman")
+
+        with self.assertRaises(ValidationException):
+            # Sticking out of the world
+            self.replica.load_chunk(protocol.Chunk(
+                x=3, y=3, **pack_region(server, 2, 2, 2, 2)
+            ))
@@ -1,8 +1,13 @@
 from shared.engine import Engine
 from server.main import Main
 
+import asyncio
 import sys
 
+# Networking, the messages and the ticks all run on a single event loop
+single_loop = "--single-loop" in sys.argv
+args = [arg for arg in sys.argv[1:] if arg != "--single-loop"]
+
 with Engine() as e:
     e.create_window("Cave World - server", 1024, 768)
     s = e.new_state(Main)
@@ -10,14 +15,17 @@ with Engine() as e:
     address = "localhost"
     port = 5505
 
-    if len(sys.argv) > 1:
-        address = sys.argv[1]
+    if len(args) > 0:
+        address = args[0]
     
-    if len(sys.argv) > 2:
-        port = int(sys.argv[2])
+    if len(args) > 1:
+        port = int(args[1])
 
     print("Serving on ", address, ":", port)
 
-    s.host(address, port)
+    if single_loop:
+        asyncio.run(s.serve(address, port))
+    else:
+        s.host(address, port)
 
-    e.loop()
\ No newline at end of file
+        e.loop()
\ No newline at end of file
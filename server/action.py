@@ -0,0 +1,216 @@
+"""
+Actions which the actors can perform during their turns and the engine
+which executes them.
+
+Actions are created from the `TurnRequest` messages, submitted to the
+`ActionEngine` and applied when the engine gets executed (once per server
+update). Validation uses tables precomputed from
+the world's terrain, so checking a move is a couple of lookups instead of
+inspecting the neighbouring tiles every time.
+"""
+
+from abc import ABC, abstractmethod
+
+from shared import rules
+from shared.stats import Stats
+
+class ActionError(Exception):
+    """
+    Thrown when an action can't be performed in the current world's state.
+    The message is sent back to the client as the reason of the failure.
+    """
+    pass
+
+class Action(ABC):
+    """
+    Superclass of all actions, `name` corresponds to the action's type in the
+    protocol's `Action` model.
+    """
+    name = None
+
+    def __init__(self, dx=0, dy=0):
+        self.dx = dx
+        self.dy = dy
+
+    @staticmethod
+    def from_message(message):
+        """
+        Creates the action described by the protocol's `Action` model.
+        """
+        return ACTIONS[message.type](message.dx, message.dy)
+
+    def target(self, actor):
+        """
+        Returns the coordinates of the tile this action refers to.
+        """
+        return int(actor.x) + self.dx, int(actor.y) + self.dy
+
+    def check_direction(self, table, engine, actor):
+        """
+        Checks that the direction is allowed by the provided precomputed
+        table of the engine.
+        """
+        bit = rules.DIRECTION_BITS.get((self.dx, self.dy))
+        if bit is None:
+            raise ActionError(f"Invalid direction ({self.dx}, {self.dy})")
+
+        if not table[engine.index(int(actor.x), int(actor.y))] & bit:
+            raise ActionError("The target tile can't be reached")
+
+    @abstractmethod
+    def validate(self, engine, actor):
+        """
+        Throws `ActionError` when the action can't be performed by the actor.
+        """
+        pass
+
+    @abstractmethod
+    def apply(self, engine, actor):
+        """
+        Mutates the world, called only after a successful validation.
+        Can still throw `ActionError` when the world refuses the action.
+        """
+        pass
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.dx}, {self.dy})"
+
+class Move(Action):
+    name = "move"
+
+    def validate(self, engine, actor):
+        self.check_direction(engine.moves, engine, actor)
+
+        x, y = self.target(actor)
+        if engine.world.data[x][y].object is not None:
+            raise ActionError("The target tile is occupied")
+
+    def apply(self, engine, actor):
+        actor.move_to(*self.target(actor))
+
+class Eat(Action):
+    name = "eat"
+
+    def validate(self, engine, actor):
+        self.check_direction(engine.neighbours, engine, actor)
+
+        x, y = self.target(actor)
+        if engine.world.data[x][y].object is None:
+            raise ActionError("There is nothing to eat")
+
+    def apply(self, engine, actor):
+        x, y = self.target(actor)
+        tile = engine.world.data[x][y]
+        if not tile.object.on_eat(actor):
+            raise ActionError("The object can't be eaten")
+        engine.world.set_object(x, y, None)
+
+class PickUp(Action):
+    name = "pick_up"
+
+    def validate(self, engine, actor):
+        self.check_direction(engine.neighbours, engine, actor)
+
+        x, y = self.target(actor)
+        if engine.world.data[x][y].object is None:
+            raise ActionError("There is nothing to pick up")
+
+    def apply(self, engine, actor):
+        x, y = self.target(actor)
+        tile = engine.world.data[x][y]
+        if not tile.object.on_pick_up(actor):
+            raise ActionError("The object can't be picked up")
+        actor.inventory.append(tile.object)
+        engine.world.set_object(x, y, None)
+
+class Wait(Action):
+    name = "wait"
+
+    def validate(self, engine, actor):
+        pass
+
+    def apply(self, engine, actor):
+        pass
+
+ACTIONS = {
+    action.name: action for action in (Move, Eat, PickUp, Wait)
+}
+
+class ActionEngine:
+    """
+    Validates and applies the submitted actions, at most one per actor.
+
+    The time spent on every action is recorded in `latency` (per action
+    type).
+    """
+    def __init__(self, world):
+        self.world = world
+        # The submitted actions by their actors, in the submission order
+        self.pending = {}
+
+        self.latency = {name: Stats() for name in ACTIONS}
+
+        self.moves = None
+        self.neighbours = None
+        self.build_tables()
+
+    def index(self, x, y):
+        return x * self.world.h + y
+
+    def build_tables(self):
+        """
+        Precomputes the tables of directions allowed from every tile (see
+        `shared.rules.movement_tables`).
+
+        Has to be called again whenever the terrain changes.
+        """
+        self.moves, self.neighbours = rules.movement_tables(self.world)
+
+    def submit(self, actor, action):
+        """
+        Queues the action to be executed by the next `execute`.
+        Throws `ActionError` when the actor already has a pending action.
+        """
+        if actor in self.pending:
+            raise ActionError("An action was already submitted this turn")
+
+        self.pending[actor] = action
+
+    def is_pending(self, actor):
+        return actor in self.pending
+
+    def discard(self, actor):
+        """
+        Removes the pending action of the actor, e.g. when it leaves.
+        """
+        self.pending.pop(actor, None)
+
+    def execute(self):
+        """
+        Validates and applies all of the pending actions in the submission
+        order.
+
+        Returns a list of `(actor, action, error)` tuples, where `error` is
+        None for actions which succeeded.
+        """
+        results = []
+        pending, self.pending = self.pending, {}
+
+        for actor, action in pending.items():
+            error = None
+            with self.latency[action.name].time():
+                try:
+                    action.validate(self, actor)
+                    action.apply(self, actor)
+                except ActionError as e:
+                    error = str(e)
+
+            results.append((actor, action, error))
+
+        return results
+
+    def report(self):
+        """
+        Returns a human readable summary of the measured latencies.
+        """
+        return "\n".join(f"{name}: {stats}" for name, stats in self.latency.items())
@@ -11,9 +11,9 @@ class Metabolism:
     The rate at which actor's needs change.
     """
     def __init__(self, hunger_rate, thirst_rate, cold_rate):
-        self.hunger_rate = 0
-        self.thirst_rate = 0
-        self.cold_rate = 0
+        self.hunger_rate = hunger_rate
+        self.thirst_rate = thirst_rate
+        self.cold_rate = cold_rate
 
 class Sense:
     def __init__(self, name, range):
@@ -27,6 +27,9 @@ class Actor(SharedActor, Object):
 
         self.metabolism = Metabolism(0, 0, 0)
         self.senses = {}
+        self.inventory = []
+
+        self.condition.health = 100.0
 
         self.client = client
         self.world = world
@@ -34,6 +37,15 @@ class Actor(SharedActor, Object):
     def add_sense(self, sense):
         self.senses[sense.name] = sense
 
+    def metabolize(self):
+        """
+        Applies the metabolism's rates to the actor's condition, called after
+        every turn the actor has taken.
+        """
+        self.condition.hunger += self.metabolism.hunger_rate
+        self.condition.thirst += self.metabolism.thirst_rate
+        self.condition.temperature -= self.metabolism.cold_rate
+
     def move_to(self, new_x, new_y):
         self.detach()
         self.x = new_x
@@ -51,10 +63,10 @@ class Actor(SharedActor, Object):
             return
 
         if t.object == None:
-            t.object = self
+            self.world.set_object(x, y, self)
 
     def detach(self):
-        if not self.x or not self.y:
+        if self.x is None or self.y is None:
             return False
 
         x, y = int(self.x), int(self.y)
@@ -63,7 +75,7 @@ class Actor(SharedActor, Object):
             return False
             
         if t.object == self:
-            t.object = None
+            self.world.set_object(x, y, None)
             return True
         return False
 
@@ -103,6 +115,7 @@ class Actor(SharedActor, Object):
 class CaveMan(Actor):
     def __init__(self, client, world):
         super().__init__(client, world, "caveman")
+        self.metabolism = Metabolism(1.0, 0, 0)
         self.add_sense(Sense("sight", 10))
         self.add_sense(Sense("smell", 5))
         self.add_sense(Sense("hearing", 30))
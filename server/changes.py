@@ -0,0 +1,63 @@
+"""
+Log of the changes of the server's world, which are sent to the clients as
+`world.Delta`s instead of the whole world.
+"""
+
+from shared.net.cave_world_protocol.world import Delta as WorldDelta
+
+def tile_change(world, x, y):
+    """
+    Returns the `world.TileChange` fields of the current state of the tile.
+    """
+    tile = world.data[x][y]
+    return {
+        "x": x,
+        "y": y,
+        "type": int(tile.type),
+        "z": float(tile.z),
+        "object": {
+            "repr": tile.object.representation()
+        } if tile.object is not None else None
+    }
+
+def delta(world, base, version, positions):
+    """
+    Returns the `world.Delta` from the `base` to the `version` of the world,
+    with the current state of the tiles at the positions.
+    """
+    return WorldDelta.trusted(
+        base=base,
+        version=version,
+        tiles=[tile_change(world, x, y) for x, y in positions]
+    )
+
+class ChangeLog:
+    """
+    Collects the positions of the tiles changed since the last `flush`.
+
+    `version` is the version of the world, it's advanced by every flush
+    which had any changes.
+    """
+    def __init__(self):
+        self.version = 0
+        self.changed = {}
+
+    def mark(self, x, y):
+        self.changed[(x, y)] = None
+
+    def __len__(self):
+        return len(self.changed)
+
+    def flush(self):
+        """
+        Returns the list of the positions changed since the last call (in the
+        order of their first change) and advances the version, when there were
+        any.
+        """
+        if not self.changed:
+            return []
+
+        changed = list(self.changed)
+        self.changed = {}
+        self.version += 1
+        return changed
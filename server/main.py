@@ -14,9 +14,11 @@ from shared.net.cave_world_protocol import \
     actor, client, world
 from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
 from shared.state import State
+from server.sync import WorldSync
 from server.turn import TurnManager
 from server.world import World
 from queue import Queue, Empty
+from sdl2 import SDLK_l
 
 class Main(State):
     def __init__(self, engine : Engine):
@@ -34,13 +36,18 @@ class Main(State):
             ClientDisconnected: self.on_client_disconnected,
             client.Introduction: self.on_client_introduction,
             actor.ActorRequest: self.on_actor_request,
-            world.DataRequest: self.on_world_request
+            world.DataRequest: self.on_world_request,
+            world.Watch: self.on_watch,
+            world.StreamRequest: self.on_stream_request,
+            world.StreamAck: self.on_stream_ack
         })
 
-        self.turn_manager = TurnManager(self)
-
         self.world = World(self.canvas, 32, 32)
         self.world.generate()
+        self.sync = WorldSync(self.world, self.network)
+
+        self.turn_manager = TurnManager(self)
+        self.tick_scheduled = False
 
     def on_client_introduction(self, message, client):
         print("Client introduction!")
@@ -51,15 +58,28 @@ class Main(State):
 
     def on_client_disconnected(self, message, client):
         print("Client disconnected!", client)
+        self.sync.remove(client)
         if "actor" in client:
             self.turn_manager.unregister_client(client)
             if not client["actor"].detach():
                 print("Error detaching actor!")
-            self.network.broadcast(self.world.construct_world_data_response())
 
     def on_world_request(self, message, client):
         print('Client', client, 'requests world data!')
-        self.network.send_to(client, self.world.construct_world_data_response())
+        self.sync.snapshot(client)
+
+    def on_stream_request(self, message, client):
+        print('Client', client, 'requests the world streamed!')
+        self.sync.stream(
+            client, message.x, message.y, message.width, message.height,
+            message.window
+        )
+
+    def on_stream_ack(self, message, client):
+        self.sync.acknowledge(client, message.count)
+
+    def on_watch(self, message, client):
+        self.sync.watch(client, message.x, message.y, message.width, message.height)
 
     def on_actor_request(self, message, client):
         from random import randint
@@ -79,15 +99,44 @@ class Main(State):
         print("Created actor at",x, y)
         actor.attach()
         self.turn_manager.register_actor(actor)
-
-        self.network.broadcast(self.world.construct_world_data_response())
-
+        self.sync.follow(client, actor)
 
     def host(self, address, port):
         self.network.host(address, port)
 
+    async def serve(self, address, port):
+        """
+        Runs the server on the running event loop, together with the engine's
+        frames: the messages are handled as soon as they arrive and the world
+        ticks right after them, instead of once per frame.
+        """
+        self.network.threaded = False
+        self.network.on_dispatch = self.schedule_tick
+        await self.network.serve(address, port)
+        await self.engine.loop_async()
+
+    def schedule_tick(self):
+        """
+        Schedules a tick on the event loop, all of the messages handled
+        until then are handled by that single tick.
+        """
+        if self.tick_scheduled:
+            return
+
+        self.tick_scheduled = True
+        asyncio.get_running_loop().call_soon(self.tick)
+
+    def tick(self):
+        self.tick_scheduled = False
+        self.turn_manager.update()
+
+        # All of the changes of the tick go out as a single delta per client
+        self.sync.update()
+        self.network.flush()
+
     def update(self, dt):
         self.network.process()
+        self.tick()
 
     def draw(self):
         self.canvas.set_color_rgb(0, 0, 0)
@@ -103,7 +152,11 @@ class Main(State):
         self.canvas.restore()
 
     def key_pressed(self, key):
-        pass
+        if key == SDLK_l:
+            print(self.turn_manager.engine.report())
+            print(self.network.compression_stats.report())
+            print(self.network.queue_stats.report())
+            print(self.network.request_stats.report())
 
     def key_released(self, key):
         pass
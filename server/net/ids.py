@@ -0,0 +1,41 @@
+"""
+Allocation of the connections' ids.
+"""
+
+class IdAllocator:
+    """
+    Hands out the ids which aren't in use, reusing the released ones through
+    a free list, so neither `allocate` nor `release` depends on the number
+    of the ids in use.
+
+    Example:
+    ```
+    ids = IdAllocator()
+    a = ids.allocate() # 0
+    b = ids.allocate() # 1
+    ids.release(a)
+    c = ids.allocate() # 0 again
+    ```
+    """
+    def __init__(self):
+        # The released ids, reused before any new one
+        self.free = []
+        # The next never used id
+        self.next = 0
+
+    def allocate(self):
+        if self.free:
+            return self.free.pop()
+
+        id = self.next
+        self.next += 1
+        return id
+
+    def release(self, id):
+        self.free.append(id)
+
+    def __len__(self):
+        """
+        Number of the ids in use.
+        """
+        return self.next - len(self.free)
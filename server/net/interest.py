@@ -0,0 +1,122 @@
+"""
+Area of interest management: which clients are interested in which parts of
+the world.
+
+The world is divided into square chunks and every chunk keeps the set of its
+subscribers, so routing an update to the interested clients costs a single
+lookup, regardless of the number of clients.
+"""
+
+class InterestGrid:
+    """
+    Grid of the subscribers by chunk. A subscriber (e.g. a `Client`) can
+    subscribe to many rectangular regions, every one under its own `key`
+    (e.g. the region around its actor and its camera's view).
+    """
+    def __init__(self, chunk_size=8):
+        self.chunk_size = chunk_size
+
+        # Subscribers of every chunk, keyed by `(cx, cy)`
+        self.chunks = {}
+        # Chunks of every region, by the subscriber and the region's key
+        self.regions = {}
+        # Chunks covered by all of the regions, by the subscriber
+        self.covered = {}
+
+    def chunk(self, x, y):
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def chunks_in(self, x0, y0, x1, y1):
+        """
+        Returns the set of chunks which contain any of the tiles in the
+        rectangle (inclusive).
+        """
+        cx0, cy0 = self.chunk(x0, y0)
+        cx1, cy1 = self.chunk(x1, y1)
+        return {
+            (cx, cy)
+            for cx in range(cx0, cx1 + 1)
+            for cy in range(cy0, cy1 + 1)
+        }
+
+    def chunk_bounds(self, chunk):
+        """
+        Returns the `(x0, y0, x1, y1)` bounds (inclusive) of the chunk's tiles.
+        """
+        cx, cy = chunk
+        s = self.chunk_size
+        return (cx * s, cy * s, cx * s + s - 1, cy * s + s - 1)
+
+    def subscribe(self, subscriber, key, x0, y0, x1, y1):
+        """
+        Subscribes (or moves the subscriber's region of the `key`) to the
+        rectangle of tiles (inclusive).
+
+        Returns `(added, removed)`, the sets of chunks the subscriber got
+        subscribed to and unsubscribed from.
+        """
+        regions = self.regions.setdefault(subscriber, {})
+        chunks = self.chunks_in(x0, y0, x1, y1)
+        if regions.get(key) == chunks:
+            return set(), set()
+
+        regions[key] = chunks
+        return self._update(subscriber)
+
+    def unsubscribe(self, subscriber, key=None):
+        """
+        Removes the subscriber's region of the `key`, or all of its regions
+        when the `key` is None.
+
+        Returns the set of chunks the subscriber got unsubscribed from.
+        """
+        regions = self.regions.get(subscriber)
+        if regions is None:
+            return set()
+
+        if key is None:
+            regions.clear()
+        else:
+            regions.pop(key, None)
+
+        _, removed = self._update(subscriber)
+        if not regions:
+            del self.regions[subscriber]
+            del self.covered[subscriber]
+        return removed
+
+    def _update(self, subscriber):
+        old = self.covered.get(subscriber, set())
+        new = set().union(*self.regions[subscriber].values())
+        self.covered[subscriber] = new
+
+        removed = old - new
+        for chunk in removed:
+            subscribers = self.chunks[chunk]
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.chunks[chunk]
+
+        added = new - old
+        for chunk in added:
+            self.chunks.setdefault(chunk, set()).add(subscriber)
+
+        return added, removed
+
+    def subscribers(self, x, y):
+        """
+        Returns the set of subscribers interested in the tile.
+        """
+        return self.chunks.get(self.chunk(x, y), set())
+
+    def route(self, positions):
+        """
+        Returns a dict of the list of positions every subscriber is interested
+        in, out of the provided ones. Subscribers not interested in any of them
+        are left out.
+        """
+        routed = {}
+        for x, y in positions:
+            for subscriber in self.chunks.get(self.chunk(x, y), ()):
+                routed.setdefault(subscriber, []).append((x, y))
+        return routed
@@ -1,11 +1,20 @@
 import asyncio
-import json
+import secrets
 import websockets
 
 from queue import Queue, Empty
 from threading import Thread
+from urllib.parse import parse_qs, urlsplit
 
+from shared.net.codec import ZLIB, CompressionStats, codec_for, \
+    subprotocols, websocket_compression
+from server.net.ids import IdAllocator
+from shared.net.network.batch import FrameEncoder, add
+from shared.net.cave_world_protocol.session import ResumeResult, Session
 from shared.net.network.network import Network
+from shared.net.network.replay import ReplayBuffer
+from shared.net.network.requests import SERVER, Requests, RequestStats, correlate
+from shared.net.network.send_queue import COALESCE, QueueStats, SendQueue
 from shared.net.protocol import Protocol
 
 class ClientConnected:
@@ -20,13 +29,47 @@ class ClientDisconnected:
     """
     pass
 
+class ClientDetached:
+    """
+    Marker class for binding to the event of a client's connection dropping,
+    while its session is kept for it to resume (see `ServerNetwork`).
+    """
+    pass
+
+class ClientResumed:
+    """
+    Marker class for binding to the event of a detached client resuming its
+    session.
+    """
+    pass
+
 class Client:
-    def __init__(self, id, websocket):
+    """
+    A client's session: it outlives the connection (`websocket`), which is
+    None while the client is reconnecting.
+    """
+    def __init__(self, id, websocket, codec, limit=None, policy=COALESCE, stats=None,
+                 replay=None, requests=None):
         self.id = id
         self.websocket = websocket
-        self.send_queue = Queue()
+        self.codec = codec
+        self.outbox = []
+        self.send_queue = SendQueue(asyncio.get_event_loop(), limit, policy, stats)
+        self.closing = False
         self.userdata = {}
 
+        # Token of the resumable session
+        self.token = None
+        # Frames sent to the client, numbered (see `shared.net.network.replay`)
+        self.replay = replay if replay is not None else ReplayBuffer()
+        # Number of the frames received from the client
+        self.received = 0
+        # Number of the connections of the session so far
+        self.connections = 1
+        self.sender_task = None
+        # The server's requests waiting for the client's responses
+        self.requests = requests if requests is not None else Requests(SERVER)
+
     def __getitem__(self, key):
         return self.userdata[key]
 
@@ -36,66 +79,217 @@ class Client:
     def __contains__(self, key):
         return key in self.userdata
 
-    def _send_data(self, data):
+    def _send_data(self, data, critical=True):
         # await self.websocket.send(data)
-        self.send_queue.put(data)
+        return self.send_queue.put(data, critical)
+
+    def close(self, code=1013, reason="Too slow"):
+        """
+        Closes the connection, can be called from any thread.
+        """
+        if self.closing:
+            return
+
+        self.closing = True
+        if self.websocket is not None:
+            asyncio.run_coroutine_threadsafe(
+                self.websocket.close(code, reason), self.send_queue.loop
+            )
 
     async def recv(self, data):
         await self.websocket.recv()
 
     async def sender(self, network):
+        websocket = self.websocket
         while True:
-            await asyncio.sleep(0.01)
-            try:
-                item = self.send_queue.get_nowait()
-                await self.websocket.send(item)
-
-            except Empty:
-                pass
+            items = await self.send_queue.get_all()
+            # Numbered before sending, so the ones lost on the way get replayed
+            for item in items:
+                self.replay.add(item)
+            for item in items:
+                await websocket.send(item)
 
     async def receiver(self, network):
+        websocket = self.websocket
         while True:
-            network.receive(self, await self.websocket.recv())
+            data = await websocket.recv()
+            self.received += 1
+            network.receive(self, data)
 
     def __repr__(self):
         return f"Client({self.id})"
 
 class ServerNetwork(Network):
-    def __init__(self, protocol : Protocol):
+    """
+    `compression` is the compression mode offered to the clients (see
+    `shared.net.codec`), the measurements of the `ZLIB` one are collected
+    in `compression_stats`.
+
+    The sent messages are batched: they're queued in the clients' outboxes,
+    coalesced (see `Message.coalesce`) and only sent by `flush`, which should
+    be called once per tick.
+
+    The clients' send queues hold at most `queue_limit` frames, what happens
+    when a client doesn't keep up is decided by the `policy` (see
+    `shared.net.network.send_queue`), the depths of the queues are measured
+    in `queue_stats`. With the `COALESCE` policy the messages of a client
+    with a full queue are held back in its outbox, coalescing, until the
+    client catches up - it's disconnected only if they can't be coalesced
+    and pile up anyway.
+
+    The connected clients are registered in `clients` by their ids.
+
+    By default (`threaded=True`) the server runs on its own thread, started
+    by `host`, and the received messages are queued until `process` is called
+    from the main thread.
+
+    With `threaded=False` the server is expected to be run on an already
+    running event loop (`serve`), shared with the simulation, and the bound
+    callbacks are called right upon receiving the messages, on the event
+    loop. `on_dispatch` (if set) is called afterwards, e.g. to schedule
+    a tick.
+
+    When a client's connection drops, its session (the `Client`, with its
+    user data) is kept for `resume_grace` seconds: a client reconnecting with
+    the session's token within that time is sent only the frames it has
+    missed (at most `replay_limit` of the last ones are kept) and carries on,
+    otherwise `ClientDisconnected` is emitted. `ClientDetached` and
+    `ClientResumed` are emitted meanwhile. A zero `resume_grace` disables
+    resuming. A client closing its connection normally ends its session
+    right away.
+
+    The server can `request` a response from a client, and answers the
+    clients' requests with `respond` (see `shared.net.network.requests`),
+    their latencies are measured in `request_stats`.
+    """
+    def __init__(self, protocol : Protocol, compression=ZLIB,
+                 queue_limit=256, policy=COALESCE, threaded=True,
+                 resume_grace=30.0, replay_limit=1024):
         super().__init__()
 
         self.thread = None
-        self.clients = []
+        self.threaded = threaded
+        self.on_dispatch = None
+        self.clients = {}
+        self.ids = IdAllocator()
+        self.resume_grace = resume_grace
+        self.replay_limit = replay_limit
+        # The resumable sessions by their tokens
+        self.sessions = {}
 
         self.protocol = protocol
+        self.compression = compression
+        self.compression_stats = CompressionStats()
+        self.queue_limit = queue_limit
+        self.policy = policy
+        self.queue_stats = QueueStats()
+        self.request_stats = RequestStats()
         self.receive_queue = Queue()
 
     def send_to(self, client, message):
-        packet = self.protocol.wrap(message)
-        client._send_data(json.dumps(packet))
+        add(client.outbox, message)
     
     def send_to_id(self, client_id, message):
         self.send_to(self.clients[client_id], message)
+
+    def request(self, client, message):
+        """
+        Sends the message (built for this request only) to the client, returns
+        the future of the client's response, which isn't passed to the bound
+        callback. It fails with `ConnectionError` if the client disconnects
+        first.
+        """
+        future = client.requests.start(message)
+        self.send_to(client, message)
+        return future
+
+    def respond(self, client, request, message):
+        """
+        Sends the client the message in response to its request. The message
+        has to be built for this response only (see `correlate`).
+        """
+        correlate(message, request.correlation)
+        self.send_to(client, message)
     
+    def live_clients(self):
+        """
+        Returns a list of the connected clients.
+
+        The clients connect and disconnect on the network thread, so the
+        registry is copied rather than iterated over directly.
+        """
+        return list(self.clients.values())
+
     def broadcast(self, message):
-        for client in self.clients:
-            if client is None:
+        """
+        Sends the message to every client. It's encoded only once per codec
+        by `flush` and the same (immutable) data is queued for all of the
+        clients using that codec.
+        """
+        for client in self.live_clients():
+            add(client.outbox, message)
+
+    def flush(self):
+        """
+        Sends every client the batch of the messages sent to it since the
+        last call, as a single frame.
+        """
+        encoder = FrameEncoder()
+        for client in self.live_clients():
+            if not client.outbox or client.closing:
                 continue
-                
-            self.send_to(client, message)
+
+            queue = client.send_queue
+            if queue.policy == COALESCE and queue.full():
+                if len(client.outbox) > queue.limit:
+                    self.overflow(client)
+                continue
+
+            batch, client.outbox = client.outbox, []
+            critical = any(message.critical for message in batch)
+            if not client._send_data(encoder.frame(client.codec, batch), critical):
+                self.overflow(client)
+
+    def overflow(self, client):
+        """
+        Disconnects the client which doesn't keep up with the sent messages.
+        """
+        print(f"{client} doesn't keep up, disconnecting")
+        client.outbox = []
+        client.close()
 
     def receive(self, client, data):
-        message = self.protocol.unwrap(json.loads(data))
-        self.receive_queue.put((client, message))
+        for message in client.codec.decode_all(data):
+            self.receive_message(client, message)
 
     def receive_message(self, client, message):
+        if not self.threaded:
+            self.dispatch(client, message)
+            if self.on_dispatch is not None:
+                self.on_dispatch()
+            return
+
         self.receive_queue.put((client, message))
 
+    def dispatch(self, client, message):
+        if not client.requests.complete(message):
+            self.call(message, client)
+
+    async def serve(self, address, port):
+        """
+        Starts serving on the running event loop, returns the websockets'
+        server.
+        """
+        return await websockets.serve(
+            self.handle_client_connection, address, port,
+            subprotocols=subprotocols(self.compression),
+            compression=websocket_compression(self.compression, server=True)
+        )
+
     def host(self, address,port):
         def thread():
             asyncio.set_event_loop(asyncio.new_event_loop())
-            server = websockets.serve(self.handle_client_connection, address, port)
-            asyncio.get_event_loop().run_until_complete(server)
+            asyncio.get_event_loop().run_until_complete(self.serve(address, port))
             asyncio.get_event_loop().run_forever()
 
         self.thread = Thread(target=thread)
@@ -104,27 +298,127 @@ class ServerNetwork(Network):
     def process(self):
         while not self.receive_queue.empty():
             client, message = self.receive_queue.get()
-            self.call(message, client)
+            self.dispatch(client, message)
 
     async def handle_client_connection(self, ws, path):
-        id = 0
-        for c in self.clients:
-            if c is None:
-                break
-            id += 1
-        else:
-            self.clients.append(None)
+        codec = codec_for(ws.subprotocol, self.protocol, self.compression_stats)
 
-        c = Client(id, ws)
-        self.clients[id] = c
+        client = None
+        request = resume_request(path)
+        if request is not None:
+            client = await self.resume(ws, codec, *request)
+        if client is None:
+            client = self.connect(ws, codec)
 
-        self.receive_message(c, ClientConnected())
-        
+        sender = client.sender_task = asyncio.ensure_future(client.sender(self))
         try:
-            await asyncio.gather(
-                c.sender(self),
-                c.receiver(self)
-            )
-        except websockets.exceptions.ConnectionClosed:
-            self.receive_message(c, ClientDisconnected())
-            self.clients[id] = None
\ No newline at end of file
+            await client.receiver(self)
+        except websockets.exceptions.ConnectionClosed as e:
+            if e.rcvd is not None and e.rcvd.code == 1000:
+                # The client has ended the session itself
+                client.closing = True
+        finally:
+            # Not `client.sender_task`, which a resume may have replaced
+            sender.cancel()
+            # Unless the session was resumed on another connection meanwhile
+            if client.websocket is ws:
+                self.detach(client)
+
+    def connect(self, ws, codec):
+        """
+        Starts a new session on the connection.
+        """
+        id = self.ids.allocate()
+        client = Client(
+            id, ws, codec, self.queue_limit, self.policy, self.queue_stats,
+            ReplayBuffer(self.replay_limit),
+            Requests(SERVER, self.threaded, self.request_stats)
+        )
+        self.clients[id] = client
+
+        if self.resume_grace > 0:
+            client.token = secrets.token_urlsafe(16)
+            self.sessions[client.token] = client
+            client._send_data(codec.encode(Session.trusted(token=client.token)))
+
+        self.receive_message(client, ClientConnected())
+        return client
+
+    async def resume(self, ws, codec, token, received):
+        """
+        Resumes the session on the new connection, after the `received`
+        frames the client has got. Returns the session's client, or None
+        when it can't be resumed.
+        """
+        client = self.sessions.get(token)
+        frames = None
+        if client is not None and not client.closing and client.codec.name == codec.name:
+            frames = client.replay.since(received)
+
+        if frames is None:
+            await ws.send(codec.encode(ResumeResult.trusted(success=False, received=0)))
+            if client is not None and client.websocket is None:
+                self.disconnect(client)
+            return None
+
+        if client.sender_task is not None:
+            # Whatever it has taken is numbered already, so it's in `frames`
+            client.sender_task.cancel()
+
+        previous, client.websocket = client.websocket, ws
+        client.connections += 1
+        if previous is not None:
+            asyncio.ensure_future(previous.close())
+        else:
+            self.receive_message(client, ClientResumed())
+
+        await ws.send(codec.encode(ResumeResult.trusted(success=True, received=client.received)))
+        for frame in frames:
+            await ws.send(frame)
+        return client
+
+    def detach(self, client):
+        """
+        Called when the client's connection has dropped, keeps its session
+        for the grace period.
+        """
+        if client.token is None or client.closing:
+            self.disconnect(client)
+            return
+
+        client.websocket = None
+        asyncio.get_event_loop().call_later(
+            self.resume_grace, self.expire, client, client.connections
+        )
+        self.receive_message(client, ClientDetached())
+
+    def expire(self, client, connections):
+        # Unless it was resumed meanwhile
+        if client.websocket is None and client.connections == connections:
+            self.disconnect(client)
+
+    def disconnect(self, client):
+        """
+        Ends the client's session.
+        """
+        self.sessions.pop(client.token, None)
+        if self.clients.get(client.id) is client:
+            self.receive_message(client, ClientDisconnected())
+            del self.clients[client.id]
+            self.ids.release(client.id)
+            client.requests.fail(ConnectionError(f"{client} has disconnected"))
+
+def resume_request(path):
+    """
+    Returns the `(token, received)` of the request to resume a session
+    (`/resume?token=...&received=...`), or None.
+    """
+    url = urlsplit(path)
+    if url.path != "/resume":
+        return None
+
+    query = parse_qs(url.query)
+    try:
+        return query["token"][0], int(query["received"][0])
+    except (KeyError, ValueError):
+        return None
\ No newline at end of file
@@ -0,0 +1,32 @@
+from server.net.ids import IdAllocator
+import unittest
+
+class TestIdAllocator(unittest.TestCase):
+    def test_allocate(self):
+        ids = IdAllocator()
+        self.assertEqual([ids.allocate() for _ in range(3)], [0, 1, 2])
+        self.assertEqual(len(ids), 3)
+
+    def test_reuse(self):
+        ids = IdAllocator()
+        for _ in range(4):
+            ids.allocate()
+        ids.release(1)
+        ids.release(3)
+
+        self.assertEqual(len(ids), 2)
+        self.assertEqual({ids.allocate(), ids.allocate()}, {1, 3})
+        self.assertEqual(ids.allocate(), 4)
+
+    def test_churn(self):
+        ids = IdAllocator()
+        live = {ids.allocate() for _ in range(100)}
+        for id in list(live)[:50]:
+            live.remove(id)
+            ids.release(id)
+        for _ in range(50):
+            id = ids.allocate()
+            self.assertNotIn(id, live)
+            live.add(id)
+
+        self.assertEqual(live, set(range(100)))
@@ -0,0 +1,53 @@
+from server.net.interest import InterestGrid
+import unittest
+
+class TestInterestGrid(unittest.TestCase):
+    def test_subscribe(self):
+        grid = InterestGrid(chunk_size=4)
+
+        added, removed = grid.subscribe("a", "actor", 2, 2, 5, 5)
+        self.assertEqual(added, {(0, 0), (0, 1), (1, 0), (1, 1)})
+        self.assertEqual(removed, set())
+        self.assertEqual(grid.subscribers(3, 7), {"a"})
+        self.assertEqual(grid.subscribers(8, 0), set())
+
+        # The same chunks, nothing new
+        self.assertEqual(grid.subscribe("a", "actor", 1, 1, 6, 6), (set(), set()))
+
+        # Moving right drops the left column of chunks
+        self.assertEqual(
+            grid.subscribe("a", "actor", 6, 2, 9, 5),
+            ({(2, 0), (2, 1)}, {(0, 0), (0, 1)})
+        )
+        self.assertEqual(grid.subscribers(0, 0), set())
+        self.assertNotIn((0, 0), grid.chunks)
+
+    def test_many_regions(self):
+        grid = InterestGrid(chunk_size=4)
+        grid.subscribe("a", "actor", 0, 0, 3, 3)
+        self.assertEqual(grid.subscribe("a", "watch", 0, 0, 7, 3), ({(1, 0)}, set()))
+
+        self.assertEqual(grid.unsubscribe("a", "watch"), {(1, 0)})
+        self.assertEqual(grid.subscribers(1, 1), {"a"})
+        self.assertEqual(grid.subscribers(5, 1), set())
+
+        grid.unsubscribe("a")
+        self.assertEqual(grid.chunks, {})
+        self.assertEqual(grid.regions, {})
+
+    def test_route(self):
+        grid = InterestGrid(chunk_size=4)
+        grid.subscribe("a", "actor", 0, 0, 3, 3)
+        grid.subscribe("b", "actor", 0, 0, 7, 3)
+        grid.subscribe("c", "actor", 8, 8, 9, 9)
+
+        self.assertEqual(
+            grid.route([(1, 1), (5, 0), (20, 20)]),
+            {"a": [(1, 1)], "b": [(1, 1), (5, 0)]}
+        )
+
+    def test_negative(self):
+        grid = InterestGrid(chunk_size=4)
+        grid.subscribe("a", "actor", -3, -3, 1, 1)
+        self.assertEqual(grid.subscribers(0, 0), {"a"})
+        self.assertEqual(grid.subscribers(-1, -1), {"a"})
@@ -0,0 +1,523 @@
+from server.net.network import Client, ClientConnected, ClientDetached, \
+    ClientDisconnected, ClientResumed, ServerNetwork
+from shared.net.codec import BinaryCodec, JsonCodec
+from shared.net.network.send_queue import COALESCE, DISCONNECT, DROP_OLDEST
+from shared.net.cave_world_protocol import actor, session, world
+from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+import asyncio
+import unittest
+import websockets.exceptions
+
+class CountingCodec:
+    def __init__(self, codec):
+        self.codec = codec
+        self.name = codec.name
+        self.piece_name = codec.piece_name
+        self.encoded = 0
+
+    def encode_piece(self, message):
+        self.encoded += 1
+        return self.codec.encode_piece(message)
+
+    def join(self, pieces):
+        return self.codec.join(pieces)
+
+class StalledWebSocket:
+    """
+    Websocket of a client which stopped reading: `send` never completes until
+    `resume` is called.
+    """
+    def __init__(self):
+        self.sent = []
+        self.resumed = asyncio.Event()
+        self.closed = None
+
+    async def send(self, data):
+        await self.resumed.wait()
+        self.sent.append(data)
+
+    async def close(self, code, reason):
+        self.closed = code
+
+    def resume(self):
+        self.resumed.set()
+
+class ClosingWebSocket:
+    """
+    Websocket of a client which disconnects once `disconnect` is called.
+    """
+    subprotocol = None
+
+    def __init__(self):
+        self.disconnected = asyncio.Event()
+
+    async def send(self, data):
+        pass
+
+    async def recv(self):
+        await self.disconnected.wait()
+        raise websockets.exceptions.ConnectionClosed(None, None)
+
+    def disconnect(self):
+        self.disconnected.set()
+
+class PipeWebSocket:
+    """
+    Websocket recording the sent frames, which receives the frames passed to
+    `feed` and disconnects once `disconnect` is called.
+    """
+    subprotocol = None
+
+    def __init__(self):
+        self.sent = []
+        self.incoming = asyncio.Queue()
+
+    async def send(self, data):
+        self.sent.append(data)
+
+    async def recv(self):
+        data = await self.incoming.get()
+        if data is None:
+            raise websockets.exceptions.ConnectionClosed(None, None)
+        return data
+
+    async def close(self, code=1000, reason=""):
+        self.disconnect()
+
+    def feed(self, data):
+        self.incoming.put_nowait(data)
+
+    def disconnect(self):
+        self.incoming.put_nowait(None)
+
+async def settle():
+    """
+    Lets the connection's tasks run.
+    """
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+def delta(base, version, *positions):
+    return world.Delta(base=base, version=version, tiles=[
+        {"x": x, "y": y, "type": 0, "z": float(version), "object": None}
+        for x, y in positions
+    ])
+
+class TestServerNetwork(unittest.TestCase):
+    def test_broadcast_encodes_once(self):
+        async def test():
+            protocol = CaveWorldProtocol()
+            network = ServerNetwork(protocol)
+
+            binary = CountingCodec(BinaryCodec(protocol))
+            json = CountingCodec(JsonCodec(protocol))
+            network.clients = {
+                0: Client(0, None, binary),
+                2: Client(2, None, json),
+                3: Client(3, None, binary),
+                4: Client(4, None, json),
+            }
+
+            message = actor.TurnResult(success=True, error=None)
+            network.broadcast(message)
+            self.assertEqual(binary.encoded, 0)
+            network.flush()
+
+            self.assertEqual(binary.encoded, 1)
+            self.assertEqual(json.encoded, 1)
+
+            sent = [list(c.send_queue.items) for c in network.clients.values()]
+            self.assertEqual(sent[0], [binary.codec.encode(message)])
+            self.assertEqual(sent[1], [json.codec.encode(message)])
+            self.assertIs(sent[0][0], sent[2][0])
+            self.assertIs(sent[1][0], sent[3][0])
+
+        asyncio.run(test())
+
+    def test_batch(self):
+        async def test():
+            protocol = CaveWorldProtocol()
+            network = ServerNetwork(protocol)
+            codec = BinaryCodec(protocol)
+            client = Client(0, None, codec)
+            network.clients = {0: client}
+
+            network.send_to(client, actor.TurnResult(success=True, error=None))
+            network.send_to(client, delta(0, 1, (0, 0), (1, 1)))
+            network.send_to(client, delta(1, 2, (1, 1), (2, 2)))
+            network.flush()
+            network.flush()
+
+            frame, = client.send_queue.items
+            result, merged = codec.decode_all(frame)
+            self.assertIsInstance(result, actor.TurnResult)
+            self.assertEqual((merged.base, merged.version), (0, 2))
+            self.assertEqual(
+                [(t.x, t.y, t.z) for t in merged.tiles],
+                [(0, 0, 1.0), (1, 1, 2.0), (2, 2, 2.0)]
+            )
+
+        asyncio.run(test())
+
+    def test_coalesce(self):
+        snapshot = world.PackedDataResponse(
+            version=3, width=0, height=0, types=b"", heights=b"", objects=[]
+        )
+        self.assertIs(snapshot.coalesce(delta(0, 1, (0, 0))), snapshot)
+        self.assertIsNone(delta(3, 4).coalesce(snapshot))
+        # Not consecutive
+        self.assertIsNone(delta(2, 3).coalesce(delta(0, 1)))
+
+    def test_churn(self):
+        async def test():
+            network = ServerNetwork(CaveWorldProtocol(), resume_grace=0)
+
+            async def connect():
+                websocket = ClosingWebSocket()
+                handler = asyncio.ensure_future(network.handle_client_connection(websocket, "/"))
+                await asyncio.sleep(0)
+                return websocket, handler
+
+            connections = [await connect() for _ in range(10)]
+            self.assertEqual(sorted(network.clients), list(range(10)))
+
+            for websocket, handler in connections[2:8:2]:
+                websocket.disconnect()
+                await handler
+            self.assertEqual(sorted(network.clients), [0, 1, 3, 5, 7, 8, 9])
+            self.assertEqual(len(network.live_clients()), 7)
+
+            # The freed ids are reused before any new one
+            for _ in range(4):
+                connections.append(await connect())
+            self.assertEqual(sorted(network.clients), list(range(11)))
+
+            for websocket, handler in connections:
+                websocket.disconnect()
+            await asyncio.gather(*(handler for _, handler in connections), return_exceptions=True)
+            self.assertEqual(network.clients, {})
+
+        asyncio.run(test())
+
+    def test_dispatch_on_arrival(self):
+        async def test():
+            protocol = CaveWorldProtocol()
+            network = ServerNetwork(protocol, threaded=False)
+            codec = BinaryCodec(protocol)
+            client = Client(0, None, codec)
+
+            received = []
+            dispatched = []
+            network.bind({actor.TurnRequest: lambda message, client: received.append(message)})
+            network.on_dispatch = lambda: dispatched.append(len(received))
+
+            request = actor.TurnRequest(action={"type": "move", "dx": 1, "dy": 0})
+            network.receive(client, codec.join([codec.encode_piece(request)] * 2))
+
+            self.assertEqual(len(received), 2)
+            self.assertEqual(dispatched, [1, 2])
+            self.assertTrue(network.receive_queue.empty())
+
+        asyncio.run(test())
+
+class TestStalledClient(unittest.TestCase):
+    TICKS = 1000
+    LIMIT = 8
+
+    def stall(self, policy, results_every=250):
+        """
+        Sends a delta to a stalled client every tick and a turn result every
+        `results_every` ticks, returns the network, the client and its
+        websocket.
+        """
+        async def test():
+            protocol = CaveWorldProtocol()
+            network = ServerNetwork(protocol, queue_limit=self.LIMIT, policy=policy)
+            websocket = StalledWebSocket()
+            client = Client(0, websocket, BinaryCodec(protocol),
+                            network.queue_limit, network.policy, network.queue_stats)
+            network.clients = {0: client}
+            sender = asyncio.ensure_future(client.sender(network))
+
+            for tick in range(self.TICKS):
+                if client.closing:
+                    break
+                if tick % results_every == 0:
+                    network.send_to(client, actor.TurnResult(success=True, error=None))
+                network.send_to(client, delta(tick, tick + 1, (tick % 7, 0)))
+                network.flush()
+                await asyncio.sleep(0)
+
+            self.assertLessEqual(network.queue_stats.depth.max, self.LIMIT)
+            self.assertLessEqual(len(client.outbox), self.LIMIT + 1)
+
+            websocket.resume()
+            for _ in range(10):
+                network.flush()
+                await asyncio.sleep(0)
+            sender.cancel()
+            return network, client, websocket
+
+        return asyncio.run(test())
+
+    def received(self, client, websocket):
+        return [m for frame in websocket.sent for m in client.codec.decode_all(frame)]
+
+    def test_coalesce(self):
+        network, client, websocket = self.stall(COALESCE)
+        self.assertFalse(client.closing)
+        self.assertLess(len(websocket.sent), self.TICKS // 10)
+
+        # Every delta arrived, coalesced when the client was stalled
+        deltas = [m for m in self.received(client, websocket) if isinstance(m, world.Delta)]
+        self.assertEqual(deltas[0].base, 0)
+        self.assertEqual(deltas[-1].version, self.TICKS)
+        for previous, delta in zip(deltas, deltas[1:]):
+            self.assertEqual(delta.base, previous.version)
+
+    def test_coalesce_disconnects(self):
+        # Turn results don't coalesce, so they pile up
+        network, client, websocket = self.stall(COALESCE, results_every=1)
+        self.assertTrue(client.closing)
+        self.assertEqual(websocket.closed, 1013)
+
+    def test_drop_oldest(self):
+        network, client, websocket = self.stall(DROP_OLDEST)
+        self.assertFalse(client.closing)
+        self.assertGreater(network.queue_stats.dropped, 0)
+
+        # The frames with the turn results weren't dropped
+        results = [m for m in self.received(client, websocket) if isinstance(m, actor.TurnResult)]
+        self.assertEqual(len(results), self.TICKS // 250)
+
+    def test_disconnect(self):
+        network, client, websocket = self.stall(DISCONNECT)
+        self.assertTrue(client.closing)
+        self.assertEqual(websocket.closed, 1013)
+        self.assertEqual(network.queue_stats.refused, 1)
+
+class TestResume(unittest.TestCase):
+    def connect(self, network, path="/"):
+        websocket = PipeWebSocket()
+        handler = asyncio.ensure_future(network.handle_client_connection(websocket, path))
+        return websocket, handler
+
+    def received(self, network, websocket):
+        codec = JsonCodec(network.protocol)
+        return [m for frame in websocket.sent for m in codec.decode_all(frame)]
+
+    def events(self, network):
+        events = []
+        network.bind({
+            ClientConnected: lambda message, client: events.append("connected"),
+            ClientDisconnected: lambda message, client: events.append("disconnected"),
+            ClientDetached: lambda message, client: events.append("detached"),
+            ClientResumed: lambda message, client: events.append("resumed"),
+            actor.TurnRequest: lambda message, client: events.append("turn"),
+        })
+        return events
+
+    def test_resume(self):
+        async def test():
+            network = ServerNetwork(CaveWorldProtocol(), threaded=False)
+            events = self.events(network)
+
+            first, handler = self.connect(network)
+            await settle()
+            token = self.received(network, first)[0].token
+            client = network.clients[0]
+            client["actor"] = "caveman"
+
+            for i in range(3):
+                network.send_to(client, actor.TurnResult(success=True, error=str(i)))
+                network.flush()
+                await settle()
+            request = actor.TurnRequest(action={"type": "move", "dx": 1, "dy": 0})
+            first.feed(client.codec.encode(request))
+            await settle()
+
+            first.disconnect()
+            await handler
+            self.assertIsNone(client.websocket)
+            self.assertIs(network.clients[0], client)
+
+            # Sent while the client is reconnecting
+            network.send_to(client, actor.TurnResult(success=True, error="3"))
+            network.flush()
+
+            # Only the session's frame and the first result have arrived
+            second, handler = self.connect(network, f"/resume?token={token}&received=2")
+            await settle()
+            result, *messages = self.received(network, second)
+            self.assertTrue(result.success)
+            self.assertEqual(result.received, 1)
+            self.assertEqual([m.error for m in messages], ["1", "2", "3"])
+
+            self.assertIs(network.clients[0], client)
+            self.assertEqual(client["actor"], "caveman")
+            self.assertEqual(events, ["connected", "turn", "detached", "resumed"])
+
+            second.disconnect()
+            await handler
+
+        asyncio.run(test())
+
+    def test_expire(self):
+        async def test():
+            network = ServerNetwork(CaveWorldProtocol(), threaded=False, resume_grace=0.01)
+            events = self.events(network)
+
+            websocket, handler = self.connect(network)
+            await settle()
+            token = self.received(network, websocket)[0].token
+            websocket.disconnect()
+            await handler
+            self.assertEqual(events, ["connected", "detached"])
+
+            await asyncio.sleep(0.05)
+            self.assertEqual(events, ["connected", "detached", "disconnected"])
+            self.assertEqual(network.clients, {})
+            self.assertEqual(network.sessions, {})
+
+            # Too late, a new session is started instead
+            websocket, handler = self.connect(network, f"/resume?token={token}&received=1")
+            await settle()
+            result, new_session = self.received(network, websocket)
+            self.assertFalse(result.success)
+            self.assertIsInstance(new_session, session.Session)
+            self.assertNotEqual(new_session.token, token)
+            self.assertEqual(events, ["connected", "detached", "disconnected", "connected"])
+
+            websocket.disconnect()
+            await handler
+
+        asyncio.run(test())
+
+    def test_replay_unavailable(self):
+        async def test():
+            network = ServerNetwork(CaveWorldProtocol(), threaded=False, replay_limit=2)
+            events = self.events(network)
+
+            websocket, handler = self.connect(network)
+            await settle()
+            token = self.received(network, websocket)[0].token
+            for i in range(3):
+                network.send_to(network.clients[0], actor.TurnResult(success=True, error=None))
+                network.flush()
+                await settle()
+            websocket.disconnect()
+            await handler
+
+            # The session's frame isn't kept anymore
+            websocket, handler = self.connect(network, f"/resume?token={token}&received=0")
+            await settle()
+            self.assertFalse(self.received(network, websocket)[0].success)
+            self.assertEqual(events, ["connected", "detached", "disconnected", "connected"])
+
+            websocket.disconnect()
+            await handler
+
+        asyncio.run(test())
+
+    def test_resume_while_attached(self):
+        async def test():
+            network = ServerNetwork(CaveWorldProtocol(), threaded=False)
+            first, handler = self.connect(network)
+            await settle()
+            token = self.received(network, first)[0].token
+            client = network.clients[0]
+
+            # The server hasn't noticed the first connection has dropped
+            second, other = self.connect(network, f"/resume?token={token}&received=1")
+            await settle()
+            await handler
+            self.assertIs(client.websocket, second)
+
+            network.send_to(client, actor.TurnResult(success=True, error="resumed"))
+            network.flush()
+            await settle()
+            result, *messages = self.received(network, second)
+            self.assertTrue(result.success)
+            self.assertEqual([m.error for m in messages], ["resumed"])
+
+            second.disconnect()
+            await other
+
+        asyncio.run(test())
+
+    def test_refused_while_attached(self):
+        async def test():
+            network = ServerNetwork(CaveWorldProtocol(), threaded=False)
+            first, handler = self.connect(network)
+            await settle()
+            token = self.received(network, first)[0].token
+            client = network.clients[0]
+
+            # More than was ever sent, so there's nothing to replay
+            second, other = self.connect(network, f"/resume?token={token}&received=99")
+            await settle()
+            self.assertFalse(self.received(network, second)[0].success)
+
+            # The session still goes on over its connection
+            network.send_to(client, actor.TurnResult(success=True, error="still here"))
+            network.flush()
+            await settle()
+            self.assertEqual(self.received(network, first)[-1].error, "still here")
+
+            first.disconnect()
+            second.disconnect()
+            await asyncio.gather(handler, other)
+
+        asyncio.run(test())
+
+class TestRequests(unittest.TestCase):
+    def test_request(self):
+        async def test():
+            network = ServerNetwork(CaveWorldProtocol(), threaded=False, resume_grace=0)
+            received = []
+            network.bind({actor.TurnRequest: lambda message, client: received.append(message)})
+
+            websocket = PipeWebSocket()
+            handler = asyncio.ensure_future(network.handle_client_connection(websocket, "/"))
+            await settle()
+            client = network.clients[0]
+            codec = JsonCodec(network.protocol)
+
+            futures = [
+                network.request(client, actor.ActorRequest(type="caveman"))
+                for _ in range(2)
+            ]
+            network.flush()
+            await settle()
+            requests = [m for frame in websocket.sent for m in codec.decode_all(frame)]
+            self.assertEqual([m.correlation for m in requests], [2, 4])
+
+            # The responses complete the futures, instead of the callbacks
+            for request in reversed(requests):
+                response = actor.TurnRequest(action={"type": "wait", "dx": 0, "dy": 0})
+                response.correlation = request.correlation
+                websocket.feed(codec.encode(response))
+            self.assertEqual([(await f).correlation for f in futures], [2, 4])
+            self.assertEqual(received, [])
+            self.assertEqual(network.request_stats.latency.count, 2)
+
+            # Answering the client's request
+            request = actor.TurnRequest(action={"type": "wait", "dx": 0, "dy": 0})
+            request.correlation = 7
+            websocket.feed(codec.encode(request))
+            await settle()
+            self.assertEqual(len(received), 1)
+            network.respond(client, received[0], actor.TurnResult(success=True, error=None))
+            network.flush()
+            await settle()
+            self.assertEqual(codec.decode_all(websocket.sent[-1])[-1].correlation, 7)
+
+            # Left without a response
+            future = network.request(client, actor.ActorRequest(type="caveman"))
+            websocket.disconnect()
+            await handler
+            with self.assertRaises(ConnectionError):
+                await future
+            self.assertEqual(network.request_stats.failed, 1)
+
+        asyncio.run(test())
@@ -0,0 +1,71 @@
+"""
+Streaming of the whole world to a client in chunks, instead of a single
+huge message.
+"""
+
+from shared.net.cave_world_protocol.world import Chunk
+from shared.packing import pack_region
+
+class WorldStream:
+    """
+    The world's chunks (of the `grid`, see `server.net.interest`) still to be
+    sent to a single client, the ones nearest to the position returned by
+    `focus()` (called once the first chunk is sent) first.
+
+    The chunks are packed by a generator as they are sent, so only the sent
+    ones are ever held in memory. Flow control: at most `credit` chunks are
+    sent until the client acknowledges some (`acknowledge`).
+    """
+    def __init__(self, world, grid, focus, window):
+        self.world = world
+        self.grid = grid
+        self.focus = focus
+        self.credit = window
+        # Number of the chunks sent, but not acknowledged yet
+        self.in_flight = 0
+
+        columns, rows = grid.chunk(world.w - 1, world.h - 1)
+        # Number of the chunks still to be sent
+        self.remaining = (columns + 1) * (rows + 1) if world.w > 0 and world.h > 0 else 0
+        self.count = self.remaining
+        self.chunks = self.generate()
+
+    def order(self):
+        """
+        Returns the list of the world's chunks, in the order of sending.
+        """
+        chunks = self.grid.chunks_in(0, 0, self.world.w - 1, self.world.h - 1)
+
+        fx, fy = self.grid.chunk(*self.focus())
+        return sorted(chunks, key=lambda c: ((c[0] - fx)**2 + (c[1] - fy)**2, c))
+
+    def generate(self):
+        for chunk in self.order():
+            x0, y0, x1, y1 = self.grid.chunk_bounds(chunk)
+            x1 = min(x1, self.world.w - 1)
+            y1 = min(y1, self.world.h - 1)
+            yield chunk, Chunk.trusted(
+                x=x0, y=y0,
+                **pack_region(self.world, x0, y0, x1 - x0 + 1, y1 - y0 + 1)
+            )
+
+    @property
+    def done(self):
+        return self.remaining == 0
+
+    def acknowledge(self, count):
+        count = max(0, min(count, self.in_flight))
+        self.in_flight -= count
+        self.credit += count
+
+    def next(self):
+        """
+        Returns the list of the `(chunk, world.Chunk)` which can be sent now.
+        """
+        sent = []
+        while self.credit > 0 and self.remaining > 0:
+            sent.append(next(self.chunks))
+            self.credit -= 1
+            self.in_flight += 1
+            self.remaining -= 1
+        return sent
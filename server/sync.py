@@ -0,0 +1,209 @@
+"""
+Keeps the clients' copies of the world in sync with the server's world.
+"""
+
+from server.changes import delta
+from server.net.interest import InterestGrid
+from server.stream import WorldStream
+from shared.net.cave_world_protocol.world import StreamStart
+
+class WorldSync:
+    """
+    Sends the clients the whole world when they request it (`snapshot`), or
+    streams it in chunks (`stream`), and afterwards only the changes inside
+    of their area of interest: the region around the actor they control
+    (`follow`) and the region they are watching (`watch`).
+
+    Every client gets its own `world.Delta`s, based on the version of the
+    world it was last sent. When a client's area of interest moves onto
+    chunks which have changed while it wasn't subscribed to them, the chunks
+    are sent to it as they are now.
+    """
+
+    """
+    The distance (in tiles) from the followed actor, within which the changes
+    are sent.
+    """
+    ACTOR_RADIUS = 16
+
+    """
+    The biggest side (in tiles) of a watched region.
+    """
+    MAX_WATCH = 64
+
+    """
+    The most chunks of a streamed world sent before the client acknowledges
+    them.
+    """
+    MAX_WINDOW = 256
+
+    def __init__(self, world, network, chunk_size=8):
+        self.world = world
+        self.network = network
+        self.grid = InterestGrid(chunk_size)
+
+        # Version of the world last sent to every client
+        self.versions = {}
+        # Version of the snapshot every client was sent
+        self.snapshots = {}
+        # Version of the world when every client left a chunk, by chunk
+        self.left = {}
+        # Version of the last change of every chunk
+        self.changed = {}
+        # Actor followed by every client
+        self.actors = {}
+        # Positions every client has to be sent regardless of the changes
+        self.missing = {}
+        # World being streamed to every client
+        self.streams = {}
+
+    def snapshot(self, client):
+        """
+        Sends the whole world to the client.
+        """
+        self.network.send_to(client, self.world.construct_packed_world_data_response())
+        self.started(client)
+
+    def stream(self, client, x, y, width, height, window):
+        """
+        Starts streaming the whole world to the client (see `WorldStream`),
+        the chunks in the rectangle of tiles first, or around the client's
+        actor when it's empty.
+        """
+        def focus():
+            if width > 0 and height > 0:
+                return x + width // 2, y + height // 2
+            actor = self.actors.get(client)
+            if actor is not None:
+                return int(actor.x), int(actor.y)
+            return self.world.w // 2, self.world.h // 2
+
+        window = max(1, min(window, self.MAX_WINDOW))
+        stream = WorldStream(self.world, self.grid, focus, window)
+        self.network.send_to(client, StreamStart.trusted(
+            version=self.world.version,
+            width=self.world.w,
+            height=self.world.h,
+            chunks=stream.count
+        ))
+        self.started(client)
+        self.streams[client] = stream
+
+    def acknowledge(self, client, count):
+        """
+        Called when the client has acknowledged the streamed chunks.
+        """
+        stream = self.streams.get(client)
+        if stream is not None:
+            stream.acknowledge(count)
+
+    def started(self, client):
+        """
+        Called when the client was sent the world (or the start of its
+        stream) of the current version.
+        """
+        self.versions[client] = self.world.version
+        self.snapshots[client] = self.world.version
+        self.left[client] = {}
+        self.missing.pop(client, None)
+        self.streams.pop(client, None)
+
+    def follow(self, client, actor):
+        self.actors[client] = actor
+        self.follow_actor(client, actor)
+
+    def watch(self, client, x, y, width, height):
+        """
+        Subscribes the client to the changes in the rectangle, or unsubscribes
+        it when it's empty.
+        """
+        if width <= 0 or height <= 0:
+            self.unsubscribed(client, self.grid.unsubscribe(client, "watch"))
+            return
+
+        width = min(width, self.MAX_WATCH)
+        height = min(height, self.MAX_WATCH)
+        self.subscribe(client, "watch", x, y, x + width - 1, y + height - 1)
+
+    def remove(self, client):
+        self.grid.unsubscribe(client)
+        for clients in (self.versions, self.snapshots, self.left, self.actors,
+                        self.missing, self.streams):
+            clients.pop(client, None)
+
+    def follow_actor(self, client, actor):
+        r = self.ACTOR_RADIUS
+        x, y = int(actor.x), int(actor.y)
+        self.subscribe(client, "actor", x - r, y - r, x + r, y + r)
+
+    def subscribe(self, client, key, x0, y0, x1, y1):
+        added, removed = self.grid.subscribe(client, key, x0, y0, x1, y1)
+        self.unsubscribed(client, removed)
+
+        if client not in self.snapshots:
+            return
+
+        left = self.left[client]
+        for chunk in added:
+            since = left.pop(chunk, self.snapshots[client])
+            if self.changed.get(chunk, -1) <= since:
+                continue
+
+            cx0, cy0, cx1, cy1 = self.grid.chunk_bounds(chunk)
+            missing = self.missing.setdefault(client, {})
+            for x in range(max(cx0, 0), min(cx1 + 1, self.world.w)):
+                for y in range(max(cy0, 0), min(cy1 + 1, self.world.h)):
+                    missing[(x, y)] = None
+
+    def unsubscribed(self, client, chunks):
+        left = self.left.get(client)
+        if left is None:
+            return
+
+        for chunk in chunks:
+            left[chunk] = self.world.version
+
+    def update(self):
+        """
+        Sends the changes of the world since the last call to the interested
+        clients, called once per tick.
+        """
+        for client, actor in self.actors.items():
+            self.follow_actor(client, actor)
+
+        positions = self.world.flush_changes()
+        version = self.world.version
+        for x, y in positions:
+            self.changed[self.grid.chunk(x, y)] = version
+
+        routed = self.grid.route(positions)
+        missing, self.missing = self.missing, {}
+        for client, positions in missing.items():
+            positions.update(dict.fromkeys(routed.get(client, ())))
+            routed[client] = positions
+
+        for client, positions in routed.items():
+            base = self.versions.get(client)
+            if base is None:
+                # Without the world yet, the snapshot will have the changes
+                continue
+
+            self.network.send_to(client, delta(self.world, base, version, positions))
+            self.versions[client] = version
+
+        self.send_streams()
+
+    def send_streams(self):
+        """
+        Sends the streamed chunks the clients are ready for. The chunks are
+        sent as they are now, so the client is up to date with them, just as
+        if it has left them (see `subscribe`).
+        """
+        for client, stream in list(self.streams.items()):
+            left = self.left[client]
+            for chunk, message in stream.next():
+                self.network.send_to(client, message)
+                left[chunk] = self.world.version
+
+            if stream.done:
+                del self.streams[client]
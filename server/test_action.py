@@ -0,0 +1,111 @@
+from .action import * # pylint: disable=unused-wildcard-import
+from shared.rules import DIRECTION_BITS
+from shared.net.cave_world_protocol import actor as protocol
+import unittest
+
+class Tile:
+    def __init__(self, type=0, z=0.0):
+        self.type = type
+        self.z = z
+        self.object = None
+
+class World:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.data = [[Tile() for _ in range(h)] for _ in range(w)]
+
+    def set_object(self, x, y, object):
+        self.data[x][y].object = object
+
+class Fruit:
+    def on_eat(self, actor):
+        actor.eaten += 1
+        return True
+
+    def on_pick_up(self, actor):
+        return False
+
+class Actor:
+    def __init__(self, world, x, y):
+        self.world = world
+        self.x = x
+        self.y = y
+        self.eaten = 0
+        self.inventory = []
+        world.data[x][y].object = self
+
+    def move_to(self, x, y):
+        self.world.data[self.x][self.y].object = None
+        self.x = x
+        self.y = y
+        self.world.data[x][y].object = self
+
+class TestActionEngine(unittest.TestCase):
+    def setUp(self):
+        self.world = World(4, 4)
+        self.world.data[3][0].z = 5.0
+        self.world.data[1][2].object = Fruit()
+        self.engine = ActionEngine(self.world)
+        self.actor = Actor(self.world, 1, 1)
+
+    def execute(self, action):
+        self.engine.submit(self.actor, action)
+        (_, _, error), = self.engine.execute()
+        return error
+
+    def test_from_message(self):
+        action = Action.from_message(protocol.Action(type="move", dx=1, dy=0))
+        self.assertIsInstance(action, Move)
+        self.assertEqual((action.dx, action.dy), (1, 0))
+
+    def test_tables(self):
+        corner = self.engine.index(0, 0)
+        self.assertEqual(bin(self.engine.neighbours[corner]).count("1"), 3)
+        self.assertFalse(self.engine.moves[self.engine.index(2, 0)] & DIRECTION_BITS[(1, 0)])
+
+    def test_move(self):
+        self.assertIsNone(self.execute(Move(1, 0)))
+        self.assertEqual((self.actor.x, self.actor.y), (2, 1))
+
+        self.assertIsNotNone(self.execute(Move(1, -1)))
+        self.assertIsNotNone(self.execute(Move(2, 0)))
+        self.assertEqual((self.actor.x, self.actor.y), (2, 1))
+
+    def test_move_occupied(self):
+        self.assertIsNotNone(self.execute(Move(0, 1)))
+
+    def test_eat(self):
+        self.assertIsNotNone(self.execute(Eat(1, 0)))
+        self.assertIsNone(self.execute(Eat(0, 1)))
+        self.assertEqual(self.actor.eaten, 1)
+        self.assertIsNone(self.world.data[1][2].object)
+
+    def test_pick_up_refused(self):
+        self.assertIsNotNone(self.execute(PickUp(0, 1)))
+        self.assertEqual(self.actor.inventory, [])
+
+    def test_pending(self):
+        other = Actor(self.world, 3, 3)
+        self.engine.submit(self.actor, Wait())
+        self.engine.submit(other, Move(-1, 0))
+        self.assertTrue(self.engine.is_pending(other))
+
+        with self.assertRaises(ActionError):
+            self.engine.submit(other, Wait())
+
+        results = self.engine.execute()
+        self.assertEqual([(a, error) for a, _, error in results], [(self.actor, None), (other, None)])
+        self.assertEqual(self.engine.latency["wait"].count, 1)
+        self.assertEqual(self.engine.latency["move"].count, 1)
+        self.assertEqual(self.engine.pending, {})
+        self.assertFalse(self.engine.is_pending(other))
+
+    def test_discard(self):
+        self.engine.submit(self.actor, Move(1, 0))
+        self.engine.discard(self.actor)
+        self.engine.discard(self.actor)
+
+        self.assertFalse(self.engine.is_pending(self.actor))
+        self.assertEqual(self.engine.execute(), [])
+        self.assertEqual((self.actor.x, self.actor.y), (1, 1))
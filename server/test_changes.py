@@ -0,0 +1,50 @@
+from .changes import ChangeLog, delta
+import unittest
+
+class Object:
+    def representation(self):
+        return "stone"
+
+class Tile:
+    def __init__(self):
+        self.type = 1
+        self.z = 2.0
+        self.object = None
+
+class World:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.data = [[Tile() for _ in range(h)] for _ in range(w)]
+
+class TestChangeLog(unittest.TestCase):
+    def test_flush(self):
+        log = ChangeLog()
+        self.assertEqual(log.flush(), [])
+        self.assertEqual(log.version, 0)
+
+        log.mark(1, 2)
+        log.mark(0, 0)
+        log.mark(1, 2)
+        self.assertEqual(len(log), 2)
+
+        self.assertEqual(log.flush(), [(1, 2), (0, 0)])
+        self.assertEqual(log.version, 1)
+        self.assertEqual(len(log), 0)
+
+        self.assertEqual(log.flush(), [])
+        self.assertEqual(log.version, 1)
+
+    def test_delta(self):
+        world = World(3, 3)
+        world.data[1][2].object = Object()
+
+        message = delta(world, 4, 5, [(1, 2), (0, 0)])
+        self.assertEqual((message.base, message.version), (4, 5))
+        self.assertEqual(
+            message.as_dict()["tiles"],
+            [
+                {"x": 1, "y": 2, "type": 1, "z": 2.0, "object": {"repr": "stone"}},
+                {"x": 0, "y": 0, "type": 1, "z": 2.0, "object": None},
+            ]
+        )
@@ -0,0 +1,73 @@
+from server.net.interest import InterestGrid
+from server.stream import WorldStream
+from shared.net.cave_world_protocol.world import Chunk
+from shared.packing import PackedWorld
+import unittest
+
+class Object:
+    def representation(self):
+        return "stone"
+
+class Tile:
+    def __init__(self, type, z):
+        self.type = type
+        self.z = z
+        self.object = None
+
+class World:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.data = [[Tile((x + y) % 3, float(x * y)) for y in range(h)] for x in range(w)]
+
+class TestWorldStream(unittest.TestCase):
+    def test_covers_world(self):
+        world = World(20, 13)
+        world.data[19][12].object = Object()
+        stream = WorldStream(world, InterestGrid(8), lambda: (0, 0), window=100)
+        self.assertEqual(stream.count, 3 * 2)
+
+        covered = set()
+        for chunk, message in stream.next():
+            # As received by the client
+            packed = PackedWorld.from_message(Chunk(message.as_dict()))
+            for x in range(packed.w):
+                for y in range(packed.h):
+                    position = (message.x + x, message.y + y)
+                    self.assertNotIn(position, covered)
+                    covered.add(position)
+                    tile = world.data[position[0]][position[1]]
+                    self.assertEqual(packed.types[x, y], tile.type)
+                    self.assertEqual(packed.heights[x, y], tile.z)
+
+        self.assertEqual(covered, {(x, y) for x in range(20) for y in range(13)})
+        self.assertEqual(message.objects, [{"x": 3, "y": 4, "repr": "stone"}])
+        self.assertTrue(stream.done)
+
+    def test_focus_first(self):
+        world = World(64, 64)
+        stream = WorldStream(world, InterestGrid(8), lambda: (50, 20), window=5)
+        chunks = [chunk for chunk, _ in stream.next()]
+        self.assertEqual(chunks[0], (6, 2))
+        self.assertEqual(sorted(chunks[1:]), [(5, 2), (6, 1), (6, 3), (7, 2)])
+
+    def test_lazy(self):
+        world = World(16, 8)
+        stream = WorldStream(world, InterestGrid(8), lambda: (0, 0), window=1)
+        (_, first), = stream.next()
+
+        # Packed when sent, as the world is then
+        world.data[8][0].type = 7
+        stream.acknowledge(1)
+        (_, second), = stream.next()
+        self.assertEqual(second.types[0], 7)
+
+    def test_flow_control(self):
+        stream = WorldStream(World(64, 64), InterestGrid(8), lambda: (0, 0), window=3)
+        self.assertEqual(len(stream.next()), 3)
+        self.assertEqual(stream.next(), [])
+
+        stream.acknowledge(2)
+        self.assertEqual(len(stream.next()), 2)
+        stream.acknowledge(-5)
+        self.assertEqual(stream.next(), [])
@@ -0,0 +1,211 @@
+from server.changes import ChangeLog
+from server.sync import WorldSync
+from shared.net.cave_world_protocol import world as protocol
+import unittest
+
+class Tile:
+    def __init__(self):
+        self.type = 0
+        self.z = 0.0
+        self.object = None
+
+class World:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.data = [[Tile() for _ in range(h)] for _ in range(w)]
+        self.changes = ChangeLog()
+
+    @property
+    def version(self):
+        return self.changes.version
+
+    def set_object(self, x, y, object):
+        self.data[x][y].object = object
+        self.changes.mark(x, y)
+
+    def flush_changes(self):
+        return self.changes.flush()
+
+    def construct_packed_world_data_response(self):
+        return "snapshot"
+
+class Network:
+    def __init__(self):
+        self.sent = []
+
+    def send_to(self, client, message):
+        self.sent.append((client, message))
+
+    def take(self):
+        sent, self.sent = self.sent, []
+        return sent
+
+class Actor:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def representation(self):
+        return "caveman"
+
+class TestWorldSync(unittest.TestCase):
+    def setUp(self):
+        self.world = World(64, 64)
+        self.network = Network()
+        self.sync = WorldSync(self.world, self.network, chunk_size=8)
+        self.sync.ACTOR_RADIUS = 4
+
+    def positions(self, message):
+        return sorted((t["x"], t["y"]) for t in message.as_dict()["tiles"])
+
+    def test_area_of_interest(self):
+        near, far = Actor(2, 2), Actor(40, 40)
+        for client, actor in (("near", near), ("far", far)):
+            self.sync.snapshot(client)
+            self.sync.follow(client, actor)
+        self.network.take()
+
+        self.world.set_object(3, 3, Actor(3, 3))
+        self.world.set_object(60, 60, Actor(60, 60))
+        self.sync.update()
+
+        (client, message), = self.network.take()
+        self.assertEqual(client, "near")
+        self.assertIsInstance(message, protocol.Delta)
+        self.assertEqual((message.base, message.version), (0, 1))
+        self.assertEqual(self.positions(message), [(3, 3)])
+        self.assertEqual(message.as_dict()["tiles"][0]["object"], {"repr": "caveman"})
+
+        # "far" hasn't got the version 1, its next delta is based on 0
+        self.world.set_object(41, 41, None)
+        self.sync.update()
+        (client, message), = self.network.take()
+        self.assertEqual(client, "far")
+        self.assertEqual((message.base, message.version), (0, 2))
+
+    def test_moving_sends_missed_chunks(self):
+        actor = Actor(2, 2)
+        self.sync.snapshot("a")
+        self.sync.follow("a", actor)
+        self.network.take()
+
+        # A change outside of the area of interest isn't sent
+        self.world.set_object(12, 2, Actor(12, 2))
+        self.sync.update()
+        self.assertEqual(self.network.take(), [])
+
+        # Moving next to it sends the whole newly covered chunk
+        actor.x = 5
+        self.sync.update()
+        (client, message), = self.network.take()
+        self.assertEqual((message.base, message.version), (0, 1))
+        self.assertEqual(len(message.tiles), 8 * 8)
+        self.assertIn((12, 2), self.positions(message))
+
+    def test_watch(self):
+        self.sync.snapshot("a")
+        self.sync.watch("a", 30, 30, 5, 5)
+        self.network.take()
+        self.sync.update()
+        self.network.take()
+
+        self.world.set_object(32, 31, None)
+        self.sync.update()
+        (client, message), = self.network.take()
+        self.assertEqual(self.positions(message), [(32, 31)])
+
+        self.sync.watch("a", 0, 0, 0, 0)
+        self.world.set_object(32, 31, None)
+        self.sync.update()
+        self.assertEqual(self.network.take(), [])
+
+    def test_without_snapshot(self):
+        self.sync.follow("a", Actor(2, 2))
+        self.world.set_object(3, 3, None)
+        self.sync.update()
+        self.assertEqual(self.network.take(), [])
+
+        self.sync.snapshot("a")
+        self.assertEqual(self.network.take(), [("a", "snapshot")])
+
+    def test_remove(self):
+        self.sync.snapshot("a")
+        self.sync.follow("a", Actor(2, 2))
+        self.sync.remove("a")
+        self.network.take()
+
+        self.world.set_object(3, 3, None)
+        self.sync.update()
+        self.assertEqual(self.network.take(), [])
+
+    def test_unchanged_chunks_not_sent(self):
+        actor = Actor(2, 2)
+        self.sync.snapshot("a")
+        self.sync.follow("a", actor)
+        self.sync.update()
+        self.assertEqual(self.network.take(), [("a", "snapshot")])
+
+        # Nothing has changed in the newly covered chunks
+        actor.x = 5
+        self.sync.update()
+        self.assertEqual(self.network.take(), [])
+
+        # Leaving a chunk, which changes meanwhile, and coming back
+        actor.x = 20
+        self.sync.update()
+        self.world.set_object(1, 1, None)
+        self.sync.update()
+        self.assertEqual(self.network.take(), [])
+
+        actor.x = 2
+        self.sync.update()
+        (client, message), = self.network.take()
+        self.assertEqual(len(message.tiles), 8 * 8)
+
+    def test_stream(self):
+        actor = Actor(40, 40)
+        self.sync.follow("a", actor)
+        self.sync.stream("a", 0, 0, 0, 0, window=4)
+        (client, start), = self.network.take()
+        self.assertIsInstance(start, protocol.StreamStart)
+        self.assertEqual((start.version, start.width, start.height), (0, 64, 64))
+        self.assertEqual(start.chunks, 8 * 8)
+
+        # The chunk of the actor first, at most a window of them
+        self.world.set_object(41, 41, Actor(41, 41))
+        self.sync.update()
+        sent = self.network.take()
+        delta, chunks = sent[0][1], [message for _, message in sent[1:]]
+        self.assertEqual((delta.base, delta.version), (0, 1))
+        self.assertEqual(len(chunks), 4)
+        self.assertTrue(all(isinstance(c, protocol.Chunk) for c in chunks))
+        self.assertEqual((chunks[0].x, chunks[0].y), (40, 40))
+        self.assertEqual(chunks[0].objects, [{"x": 1, "y": 1, "repr": "caveman"}])
+
+        self.sync.update()
+        self.assertEqual(self.network.take(), [])
+
+        # Acknowledging more chunks than were sent doesn't widen the window
+        self.sync.acknowledge("a", 100)
+        self.sync.update()
+        self.assertEqual(len(self.network.take()), 4)
+
+        while "a" in self.sync.streams:
+            self.sync.acknowledge("a", 4)
+            self.sync.update()
+            chunks += [message for _, message in self.network.take()]
+        self.assertEqual(len(chunks), 8 * 8 - 4)
+
+    def test_streamed_chunks_not_resent(self):
+        actor = Actor(2, 2)
+        self.sync.follow("a", actor)
+        self.sync.stream("a", 0, 0, 0, 0, window=100)
+        self.world.set_object(20, 2, None)
+        self.sync.update()
+        self.network.take()
+
+        # The chunk was streamed after the change
+        actor.x = 18
+        self.sync.update()
+        self.assertEqual(self.network.take(), [])
@@ -0,0 +1,102 @@
+from .turn import TurnManager
+from server.net.network import ClientDetached, ClientResumed
+from shared.net.cave_world_protocol import actor
+import unittest
+
+class Network:
+    def __init__(self):
+        self.callbacks = {}
+        self.sent = []
+
+    def bind(self, bindings):
+        self.callbacks.update(bindings)
+
+    def call(self, message, client):
+        self.callbacks[message.__class__](message, client)
+
+    def send_to(self, client, message):
+        self.sent.append((client, message))
+
+    def respond(self, client, request, message):
+        self.send_to(client, message)
+
+    def turns(self):
+        """
+        Returns the clients asked to take their turns so far.
+        """
+        return [
+            client for client, message in self.sent
+            if isinstance(message, actor.PrepareTurnRequest)
+        ]
+
+class Tile:
+    def __init__(self):
+        self.type = 0
+        self.z = 0.0
+        self.object = None
+
+class World:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.data = [[Tile() for _ in range(h)] for _ in range(w)]
+
+class Condition:
+    hunger = thirst = temperature = health = 0.0
+
+class Actor:
+    def __init__(self, client):
+        self.client = client
+        self.x = self.y = 0
+        self.condition = Condition()
+
+    def representation(self):
+        return "caveman"
+
+    def gather_senses_information(self):
+        return {"sight": [], "hearing": [], "smell": []}
+
+class Main:
+    def __init__(self):
+        self.network = Network()
+        self.world = World(4, 4)
+
+class TestTurnManager(unittest.TestCase):
+    def setUp(self):
+        self.main = Main()
+        self.network = self.main.network
+        self.turns = TurnManager(self.main)
+        self.actors = [Actor(name) for name in ("a", "b", "c")]
+        for a in self.actors:
+            self.turns.register_actor(a)
+
+    def test_detached_turn_skipped(self):
+        self.assertEqual(self.network.turns(), ["a"])
+
+        # The client with the turn drops, the next one gets it right away
+        self.network.call(ClientDetached(), "a")
+        self.assertIs(self.turns.current_turn(), self.actors[1])
+        self.assertEqual(self.network.turns(), ["a", "b"])
+
+        # Skipped until it resumes
+        self.turns.next_turn()
+        self.turns.next_turn()
+        self.assertEqual(self.network.turns(), ["a", "b", "c", "b"])
+
+        self.network.call(ClientResumed(), "a")
+        self.turns.next_turn()
+        self.turns.next_turn()
+        self.assertEqual(self.network.turns()[4:], ["c", "a"])
+
+    def test_all_detached(self):
+        for client in ("a", "b", "c"):
+            self.network.call(ClientDetached(), client)
+        self.assertIsNone(self.turns.current_turn())
+
+        self.network.call(ClientResumed(), "b")
+        self.assertIs(self.turns.current_turn(), self.actors[1])
+
+        # A detached client leaving for good
+        self.turns.unregister_client("a")
+        self.assertIs(self.turns.current_turn(), self.actors[1])
+        self.assertEqual(self.turns.detached, {"c"})
@@ -1,28 +1,58 @@
 from shared.net.cave_world_protocol import actor
+from server.action import Action, ActionEngine, ActionError
+from server.net.network import ClientDetached, ClientResumed
 
 class TurnManager:
+    """
+    Keeps track of whose turn it is, forwards the requested actions to the
+    `ActionEngine` and advances the turn once the action was performed.
+
+    The turns of the actors whose clients' connections have dropped (see
+    `ClientDetached`) are skipped until they resume, so the others don't
+    wait for them.
+    """
     def __init__(self, main):
         self.actors = []
         self.client_actors = {}
 
         self.turn_index = -1
+        # The turn requests being executed, answered once they are
+        self.turn_requests = {}
+        # The clients which are reconnecting
+        self.detached = set()
 
         self.network = main.network
+        self.engine = ActionEngine(main.world)
 
         self.network.bind({
-            actor.TurnRequest: self.on_turn_request
+            actor.TurnRequest: self.on_turn_request,
+            ClientDetached: self.on_client_detached,
+            ClientResumed: self.on_client_resumed
         })
-    
+
     def current_turn(self):
         if self.turn_index == -1:
             return None
         return self.actors[self.turn_index]
-    
+
     def next_turn(self):
-        self.turn_index = (self.turn_index + 1) % len(self.actors)
-        a = self.current_turn()
+        """
+        Passes the turn to the next actor whose client is connected, nobody
+        has the turn when there's none.
+        """
+        for _ in range(len(self.actors)):
+            self.turn_index = (self.turn_index + 1) % len(self.actors)
+            if self.current_turn().client not in self.detached:
+                self.prepare_turn(self.current_turn())
+                return
 
-        turn_request = actor.PrepareTurnRequest({
+        self.turn_index = -1
+
+    def prepare_turn(self, a):
+        """
+        Sends the actor's client the request to take its turn.
+        """
+        turn_request = actor.PrepareTurnRequest.trusted({
             "actor": {
                 "type": a.representation(),
                 "x": a.x,
@@ -30,36 +60,101 @@ class TurnManager:
 
                 "senses": a.gather_senses_information(),
                 "condition": {
-                    "hunger": 0.0,
-                    "thirst": 0.0,
-                    "temperature": 0.0,
-                    "health": 100.0
+                    "hunger": float(a.condition.hunger),
+                    "thirst": float(a.condition.thirst),
+                    "temperature": float(a.condition.temperature),
+                    "health": float(a.condition.health)
                 }
             }
         })
-        self.network.send_to(self.current_turn().client, turn_request)
+        self.network.send_to(a.client, turn_request)
 
     def register_actor(self, actor):
         self.actors.append(actor)
         self.client_actors[actor.client] = actor
 
-        if len(self.actors) == 1:
+        if self.turn_index == -1:
             self.next_turn()
 
     def unregister_client(self, client):
         actor = self.client_actors[client]
         del self.client_actors[client]
+        self.turn_requests.pop(actor, None)
+        self.detached.discard(client)
+
+        index = self.actors.index(actor)
         self.actors.remove(actor)
+        self.engine.discard(actor)
 
         if len(self.actors) == 0:
             self.turn_index = -1
+        elif index < self.turn_index:
+            self.turn_index -= 1
+        elif index == self.turn_index:
+            # The leaving actor had the turn, pass it over to the next one
+            self.turn_index -= 1
+            self.next_turn()
 
         return actor
 
+    def on_client_detached(self, message, client):
+        if client not in self.client_actors:
+            return
+
+        self.detached.add(client)
+        current = self.current_turn()
+        # A submitted action still gets executed, which passes the turn on
+        if current is self.client_actors[client] and not self.engine.is_pending(current):
+            self.next_turn()
+
+    def on_client_resumed(self, message, client):
+        self.detached.discard(client)
+        if self.turn_index == -1 and client in self.client_actors:
+            self.next_turn()
+
     def on_turn_request(self, message, client):
         current = self.current_turn()
         if not current or current.client != client:
-            self.network.send(client, actor.TurnResult({
+            self.network.respond(client, message, actor.TurnResult.trusted({
                 "success": False,
                 "error": "Other client's turn is in progress"
-            }))
\ No newline at end of file
+            }))
+            return
+
+        try:
+            self.engine.submit(current, Action.from_message(message.action))
+        except ActionError as e:
+            self.network.respond(client, message, actor.TurnResult.trusted({
+                "success": False,
+                "error": str(e)
+            }))
+            return
+
+        self.turn_requests[current] = message
+
+    def update(self):
+        """
+        Executes the submitted action, reports its result and advances the
+        turn when it succeeded.
+
+        Returns True when the world has changed.
+        """
+        if not self.engine.pending:
+            return False
+
+        changed = False
+        for a, action, error in self.engine.execute():
+            self.network.respond(a.client, self.turn_requests.pop(a), actor.TurnResult.trusted({
+                "success": error is None,
+                "error": error
+            }))
+
+            if error is not None:
+                continue
+
+            a.metabolize()
+            changed = True
+            if a is self.current_turn():
+                self.next_turn()
+
+        return changed
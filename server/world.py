@@ -1,4 +1,7 @@
-from shared.net.cave_world_protocol.world import DataResponse as WorldDataResponse
+from shared.net.cave_world_protocol.world import DataResponse as WorldDataResponse, \
+    PackedDataResponse as PackedWorldDataResponse
+from shared.packing import pack_world
+from server.changes import ChangeLog
 from shared.world import World as SharedWorld, Object as SharedObject
 from abc import ABC, abstractmethod
 import math
@@ -39,6 +42,10 @@ class EdibleFruit(Object):
             "hearing": set()
         }
 
+    def on_eat(self, actor):
+        actor.condition.hunger = max(0.0, actor.condition.hunger - 20.0)
+        return True
+
 class PoisonousFruit(Object):
     def __init__(self):
         super().__init__("fruit_red")
@@ -48,6 +55,11 @@ class PoisonousFruit(Object):
             "hearing": set()
         }
 
+    def on_eat(self, actor):
+        actor.condition.hunger = max(0.0, actor.condition.hunger - 5.0)
+        actor.condition.health -= 20.0
+        return True
+
 class Stone(Object):
     def __init__(self):
         super().__init__("stone")
@@ -57,7 +69,32 @@ class Stone(Object):
             "hearing": set()
         }
 
+    def on_pick_up(self, actor):
+        return True
+
 class World(SharedWorld):
+    def new(self, width, height):
+        super().new(width, height)
+        self.changes = ChangeLog()
+
+    @property
+    def version(self):
+        return self.changes.version
+
+    def set_object(self, x, y, object):
+        """
+        Places the object (or None) on the tile, recording the change.
+        """
+        self.data[x][y].object = object
+        self.changes.mark(x, y)
+
+    def flush_changes(self):
+        """
+        Returns the positions of the tiles changed since the last call,
+        advancing the world's version when there were any.
+        """
+        return self.changes.flush()
+
     def generate(self):
         """
         Mutates the world's data with the specified algorithm to make it varied
@@ -94,8 +131,15 @@ class World(SharedWorld):
                     })
                 tiles.append(row)
 
-            return WorldDataResponse(
+            return WorldDataResponse.trusted(
                 width=self.w,
                 height=self.h,
                 tiles=tiles
-            )
\ No newline at end of file
+            )
+
+    def construct_packed_world_data_response(self):
+        """
+        The same as `construct_world_data_response`, but much smaller and
+        faster to handle, see `shared.packing`.
+        """
+        return PackedWorldDataResponse.trusted(version=self.version, **pack_world(self))
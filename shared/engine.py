@@ -5,6 +5,8 @@
     (SDL2) and allows for creating a window and managing the current state.
 """
 
+import asyncio
+
 from sdl2 import *
 from sdl2.sdlimage import *
 from sdl2.sdlttf import *
@@ -65,6 +67,53 @@ class Engine:
     def set_target_frametime(self, seconds):
         self.target_frametime = seconds
 
+    def step(self):
+        """
+        Runs a single frame: passes the pending events to the current `State`,
+        updates and draws it.
+
+        Returns False when the window was closed.
+        """
+        run = True
+        ev = SDL_Event()
+        while SDL_PollEvent(ev) != 0:
+            if ev.type == SDL_WINDOWEVENT:
+                if ev.window.event == SDL_WINDOWEVENT_CLOSE:
+                    run = False
+
+            elif ev.type == SDL_MOUSEBUTTONDOWN:
+                
+                self.state.mouse_pressed(
+                    x = ev.button.x,
+                    y = ev.button.y,
+                    button = Engine.MOUSE_BUTTON_LOOKUP.get(ev.button.button, "?")
+                )
+
+            elif ev.type == SDL_MOUSEBUTTONUP:
+                self.state.mouse_released(
+                    x = ev.button.x,
+                    y = ev.button.y,
+                    button = Engine.MOUSE_BUTTON_LOOKUP.get(ev.button.button, "?")
+                )
+
+            elif ev.type == SDL_KEYDOWN:
+                self.state.key_pressed(key = ev.key.keysym.sym)
+
+            elif ev.type == SDL_KEYUP:
+                self.state.key_released(key = ev.key.keysym.sym)
+
+            elif ev.type == SDL_TEXTINPUT:
+                self.state.text_input(bytes(ev.text.text).decode('utf8'))
+
+        self.state.update(self.target_frametime)
+
+        SDL_SetRenderDrawColor(self.renderer, 255, 255, 255, 255)
+        SDL_RenderClear(self.renderer)
+        self.state.draw()
+        SDL_RenderPresent(self.renderer)
+
+        return run
+
     def loop(self):
         """
         Runs the engine's main loop. Should be always called at the end of
@@ -73,47 +122,17 @@ class Engine:
         It handles the updating, drawing and event passing for the current
         `State`.
         """
-        run = True
-        ev = SDL_Event()
-        while run:
-            while SDL_PollEvent(ev) != 0:
-                if ev.type == SDL_WINDOWEVENT:
-                    if ev.window.event == SDL_WINDOWEVENT_CLOSE:
-                        run = False
-
-                elif ev.type == SDL_MOUSEBUTTONDOWN:
-                    
-                    self.state.mouse_pressed(
-                        x = ev.button.x,
-                        y = ev.button.y,
-                        button = Engine.MOUSE_BUTTON_LOOKUP.get(ev.button.button, "?")
-                    )
-
-                elif ev.type == SDL_MOUSEBUTTONUP:
-                    self.state.mouse_released(
-                        x = ev.button.x,
-                        y = ev.button.y,
-                        button = Engine.MOUSE_BUTTON_LOOKUP.get(ev.button.button, "?")
-                    )
-
-                elif ev.type == SDL_KEYDOWN:
-                    self.state.key_pressed(key = ev.key.keysym.sym)
-
-                elif ev.type == SDL_KEYUP:
-                    self.state.key_released(key = ev.key.keysym.sym)
-
-                elif ev.type == SDL_TEXTINPUT:
-                    self.state.text_input(bytes(ev.text.text).decode('utf8'))
-
-            self.state.update(self.target_frametime)
-
-            SDL_SetRenderDrawColor(self.renderer, 255, 255, 255, 255)
-            SDL_RenderClear(self.renderer)
-            self.state.draw()
-            SDL_RenderPresent(self.renderer)
-
+        while self.step():
             SDL_Delay(1000//30);
 
+    async def loop_async(self):
+        """
+        Same as `loop`, but runs as a task of the running event loop, which is
+        free to run other tasks between the frames.
+        """
+        while self.step():
+            await asyncio.sleep(1/30)
+
     def __enter__(self):
         assert(SDL_Init(SDL_INIT_EVENTS
                         | SDL_INIT_VIDEO
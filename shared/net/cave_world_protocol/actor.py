@@ -48,9 +48,22 @@ class PrepareTurnRequest(Message):
     def model(self):
         self.actor = Type(Actor)
 
+class Action(Model):
+    """
+    A single action the actor wants to perform in its turn.
+
+    `dx` and `dy` point at the neighbouring tile the action refers to
+    (the destination of a move, the object to eat or to pick up) and are
+    expected to be in the range [-1, 1]. They are ignored when waiting.
+    """
+    def model(self):
+        self.type = Enum("move", "eat", "pick_up", "wait")
+        self.dx = Type(int)
+        self.dy = Type(int)
+
 class TurnRequest(Message):
     def model(self):
-        pass
+        self.action = Type(Action)
 
 class TurnResult(Message):
     def model(self):
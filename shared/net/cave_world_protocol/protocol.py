@@ -1,6 +1,9 @@
 from .. import protocol
+from ..model import Type
 from . import \
-    actor, client, world
+    actor, client, session, world
+
+CORRELATION = Type(int)
 
 class CaveWorldProtocol(protocol.Protocol):
     """
@@ -60,15 +63,23 @@ class CaveWorldProtocol(protocol.Protocol):
     def wrap(self, message):
         id = self.get_id_from_message(message)
 
-        return {
+        wrapped = {
             "id": id,
             "message": message.as_dict()
         }
+        if message.correlation is not None:
+            wrapped["correlation"] = message.correlation
+        return wrapped
 
     def unwrap(self, raw : dict):
         id = raw["id"]
         message_class = self.get_message_from_id(id)
-        return message_class(raw["message"])
+        message = message_class(raw["message"])
+
+        correlation = raw.get("correlation")
+        if correlation is not None:
+            message.correlation = CORRELATION(correlation)
+        return message
 
 CaveWorldProtocol.messages(
     # Actor
@@ -84,7 +95,18 @@ CaveWorldProtocol.messages(
 
     # World
     world.DataResponse,
-    world.DataRequest
+    world.DataRequest,
+    world.PackedDataResponse,
+    world.Delta,
+    world.Watch,
+    world.StreamRequest,
+    world.StreamStart,
+    world.Chunk,
+    world.StreamAck,
+
+    # Session
+    session.Session,
+    session.ResumeResult
 )
 
 print("CaveWorld protocol:")
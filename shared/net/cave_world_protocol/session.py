@@ -0,0 +1,27 @@
+"""
+Messages of the resumable sessions, see `shared.net.network.replay`.
+"""
+
+from ..protocol import Message
+from ..model import * # pylint: disable=unused-wildcard-import
+
+class Session(Message):
+    """
+    The first message of a new session, the client resumes the session by
+    reconnecting with its `token`.
+    """
+    def model(self):
+        self.token = Type(str)
+
+    def __repr__(self):
+        return "Session()"
+
+class ResumeResult(Message):
+    """
+    The server's answer to the resume request, sent before anything else.
+    On success the server continues the session after the `received` frames
+    it has received from the client, otherwise a new session starts.
+    """
+    def model(self):
+        self.success = Type(bool)
+        self.received = Type(int)
@@ -20,4 +20,143 @@ class DataResponse(Message):
         self.width = Type(int)
         self.height = Type(int)
         self.tiles = List(List(Tile))
-    
\ No newline at end of file
+
+class PlacedObject(Model):
+    def model(self):
+        self.x = Type(int)
+        self.y = Type(int)
+        self.repr = Type(str)
+
+class PackedDataResponse(Message):
+    """
+    The whole world, stored by columns instead of by tiles: `types` has
+    a byte and `heights` a little-endian float32 for every tile, both indexed
+    by `x * height + y`, while `objects` only lists the tiles with an object.
+
+    `version` is the world's version, see `Delta`.
+    """
+    def model(self):
+        self.version = Type(int)
+        self.width = Type(int)
+        self.height = Type(int)
+        self.types = Bytes()
+        self.heights = Bytes()
+        self.objects = List(PlacedObject)
+
+    def coalesce(self, previous):
+        # The whole world supersedes the previous changes
+        if isinstance(previous, (PackedDataResponse, Delta)):
+            return self
+        return None
+
+class TileChange(Model):
+    """
+    The new state of a single tile.
+    """
+    def model(self):
+        self.x = Type(int)
+        self.y = Type(int)
+        self.type = Type(int)
+        self.z = Type(float)
+        self.object = Option(Type(Object))
+
+def tile_position(tile):
+    """
+    Returns the position of the `TileChange`, which is a plain dict in the
+    deltas constructed with `Delta.trusted`.
+    """
+    if isinstance(tile, dict):
+        return tile["x"], tile["y"]
+    return tile.x, tile.y
+
+class Delta(Message):
+    """
+    The tiles which have changed between the world's version `base` and
+    `version`. It can only be applied to the world of the `base` version,
+    otherwise some changes were missed and the whole world has to be requested.
+    """
+
+    """
+    A dropped delta only makes the client request the whole world.
+    """
+    critical = False
+
+    def model(self):
+        self.base = Type(int)
+        self.version = Type(int)
+        self.tiles = List(TileChange)
+
+    def coalesce(self, previous):
+        if not isinstance(previous, Delta) or previous.version != self.base:
+            return None
+
+        tiles = {tile_position(t): t for t in previous.tiles}
+        tiles.update((tile_position(t), t) for t in self.tiles)
+        return Delta.trusted(
+            base=previous.base,
+            version=self.version,
+            tiles=list(tiles.values())
+        )
+
+class Watch(Message):
+    """
+    Subscribes the client to the changes of the world in the rectangle of
+    tiles (e.g. its camera's view), in addition to the ones around its actor.
+    An empty rectangle unsubscribes it.
+    """
+    def model(self):
+        self.x = Type(int)
+        self.y = Type(int)
+        self.width = Type(int)
+        self.height = Type(int)
+
+class StreamRequest(Message):
+    """
+    Requests the whole world streamed in `Chunk`s, instead of a single
+    `PackedDataResponse`, starting with the ones in the rectangle of tiles
+    (e.g. the client's view, when empty: around its actor).
+
+    At most `window` chunks are sent before the client acknowledges them with
+    `StreamAck`.
+    """
+    def model(self):
+        self.x = Type(int)
+        self.y = Type(int)
+        self.width = Type(int)
+        self.height = Type(int)
+        self.window = Type(int)
+
+class StreamStart(Message):
+    """
+    Starts the streamed world of the size, of which `chunks` are going to be
+    sent. The deltas sent afterwards are based on the `version`, the chunks
+    are always sent as they are at the time.
+    """
+    def model(self):
+        self.version = Type(int)
+        self.width = Type(int)
+        self.height = Type(int)
+        self.chunks = Type(int)
+
+class Chunk(Message):
+    """
+    The rectangle of tiles at `x`, `y`, of the streamed world, packed the same
+    way as `PackedDataResponse` (the objects' positions are relative to the
+    rectangle).
+    """
+    def model(self):
+        self.x = Type(int)
+        self.y = Type(int)
+        self.width = Type(int)
+        self.height = Type(int)
+        self.types = Bytes()
+        self.heights = Bytes()
+        self.objects = List(PlacedObject)
+
+class StreamAck(Message):
+    """
+    Acknowledges `count` chunks applied by the client, so the server can send
+    as many more.
+    """
+    def model(self):
+        self.count = Type(int)
@@ -0,0 +1,843 @@
+"""
+Codecs turn messages into the data sent over the websocket and back.
+
+`JsonCodec` sends the protocol's wrapped messages as JSON text frames, with
+`Bytes` encoded as base64 strings.
+
+`BinaryCodec` sends binary frames laid out according to the messages' models
+(the validators declared in `Model.model`):
+- `Type(int)`, `Type(float)` and `Type(bool)` are packed with `struct`
+  (consecutive ones with a single `struct` call),
+- `Bytes` is the data's length followed by the data,
+- `Type(str)` and `Enum` are indices to the frame's table of interned
+  strings, so every distinct string is sent only once per frame,
+- `List` is the element count followed by the elements laid out by columns:
+  a list of models holds every field of all of the models in turn (nested
+  lists and options likewise, see `Field.encode_column`), so the scalars,
+  string indices, counts and presence bytes are decoded in bulk,
+- `Option` is a presence byte followed by the value, when it's present,
+- `Type(Model)` is the nested model's fields in the declaration order,
+- anything else (`Any`, `AnyOf`, ...) falls back to a JSON string.
+
+A frame is: the message id (uint16), the string table (count, then every
+string's byte length and its UTF-8 bytes), and the message's fields. Counts,
+lengths and string indices are varints.
+
+Many messages can be sent in a single frame, as a batch: the JSON one is an
+array of the wrapped messages, the binary one has the `BinaryCodec.BATCH` id
+followed by the count of the messages and every message's length and frame.
+
+`ZlibCodec` wraps either of them, compressing the frames bigger than
+a threshold.
+
+The codec is negotiated at connection as the websocket's subprotocol, the
+`JsonCodec` is used when the other side doesn't support any.
+"""
+
+from abc import ABC, abstractmethod
+import base64
+import inspect
+import json
+import struct
+import zlib
+
+from shared.stats import Stats
+from .model import Bytes, Enum, List, Model, Option, Type, Validator, \
+    ValidationException
+
+class Codec(ABC):
+    """
+    Encodes messages of the provided protocol into data to be sent and decodes
+    the received data back into messages.
+    """
+
+    """
+    The websocket subprotocol name of the codec.
+    """
+    name = None
+
+    """
+    Whether the codec sends text frames (`str`) instead of binary ones.
+    """
+    text = False
+
+    def __init__(self, protocol):
+        self.protocol = protocol
+
+    @abstractmethod
+    def encode(self, message):
+        """
+        Returns the data (`str` for text frames, `bytes` for binary frames)
+        of the message.
+        """
+        pass
+
+    @abstractmethod
+    def decode(self, data):
+        """
+        Returns the (validated) message of the received data.
+        """
+        pass
+
+    @property
+    def piece_name(self):
+        """
+        Name of the encoding of the messages joined into batches, codecs with
+        the same one can share the encoded messages.
+        """
+        return self.name
+
+    def encode_piece(self, message):
+        """
+        Returns the encoded message to be joined into a frame with `join`.
+        """
+        return self.encode(message)
+
+    @abstractmethod
+    def join(self, pieces):
+        """
+        Returns the frame of the batch of the encoded messages, a single one
+        is sent as it is.
+        """
+        pass
+
+    @abstractmethod
+    def decode_all(self, data):
+        """
+        Returns the list of the (validated) messages of the received data,
+        which can be a batch.
+        """
+        pass
+
+class JsonCodec(Codec):
+    name = "caveworld.json"
+    text = True
+
+    @staticmethod
+    def default(value):
+        if isinstance(value, Model):
+            # The nested models are serialized the same way, by the encoder
+            fields = vars(value)
+            return {name: fields[name] for name, _ in value.schema().fields}
+        if isinstance(value, (bytes, bytearray)):
+            return base64.b64encode(value).decode()
+        raise TypeError(f"{value.__class__} is not JSON serializable")
+
+    def encode(self, message):
+        # The same as `self.protocol.wrap(message)`, without `as_dict`
+        wrapped = {
+            "id": self.protocol.get_id_from_message(message),
+            "message": message,
+        }
+        if message.correlation is not None:
+            wrapped["correlation"] = message.correlation
+        return json.dumps(wrapped, default=self.default)
+
+    def decode(self, data):
+        return self.protocol.unwrap(json.loads(data))
+
+    def join(self, pieces):
+        if len(pieces) == 1:
+            return pieces[0]
+        return "[" + ",".join(pieces) + "]"
+
+    def decode_all(self, data):
+        raw = json.loads(data)
+        if isinstance(raw, list):
+            return [self.protocol.unwrap(r) for r in raw]
+        return [self.protocol.unwrap(raw)]
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, offset):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+def read_varints(data, offset, count):
+    """
+    Returns the list of the `count` varints at the offset and the offset
+    right after them.
+    """
+    values = bytes(data[offset:offset + count])
+    if len(values) == count and (count == 0 or max(values) < 0x80):
+        # All of them are single bytes
+        return list(values), offset + count
+
+    result = []
+    for _ in range(count):
+        value, offset = read_varint(data, offset)
+        result.append(value)
+    return result, offset
+
+class Strings:
+    """
+    Table of the strings interned while encoding a single frame.
+    """
+    def __init__(self):
+        self.ids = {}
+
+    def intern(self, string):
+        id = self.ids.get(string)
+        if id is None:
+            id = self.ids[string] = len(self.ids)
+        return id
+
+    def write(self, out):
+        write_varint(out, len(self.ids))
+        for string in self.ids:
+            data = string.encode()
+            write_varint(out, len(data))
+            out += data
+
+    @staticmethod
+    def read(data, offset):
+        count, offset = read_varint(data, offset)
+        strings = []
+        for _ in range(count):
+            length, offset = read_varint(data, offset)
+            strings.append(bytes(data[offset:offset + length]).decode())
+            offset += length
+        return strings, offset
+
+"""
+`struct` formats of the types which are packed directly.
+"""
+SCALARS = {
+    int: "i",
+    float: "d",
+    bool: "?"
+}
+
+def fields(model_class):
+    """
+    Returns a list of `(name, validator)` of the fields declared by the model
+    class, in the declaration order.
+    """
+    return model_class.schema().fields
+
+class Field(ABC):
+    """
+    Encoder and decoder of a single value, compiled from its validator.
+
+    The elements of a list are encoded as a column (`encode_column`), which
+    fields can lay out so that it's decoded in bulk.
+    """
+    @abstractmethod
+    def encode(self, value, out, strings):
+        """
+        Appends the encoded value to `out` (a `bytearray`), interning its
+        strings in `strings`.
+        """
+        pass
+
+    @abstractmethod
+    def decode(self, data, offset, strings):
+        """
+        Returns the value decoded from the data at the offset and the offset
+        right after it.
+        """
+        pass
+
+    def encode_column(self, values, out, strings):
+        """
+        Appends the encoded list of values to `out`, by default one after
+        another.
+        """
+        encode = self.encode
+        for value in values:
+            encode(value, out, strings)
+
+    def decode_column(self, data, offset, strings, count):
+        """
+        Returns the list of the `count` values encoded by `encode_column` and
+        the offset right after them.
+        """
+        decode = self.decode
+        result = []
+        for _ in range(count):
+            value, offset = decode(data, offset, strings)
+            result.append(value)
+        return result, offset
+
+class Scalars:
+    """
+    A run of consecutive scalar fields of a model packed with a single struct,
+    part of a `ModelField`. Unlike a `Field` it packs the values of the
+    model's dict of fields and unpacks them into a dict.
+    """
+    def __init__(self, names, formats):
+        self.names = names
+        self.struct = struct.Struct("<" + "".join(formats))
+
+    def pack(self, ds, out):
+        """
+        Packs the values of the dicts one after another.
+        """
+        pack = self.struct.pack
+        names = self.names
+        try:
+            for d in ds:
+                out += pack(*[d[name] for name in names])
+        except struct.error as e:
+            raise ValidationException(f"Can't pack {self.names}: {e}")
+
+    def unpack(self, data, offset, ds):
+        """
+        Stores the values packed one after another in the dicts, returns the
+        offset after them.
+        """
+        end = offset + self.struct.size * len(ds)
+        if end > len(data):
+            raise IndexError("Scalars past the end of the frame")
+        names = self.names
+        for d, values in zip(ds, self.struct.iter_unpack(data[offset:end])):
+            d.update(zip(names, values))
+        return end
+
+class ScalarField(Field):
+    def __init__(self, format):
+        self.struct = struct.Struct("<" + format)
+
+    def encode(self, value, out, strings):
+        try:
+            out += self.struct.pack(value)
+        except struct.error as e:
+            raise ValidationException(f"Can't pack {value!r}: {e}")
+
+    def decode(self, data, offset, strings):
+        return self.struct.unpack_from(data, offset)[0], offset + self.struct.size
+
+    def decode_column(self, data, offset, strings, count):
+        end = offset + self.struct.size * count
+        if end > len(data):
+            raise IndexError("Scalars past the end of the frame")
+        return [value for value, in self.struct.iter_unpack(data[offset:end])], end
+
+class StringField(Field):
+    def encode(self, value, out, strings):
+        if not isinstance(value, str):
+            raise ValidationException(f"Expected a string instead of {value.__class__}")
+        write_varint(out, strings.intern(value))
+
+    def decode(self, data, offset, strings):
+        id, offset = read_varint(data, offset)
+        return strings[id], offset
+
+    def decode_column(self, data, offset, strings, count):
+        ids, offset = read_varints(data, offset, count)
+        return [strings[id] for id in ids], offset
+
+class BytesField(Field):
+    def encode(self, value, out, strings):
+        if not isinstance(value, (bytes, bytearray)):
+            raise ValidationException(f"Expected bytes instead of {value.__class__}")
+        write_varint(out, len(value))
+        out += value
+
+    def decode(self, data, offset, strings):
+        length, offset = read_varint(data, offset)
+        if offset + length > len(data):
+            raise IndexError("Bytes past the end of the frame")
+        return bytes(data[offset:offset + length]), offset + length
+
+class JsonField(Field):
+    def encode(self, value, out, strings):
+        write_varint(out, strings.intern(json.dumps(value)))
+
+    def decode(self, data, offset, strings):
+        id, offset = read_varint(data, offset)
+        return json.loads(strings[id]), offset
+
+class ListField(Field):
+    """
+    The element count followed by the column of the elements. A column of
+    lists is all of their counts followed by the single column of all of
+    their elements.
+    """
+    def __init__(self, element):
+        self.element = element
+
+    def encode(self, value, out, strings):
+        write_varint(out, len(value))
+        self.element.encode_column(value, out, strings)
+
+    def decode(self, data, offset, strings):
+        count, offset = read_varint(data, offset)
+        return self.element.decode_column(data, offset, strings, count)
+
+    def encode_column(self, values, out, strings):
+        for value in values:
+            write_varint(out, len(value))
+        self.element.encode_column(
+            [element for value in values for element in value], out, strings
+        )
+
+    def decode_column(self, data, offset, strings, count):
+        counts, offset = read_varints(data, offset, count)
+        elements, offset = self.element.decode_column(data, offset, strings, sum(counts))
+
+        result = []
+        start = 0
+        for length in counts:
+            result.append(elements[start:start + length])
+            start += length
+        return result, offset
+
+class OptionField(Field):
+    """
+    A presence byte followed by the value. A column of options is all of the
+    presence bytes followed by the column of the present values.
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def encode(self, value, out, strings):
+        if value is None:
+            out.append(0)
+        else:
+            out.append(1)
+            self.value.encode(value, out, strings)
+
+    def decode(self, data, offset, strings):
+        if data[offset] == 0:
+            return None, offset + 1
+        return self.value.decode(data, offset + 1, strings)
+
+    def encode_column(self, values, out, strings):
+        out += bytes(value is not None for value in values)
+        self.value.encode_column(
+            [value for value in values if value is not None], out, strings
+        )
+
+    def decode_column(self, data, offset, strings, count):
+        present = bytes(data[offset:offset + count])
+        if len(present) < count:
+            raise IndexError("Options past the end of the frame")
+
+        values, offset = self.value.decode_column(
+            data, offset + count, strings, count - present.count(0)
+        )
+        values = iter(values)
+        return [next(values) if p else None for p in present], offset
+
+class ModelField(Field):
+    """
+    All of the fields of a model. Encodes either a model or a dict of its
+    fields, decodes into a dict. The runs of its scalar fields are packed by
+    `Scalars`. A column of models is the column of every field in turn, so
+    the scalars of all of the models are unpacked at once.
+    """
+    def __init__(self, model_class):
+        self.model_class = model_class
+        self.parts = None
+
+    def compile(self, compiled):
+        self.parts = []
+        scalars = []
+        formats = []
+
+        def flush():
+            if scalars:
+                self.parts.append((None, Scalars(list(scalars), list(formats))))
+                scalars.clear()
+                formats.clear()
+
+        for name, validator in fields(self.model_class):
+            format = scalar_format(validator)
+            if format is not None:
+                scalars.append(name)
+                formats.append(format)
+                continue
+
+            flush()
+            self.parts.append((name, compile_field(validator, compiled)))
+        flush()
+
+    def encode(self, value, out, strings):
+        d = value if isinstance(value, dict) else vars(value)
+        try:
+            for name, part in self.parts:
+                if name is None:
+                    part.pack([d], out)
+                else:
+                    part.encode(d[name], out, strings)
+        except KeyError as e:
+            raise ValidationException(f"Expected key {e}")
+
+    def decode(self, data, offset, strings):
+        d = {}
+        for name, part in self.parts:
+            if name is None:
+                offset = part.unpack(data, offset, [d])
+            else:
+                d[name], offset = part.decode(data, offset, strings)
+        return d, offset
+
+    def encode_column(self, values, out, strings):
+        ds = [value if isinstance(value, dict) else vars(value) for value in values]
+        try:
+            for name, part in self.parts:
+                if name is None:
+                    part.pack(ds, out)
+                else:
+                    part.encode_column([d[name] for d in ds], out, strings)
+        except KeyError as e:
+            raise ValidationException(f"Expected key {e}")
+
+    def decode_column(self, data, offset, strings, count):
+        # Every model takes at least a byte, unless it has no fields
+        if self.parts and count > len(data) - offset:
+            raise IndexError("Models past the end of the frame")
+
+        ds = [{} for _ in range(count)]
+        for name, part in self.parts:
+            if name is None:
+                offset = part.unpack(data, offset, ds)
+            else:
+                values, offset = part.decode_column(data, offset, strings, count)
+                for d, value in zip(ds, values):
+                    d[name] = value
+        return ds, offset
+
+def scalar_format(validator):
+    if type(validator) is Type and validator.type in SCALARS:
+        return SCALARS[validator.type]
+    return None
+
+def compile_field(validator, compiled):
+    """
+    Returns the `Field` for the validator, `compiled` holds the `ModelField`s
+    compiled so far, so that every model is compiled once.
+    """
+    if inspect.isclass(validator):
+        validator = Type(validator)
+
+    if isinstance(validator, List):
+        return ListField(compile_field(validator.type, compiled))
+
+    if isinstance(validator, Option):
+        return OptionField(compile_field(validator.type, compiled))
+
+    if isinstance(validator, Enum):
+        return StringField()
+
+    if isinstance(validator, Bytes):
+        return BytesField()
+
+    if type(validator) is Type:
+        t = validator.type
+        if inspect.isclass(t) and issubclass(t, Model):
+            if t not in compiled:
+                field = compiled[t] = ModelField(t)
+                field.compile(compiled)
+            return compiled[t]
+        if t in SCALARS:
+            return ScalarField(SCALARS[t])
+        if t is str:
+            return StringField()
+        if isinstance(t, Validator):
+            return compile_field(t, compiled)
+
+    return JsonField()
+
+class BinaryCodec(Codec):
+    name = "caveworld.binary"
+
+    HEADER = struct.Struct("<H")
+
+    """
+    The id of a batch frame, never used by a message.
+    """
+    BATCH = 0xffff
+
+    """
+    The id of a message with a correlation id (see `Message.correlation`),
+    never used by a message: it's followed by the correlation id (a varint)
+    and the message itself.
+    """
+    CORRELATED = 0xfffe
+
+    """
+    The compiled `ModelField`s by the model class, shared by all of the
+    codecs. A model gets compiled into a copy, which is only merged once
+    complete, so the codecs can be used from many threads.
+    """
+    compiled = {}
+
+    def model_field(self, message_class):
+        field = self.compiled.get(message_class)
+        if field is None:
+            compiled = dict(self.compiled)
+            field = compile_field(Type(message_class), compiled)
+            BinaryCodec.compiled.update(compiled)
+        return field
+
+    def encode(self, message):
+        id = self.protocol.get_id_from_message(message)
+        strings = Strings()
+        payload = bytearray()
+        self.model_field(message.__class__).encode(message, payload, strings)
+
+        if message.correlation is None:
+            out = bytearray(self.HEADER.pack(id))
+        else:
+            out = bytearray(self.HEADER.pack(self.CORRELATED))
+            write_varint(out, message.correlation)
+            out += self.HEADER.pack(id)
+        strings.write(out)
+        out += payload
+        return bytes(out)
+
+    def decode(self, data):
+        if isinstance(data, str):
+            raise ValidationException("Expected a binary frame")
+
+        data = memoryview(data)
+        correlation = None
+        try:
+            id, = self.HEADER.unpack_from(data, 0)
+            offset = self.HEADER.size
+            if id == self.CORRELATED:
+                correlation, offset = read_varint(data, offset)
+                id, = self.HEADER.unpack_from(data, offset)
+                offset += self.HEADER.size
+
+            message_class = self.protocol.get_message_from_id(id)
+            strings, offset = Strings.read(data, offset)
+            d, offset = self.model_field(message_class).decode(data, offset, strings)
+        except (IndexError, KeyError, struct.error, UnicodeDecodeError) as e:
+            raise ValidationException(f"Malformed binary frame: {e!r}")
+
+        message = message_class(d)
+        if correlation is not None:
+            message.correlation = correlation
+        return message
+
+    def join(self, pieces):
+        if len(pieces) == 1:
+            return pieces[0]
+
+        out = bytearray(self.HEADER.pack(self.BATCH))
+        write_varint(out, len(pieces))
+        for piece in pieces:
+            write_varint(out, len(piece))
+            out += piece
+        return bytes(out)
+
+    def decode_all(self, data):
+        if isinstance(data, str):
+            raise ValidationException("Expected a binary frame")
+
+        data = memoryview(data)
+        try:
+            id, = self.HEADER.unpack_from(data, 0)
+            if id != self.BATCH:
+                return [self.decode(data)]
+
+            pieces = []
+            count, offset = read_varint(data, self.HEADER.size)
+            for _ in range(count):
+                length, offset = read_varint(data, offset)
+                if offset + length > len(data):
+                    raise IndexError("Message past the end of the frame")
+                pieces.append(data[offset:offset + length])
+                offset += length
+        except (IndexError, struct.error) as e:
+            raise ValidationException(f"Malformed binary frame: {e!r}")
+
+        return [self.decode(piece) for piece in pieces]
+
+class CompressionStats:
+    """
+    Measurements of the compression, shared by the codecs of all of the
+    connections: the time of compressing and decompressing a frame (in
+    seconds) and the ratio of the compressed to the original size.
+    """
+    def __init__(self):
+        self.compress = Stats()
+        self.decompress = Stats()
+        self.ratio = Stats()
+
+        self.original_bytes = 0
+        self.compressed_bytes = 0
+        # Frames sent uncompressed, because they were smaller than the threshold
+        self.skipped = 0
+
+    def report(self):
+        """
+        Returns a human readable summary of the measurements.
+        """
+        saved = self.original_bytes - self.compressed_bytes
+        return "\n".join([
+            f"compressed frames: {self.compress.count}, skipped: {self.skipped}",
+            f"bytes: {self.original_bytes} -> {self.compressed_bytes} (saved {saved})",
+            f"ratio: {self.ratio}",
+            f"compress: {self.compress}",
+            f"decompress: {self.decompress}",
+        ])
+
+class ZlibCodec(Codec):
+    """
+    Compresses the frames of the wrapped codec, which are at least
+    `threshold` bytes long, with zlib.
+
+    Uncompressed text frames are sent as they are. Binary frames start with
+    a byte telling whether the rest is compressed, compressed text frames are
+    sent as binary ones.
+    """
+    SUFFIX = "+zlib"
+
+    THRESHOLD = 512
+    LEVEL = 1
+
+    """
+    The biggest size of a decompressed frame, so that a tiny frame can't
+    exhaust the memory.
+    """
+    MAX_SIZE = 64 * 1024 * 1024
+
+    RAW = 0
+    COMPRESSED = 1
+
+    def __init__(self, codec, threshold=THRESHOLD, level=LEVEL, stats=None):
+        super().__init__(codec.protocol)
+        self.codec = codec
+        self.name = codec.name + self.SUFFIX
+        self.threshold = threshold
+        self.level = level
+        self.stats = stats if stats is not None else CompressionStats()
+
+    @property
+    def piece_name(self):
+        return self.codec.piece_name
+
+    def encode(self, message):
+        return self.join([self.codec.encode_piece(message)])
+
+    def encode_piece(self, message):
+        return self.codec.encode_piece(message)
+
+    def join(self, pieces):
+        data = self.codec.join(pieces)
+        raw = data.encode() if self.codec.text else data
+
+        if len(raw) < self.threshold:
+            self.stats.skipped += 1
+            if self.codec.text:
+                return data
+            return bytes((self.RAW,)) + raw
+
+        with self.stats.compress.time():
+            compressed = zlib.compress(raw, self.level)
+
+        self.stats.original_bytes += len(raw)
+        self.stats.compressed_bytes += len(compressed)
+        self.stats.ratio.add(len(compressed) / len(raw))
+        return bytes((self.COMPRESSED,)) + compressed
+
+    def decode(self, data):
+        return self.codec.decode(self.decompress(data))
+
+    def decode_all(self, data):
+        return self.codec.decode_all(self.decompress(data))
+
+    def decompress(self, data):
+        """
+        Returns the wrapped codec's data of the received frame.
+        """
+        if isinstance(data, str):
+            return data
+
+        if len(data) == 0:
+            raise ValidationException("Empty frame")
+
+        flag, payload = data[0], data[1:]
+        if flag == self.COMPRESSED:
+            with self.stats.decompress.time():
+                decompressor = zlib.decompressobj()
+                try:
+                    payload = decompressor.decompress(payload, self.MAX_SIZE)
+                except zlib.error as e:
+                    raise ValidationException(f"Malformed compressed frame: {e}")
+                if decompressor.unconsumed_tail:
+                    raise ValidationException("Decompressed frame is too big")
+        elif flag != self.RAW:
+            raise ValidationException(f"Unknown frame compression {flag}")
+
+        if self.codec.text:
+            try:
+                return payload.decode()
+            except UnicodeDecodeError as e:
+                raise ValidationException(f"Malformed text frame: {e}")
+        return payload
+
+"""
+Compression modes of the connections:
+- `ZLIB`: the frames of at least a threshold size are compressed by the
+  codec (`ZlibCodec`, negotiated as the `+zlib` subprotocols),
+- `DEFLATE`: every frame is compressed by the websocket's permessage-deflate
+  extension (negotiated by the websockets library),
+- None: no compression.
+"""
+ZLIB = "zlib"
+DEFLATE = "deflate"
+COMPRESSIONS = (ZLIB, DEFLATE, None)
+
+"""
+The supported codecs, from the most preferred one.
+"""
+CODECS = (BinaryCodec, JsonCodec)
+
+def subprotocols(compression=ZLIB):
+    """
+    Returns the names of the supported subprotocols, from the most preferred.
+    """
+    names = []
+    for codec in CODECS:
+        if compression == ZLIB:
+            names.append(codec.name + ZlibCodec.SUFFIX)
+        names.append(codec.name)
+    return names
+
+def websocket_compression(compression, server=False):
+    """
+    Returns the `compression` argument of the websockets' `serve` and
+    `connect` for the compression mode.
+
+    The server offers permessage-deflate in every mode but None, it's only
+    used with the clients requesting it (the ones of the `DEFLATE` mode).
+    """
+    if server:
+        return "deflate" if compression is not None else None
+    return "deflate" if compression == DEFLATE else None
+
+def codec_for(subprotocol, protocol, stats=None, threshold=ZlibCodec.THRESHOLD):
+    """
+    Returns the codec negotiated as the websocket's subprotocol, or the
+    `JsonCodec` when none was. `stats` are the `CompressionStats` of the
+    `ZlibCodec`, when it's negotiated.
+    """
+    name = subprotocol or ""
+    compressed = name.endswith(ZlibCodec.SUFFIX)
+    if compressed:
+        name = name[:-len(ZlibCodec.SUFFIX)]
+
+    codec = JsonCodec(protocol)
+    for codec_class in CODECS:
+        if codec_class.name == name:
+            codec = codec_class(protocol)
+
+    if compressed:
+        return ZlibCodec(codec, threshold, stats=stats)
+    return codec
@@ -8,9 +8,19 @@ The class `Model` allows for creating message models which are
 automatically validated (provided they define their fields in terms of
 Any, AnyOf, Type, List) and automatically parsed as dicts (useful for
 generating the protocol information)
+
+The validators of every model class are compiled once (see `Schema`) into
+plain functions, which validate the values without inspecting the
+validators again, and so is the function serializing the models with
+`as_dict`.
+
+The received data is always validated, while the locally produced one can
+skip the validation with `Model.trusted`.
 """
 
 from abc import ABC, abstractmethod
+import base64
+import binascii
 import inspect
 
 
@@ -32,6 +42,29 @@ class Validator:
     def validate(self, value):
         return self(value)
 
+    def compile(self):
+        """
+        Returns a function validating the values the same way as the
+        validator, specialized for its parameters.
+        """
+        return self.__call__
+
+    def dumper(self):
+        """
+        Returns a function turning the values into their `as_dict` form, or
+        None when they're already in it.
+        """
+        return as_dict
+
+def compiled(validator):
+    """
+    Returns the compiled validator, anything which isn't a `Validator`
+    instance (e.g. a type or a model class) is called as is.
+    """
+    if isinstance(validator, Validator) and not inspect.isclass(validator):
+        return validator.compile()
+    return validator
+
 class Any(Validator):
     """
     All types are accepted in place of this variable.
@@ -42,6 +75,11 @@ class Any(Validator):
     def __call__(self, value):
         return value
 
+    def compile(self):
+        def validate(value):
+            return value
+        return validate
+
     def __repr__(self):
         return "Any"
 
@@ -62,6 +100,45 @@ class Type(Validator):
         else:
             raise ValidationException(f"Expected type {self.type} instead of {value.__class__} while validating {self}")
 
+    def compile(self):
+        t = self.type
+        if not inspect.isclass(t) and isinstance(t, Validator):
+            return t.compile()
+
+        def fail(value):
+            raise ValidationException(f"Expected type {t} instead of {value.__class__} while validating {self}")
+
+        if inspect.isclass(t) and issubclass(t, Model):
+            def validate(value):
+                if isinstance(value, dict):
+                    return t(value)
+                if isinstance(value, t):
+                    return value
+                fail(value)
+            return validate
+
+        def validate(value):
+            if isinstance(value, t):
+                return value
+            fail(value)
+        return validate
+
+    def dumper(self):
+        t = self.type
+        if not inspect.isclass(t):
+            return t.dumper() if isinstance(t, Validator) else as_dict
+        if t in PLAIN:
+            return None
+
+        if issubclass(t, Model):
+            def dump(value):
+                if isinstance(value, Model):
+                    return value.as_dict()
+                return as_dict(value)
+            return dump
+
+        return as_dict
+
     def __repr__(self):
         return f"Type({repr(self.type)})"
 
@@ -83,6 +160,26 @@ class List(Type):
 
         return [super(List, self).__call__(el) for el in value]
 
+    def compile(self):
+        element = Type.compile(self)
+
+        def validate(value):
+            if not isinstance(value, list):
+                raise ValidationException(f"Expected a list type instead of {value.__class__}")
+            return [element(el) for el in value]
+        return validate
+
+    def dumper(self):
+        element = Type.dumper(self)
+
+        def dump(value):
+            if not isinstance(value, (list, tuple)):
+                return as_dict(value)
+            if element is None:
+                return list(value)
+            return [element(el) for el in value]
+        return dump
+
     def __repr__(self):
         return f"List({repr(self.type)})"
 
@@ -102,6 +199,18 @@ class AnyOf(Validator):
                 pass
         raise ValidationException(F"Expected any type from {self.types}, not {value.__class__}")
 
+    def compile(self):
+        types = [compiled(t) for t in self.types]
+
+        def validate(value):
+            for t in types:
+                try:
+                    return t(value)
+                except:
+                    pass
+            raise ValidationException(F"Expected any type from {self.types}, not {value.__class__}")
+        return validate
+
     def __repr__(self):
         return f"AnyOf({repr(self.types)})"
 
@@ -116,17 +225,63 @@ class Enum(Validator):
     def __call__(self, value):
         if value in self.variants:
             return value
+        raise ValidationException(f"Expected any of {self.variants} instead of {value!r}")
+
+    def compile(self):
+        variants = self.variants
+
+        def validate(value):
+            if value in variants:
+                return value
+            raise ValidationException(f"Expected any of {variants} instead of {value!r}")
+        return validate
+
+    def dumper(self):
+        return None
+
+    def __repr__(self):
+        return f"Enum({repr(self.variants)})"
+
+class Bytes(Validator):
+    """
+    Binary data. Codecs which can't send it as is (like JSON) send it as
+    a base64 string, which is accepted in its place.
+    """
+    def __call__(self, value):
+        if isinstance(value, (bytes, bytearray)):
+            return bytes(value)
+        if isinstance(value, str):
+            try:
+                return base64.b64decode(value, validate=True)
+            except binascii.Error as e:
+                raise ValidationException(f"Expected base64 encoded data: {e}")
+        raise ValidationException(f"Expected bytes instead of {value.__class__}")
+
+    def dumper(self):
+        return None
+
+    def __repr__(self):
+        return "Bytes"
+
+"""
+The types of the values which are the same in their `as_dict` form.
+"""
+PLAIN = frozenset((int, float, str, bool, bytes, type(None)))
 
 def as_dict(value):
-    try:
+    if type(value) in PLAIN:
+        return value
+    if isinstance(value, Model):
         return value.as_dict()
-    except Exception:
-        if isinstance(value, (list, tuple)):
-            return [as_dict(e) for e in value]
-        elif isinstance(value, (dict)):
-            return {k: as_dict(v) for k, v in value.items()}
-        else:
-            return value
+    if isinstance(value, (list, tuple)):
+        return [as_dict(e) for e in value]
+    if isinstance(value, dict):
+        return {k: as_dict(v) for k, v in value.items()}
+
+    method = getattr(value, "as_dict", None)
+    if method is not None:
+        return method()
+    return value
 
 class Option(Type):
     def __call__(self, value):
@@ -134,49 +289,138 @@ class Option(Type):
             return value
         return super().__call__(value)
 
+    def compile(self):
+        inner = Type.compile(self)
+
+        def validate(value):
+            if value is None:
+                return value
+            return inner(value)
+        return validate
+
+    def dumper(self):
+        inner = Type.dumper(self)
+        if inner is None:
+            return None
+
+        def dump(value):
+            if value is None:
+                return value
+            return inner(value)
+        return dump
+
+def serializer(fields):
+    """
+    Generates the function returning the `as_dict` form of the model's dict
+    of the fields, for the `(name, validator)` pairs of the fields.
+    """
+    namespace = {}
+    items = []
+    for i, (name, validator) in enumerate(fields):
+        dump = dumper(validator)
+        if dump is None:
+            items.append(f"{name!r}: fields[{name!r}]")
+        else:
+            namespace[f"dump_{i}"] = dump
+            items.append(f"{name!r}: dump_{i}(fields[{name!r}])")
+
+    exec(f"def as_dict(fields):\n    return {{{', '.join(items)}}}\n", namespace)
+    return namespace["as_dict"]
+
+def dumper(validator):
+    """
+    Returns the dumper of the validator (see `Validator.dumper`).
+    """
+    if inspect.isclass(validator):
+        return Type(validator).dumper()
+    if isinstance(validator, Validator):
+        return validator.dumper()
+    return as_dict
+
+class Schema:
+    """
+    The fields of a model class: `fields` are the `(name, validator)` pairs
+    declared by `Model.model`, in the declaration order, `validators` are
+    the `(name, function)` pairs of their compiled validators and
+    `serialize` is the function generated by `serializer`.
+
+    Computed once per model class, by `Model.schema`.
+    """
+    def __init__(self, model_class):
+        instance = model_class.__new__(model_class)
+        instance.model()
+
+        self.fields = [
+            (k, v) for k, v in vars(instance).items()
+            if not k.startswith("_")
+        ]
+        self.names = frozenset(name for name, _ in self.fields)
+        self.validators = [(name, compiled(v)) for name, v in self.fields]
+        self.serialize = serializer(self.fields)
+
+    def check_keys(self, data):
+        """
+        Raises `ValidationException` if the data has keys which aren't the
+        model's fields.
+        """
+        for k in data:
+            if not k.startswith("_") and k not in self.names:
+                raise ValidationException(f"Unexpected key {k}")
+
 class Model(Validator, ABC):
     def __init__(self, d=None, **kvars):
-        self.model()
         if d is not None:
             self.load(d)
         elif kvars:
             self.load(kvars)
+        else:
+            # An empty model holds the validators of its fields
+            self.model()
 
     @abstractmethod
     def model(self):
         pass
 
-    def as_dict(self):
-        result = {}
-        for k, v in vars(self).items():
-            if k.startswith("_"):
-                continue
-
-            """
-            try:
-                result[k] = v.as_dict()
-            except Exception:
-                if isinstance(v, (list, tuple)):
-
-                result[k] = v
-            """
-            result[k] = as_dict(v)
+    @classmethod
+    def schema(cls):
+        """
+        Returns the `Schema` of the model class.
+        """
+        try:
+            return cls.__dict__["_schema"]
+        except KeyError:
+            schema = cls._schema = Schema(cls)
+            return schema
+
+    @classmethod
+    def trusted(cls, d=None, **kvars):
+        """
+        Constructs the model of the locally produced fields (the same as the
+        constructor) without validating them. The fields are kept as they
+        are, so the nested models can be given as the plain dicts and lists,
+        which the codecs serialize directly.
+
+        Never use it for the received data.
+        """
+        model = cls.__new__(cls)
+        model.__dict__.update(d if d is not None else kvars)
+        return model
 
-        return result
+    def as_dict(self):
+        return self.schema().serialize(self.__dict__)
 
     def load(self, data):
-        for k, v in vars(self).items():
-            if k.startswith("_"):
-                continue
+        schema = self.schema()
+        if len(data) > len(schema.validators):
+            schema.check_keys(data)
 
-            if k not in data:
-                raise ValidationException(f"Expected key {k}")
-        
-        for k, v in data.items():
-            if k.startswith("_"):
-                continue
-            # getattr(self, k)(v)
-            setattr(self, k, getattr(self, k)(v))
+        fields = self.__dict__
+        for name, validate in schema.validators:
+            try:
+                value = data[name]
+            except KeyError:
+                raise ValidationException(f"Expected key {name}") from None
+            fields[name] = validate(value)
         
         return self
 
@@ -0,0 +1,51 @@
+"""
+Batching of the outgoing messages: the messages queued for a connection
+within a single tick are sent together, in a single frame.
+"""
+
+def add(batch, message):
+    """
+    Appends the message to the batch (a list), coalescing it with the
+    messages at the batch's end (see `Message.coalesce`).
+    """
+    while batch:
+        coalesced = message.coalesce(batch[-1])
+        if coalesced is None:
+            break
+        batch.pop()
+        message = coalesced
+
+    batch.append(message)
+
+class FrameEncoder:
+    """
+    Encodes the batches of many connections: every message is encoded once
+    per encoding (`Codec.piece_name`) and every identical batch is joined
+    into a frame once per codec, so e.g. broadcast messages are shared.
+
+    Meant to be used for a single tick, the messages are identified by their
+    `id`, so they have to be kept alive for the encoder's lifetime.
+    """
+    def __init__(self):
+        self.pieces = {}
+        self.frames = {}
+
+    def frame(self, codec, batch):
+        """
+        Returns the frame of the batch of messages encoded by the codec.
+        """
+        key = (codec.name, tuple(id(m) for m in batch))
+        frame = self.frames.get(key)
+        if frame is not None:
+            return frame
+
+        pieces = []
+        for message in batch:
+            piece_key = (codec.piece_name, id(message))
+            piece = self.pieces.get(piece_key)
+            if piece is None:
+                piece = self.pieces[piece_key] = codec.encode_piece(message)
+            pieces.append(piece)
+
+        frame = self.frames[key] = codec.join(pieces)
+        return frame
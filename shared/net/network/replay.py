@@ -0,0 +1,54 @@
+"""
+Replaying of the frames lost when a connection drops, so the session can be
+resumed on a new connection.
+
+Both sides number the frames of a session from 1, in the order they're sent
+(which is the order they're received in, over a websocket), so the frames
+themselves don't have to carry the numbers: the side resuming a session
+tells how many frames it has received, and the other one sends it the rest.
+"""
+
+from collections import deque
+
+class ReplayBuffer:
+    """
+    The last frames sent over a session, at most `limit` of them and at most
+    `max_bytes` of their data in total.
+
+    `sent` is the number of the frames sent so far, the sequence number of
+    the last one.
+    """
+    def __init__(self, limit=1024, max_bytes=16 << 20):
+        self.limit = limit
+        self.max_bytes = max_bytes
+
+        self.frames = deque()
+        self.sent = 0
+        self.bytes = 0
+
+    def add(self, frame):
+        """
+        Numbers the frame, which is about to be sent.
+        """
+        self.sent += 1
+        self.frames.append(frame)
+        self.bytes += len(frame)
+
+        while self.frames and (len(self.frames) > self.limit or self.bytes > self.max_bytes):
+            self.bytes -= len(self.frames.popleft())
+
+    def since(self, received):
+        """
+        Returns the list of the frames following the first `received` ones,
+        or None when some of them aren't kept anymore (or `received` is more
+        than was sent), so the session can't be resumed.
+        """
+        missed = self.sent - received
+        if missed < 0 or missed > len(self.frames):
+            return None
+        return list(self.frames)[len(self.frames) - missed:]
+
+    def clear(self):
+        self.frames.clear()
+        self.sent = 0
+        self.bytes = 0
@@ -0,0 +1,112 @@
+"""
+Correlation of the requests with their responses.
+
+A request is sent with a correlation id (see `Message.correlation`) and the
+other side responds with a message carrying the same one, so many requests
+can be in flight at once and each is answered by its own response. The
+client numbers its requests with the odd ids and the server with the even
+ones, so the requests of both sides never get mistaken for the responses.
+"""
+
+import asyncio
+import concurrent.futures
+from time import perf_counter
+
+from shared.stats import Stats
+
+CLIENT = 1
+SERVER = 2
+
+def correlate(message, correlation):
+    """
+    Sets the correlation id of the message. The id is kept by the message
+    object itself, so a request or a response has to be built for that
+    single purpose and never broadcast or sent again: raises `ValueError`
+    for a message which has an id already.
+    """
+    if message.correlation is not None:
+        raise ValueError(f"{message!r} already has a correlation id")
+    message.correlation = correlation
+
+class RequestStats:
+    """
+    Measurements of the requests, shared by all of the connections.
+    """
+    def __init__(self):
+        # Time from sending a request to receiving its response, in seconds
+        self.latency = Stats()
+        # Requests left without a response when their session ended
+        self.failed = 0
+
+    def report(self):
+        """
+        Returns a human readable summary of the measurements.
+        """
+        return "\n".join([
+            f"request latency: {self.latency}",
+            f"failed requests: {self.failed}",
+        ])
+
+class Requests:
+    """
+    The requests of a single session waiting for their responses.
+
+    The futures of the requests are completed where the bound callbacks
+    would be called: with `threaded=True` they're `concurrent.futures`
+    futures, completed when the messages are processed on the main thread,
+    otherwise they're futures of the running event loop.
+    """
+    def __init__(self, side, threaded=True, stats=None):
+        self.next_id = side
+        self.threaded = threaded
+        self.stats = stats if stats is not None else RequestStats()
+        # (future, start time) by the correlation id
+        self.pending = {}
+
+    def start(self, message):
+        """
+        Assigns the message a correlation id (see `correlate`), returns the
+        future of its response. Must be called right before sending the
+        message.
+        """
+        if self.threaded:
+            future = concurrent.futures.Future()
+        else:
+            future = asyncio.get_event_loop().create_future()
+
+        correlate(message, self.next_id)
+        self.next_id += 2
+        self.pending[message.correlation] = (future, perf_counter())
+        return future
+
+    def complete(self, message):
+        """
+        Completes the request the message responds to. Returns False when it
+        isn't a response to a pending request.
+        """
+        correlation = getattr(message, "correlation", None)
+        if correlation is None:
+            return False
+
+        entry = self.pending.pop(correlation, None)
+        if entry is None:
+            return False
+
+        future, start = entry
+        self.stats.latency.add(perf_counter() - start)
+        if not future.done():
+            future.set_result(message)
+        return True
+
+    def fail(self, exception):
+        """
+        Fails every pending request, when the session has ended.
+        """
+        pending, self.pending = self.pending, {}
+        for future, _ in pending.values():
+            self.stats.failed += 1
+            if not future.done():
+                future.set_exception(exception)
+
+    def __len__(self):
+        return len(self.pending)
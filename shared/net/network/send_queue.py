@@ -0,0 +1,170 @@
+from collections import deque
+from threading import Lock
+import asyncio
+
+from shared.stats import Stats
+
+"""
+Policies of a full `SendQueue`:
+- `COALESCE`: the item is coalesced with the last queued one when possible
+  (see `Message.coalesce`), the sender of the frames should also hold the
+  messages back and coalesce them until the queue isn't full,
+- `DROP_OLDEST`: the oldest non-critical item is dropped,
+- `DISCONNECT`: the item is refused, the connection should be closed.
+"""
+COALESCE = "coalesce"
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+POLICIES = (COALESCE, DROP_OLDEST, DISCONNECT)
+
+class QueueStats:
+    """
+    Measurements of the send queues, shared by all of the connections.
+    """
+    def __init__(self):
+        # Depth of the queue, sampled on every put
+        self.depth = Stats()
+        # Items dropped by the `DROP_OLDEST` policy
+        self.dropped = 0
+        # Items coalesced with the previous ones by the `COALESCE` policy
+        self.coalesced = 0
+        # Items refused, because nothing could be dropped
+        self.refused = 0
+
+    def report(self):
+        """
+        Returns a human readable summary of the measurements.
+        """
+        return "\n".join([
+            f"queue depth: {self.depth}",
+            f"dropped: {self.dropped}, coalesced: {self.coalesced}, "
+            f"refused: {self.refused}",
+        ])
+
+class SendQueue:
+    """
+    Queue of the outgoing data of a single connection.
+
+    It can be filled from any thread, while the connection's sender task
+    (running on the connection's event loop) waits for the data without
+    polling: the first `put` after the queue got drained wakes it up with
+    `loop.call_soon_threadsafe`, and the sender takes everything queued
+    until then at once.
+
+    With a `limit` the queue holds at most that many items, what happens
+    to the items put into a full queue is decided by the `policy`.
+    """
+    def __init__(self, loop=None, limit=None, policy=COALESCE, stats=None):
+        self.items = deque()
+        self.critical = deque()
+        self.loop = None
+        self.ready = None
+        self._wakeup_scheduled = False
+
+        self.limit = limit
+        self.policy = policy
+        self.stats = stats if stats is not None else QueueStats()
+        self.lock = Lock()
+
+        if loop is not None:
+            self.bind(loop)
+
+    def bind(self, loop):
+        """
+        Binds the queue to the event loop of its sender. Anything put before
+        is kept.
+        """
+        self.loop = loop
+        self.ready = asyncio.Event()
+        if self.items:
+            self.ready.set()
+
+    def full(self):
+        return self.limit is not None and len(self.items) >= self.limit
+
+    def put(self, data, critical=True):
+        """
+        Queues the data, `critical` data is never dropped.
+
+        Returns False when the queue is full and the data was refused, the
+        connection should be closed then.
+        """
+        with self.lock:
+            if self.full():
+                accepted = self._overflow(data, critical)
+            else:
+                self._append(data, critical)
+                accepted = True
+
+        if accepted and self.loop is not None and not self._wakeup_scheduled:
+            self._wakeup_scheduled = True
+            self.loop.call_soon_threadsafe(self._wakeup)
+        return accepted
+
+    def _append(self, data, critical):
+        self.items.append(data)
+        self.critical.append(critical)
+        self.stats.depth.add(len(self.items))
+
+    def _overflow(self, data, critical):
+        """
+        Applies the policy to the data put into the full queue. Returns False
+        when the data was refused.
+        """
+        if self.policy == COALESCE:
+            coalesce = getattr(data, "coalesce", None)
+            coalesced = coalesce(self.items[-1]) if coalesce is not None else None
+            if coalesced is not None:
+                self.items[-1] = coalesced
+                self.critical[-1] = critical or self.critical[-1]
+                self.stats.coalesced += 1
+                return True
+
+        elif self.policy == DROP_OLDEST:
+            for i, item_critical in enumerate(self.critical):
+                if not item_critical:
+                    del self.items[i]
+                    del self.critical[i]
+                    self.stats.dropped += 1
+                    self._append(data, critical)
+                    return True
+
+            if not critical:
+                # Newer than anything queued, but just as droppable
+                self.stats.dropped += 1
+                return True
+
+        self.stats.refused += 1
+        return False
+
+    def _wakeup(self):
+        self._wakeup_scheduled = False
+        self.ready.set()
+
+    async def get_all(self):
+        """
+        Waits until there is anything in the queue and returns a list of all
+        of the queued items, emptying the queue.
+        """
+        while not self.items:
+            self.ready.clear()
+            if self.items:
+                break
+            await self.ready.wait()
+
+        with self.lock:
+            items = list(self.items)
+            self.items.clear()
+            self.critical.clear()
+        return items
+
+    def clear(self):
+        """
+        Drops everything queued.
+        """
+        with self.lock:
+            self.items.clear()
+            self.critical.clear()
+
+    def __len__(self):
+        return len(self.items)
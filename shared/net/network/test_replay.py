@@ -0,0 +1,31 @@
+from .replay import ReplayBuffer
+import unittest
+
+class TestReplayBuffer(unittest.TestCase):
+    def test_since(self):
+        buffer = ReplayBuffer()
+        for frame in (b"a", b"b", b"c"):
+            buffer.add(frame)
+
+        self.assertEqual(buffer.sent, 3)
+        self.assertEqual(buffer.since(3), [])
+        self.assertEqual(buffer.since(1), [b"b", b"c"])
+        self.assertEqual(buffer.since(0), [b"a", b"b", b"c"])
+        self.assertIsNone(buffer.since(4))
+
+    def test_limit(self):
+        buffer = ReplayBuffer(limit=2)
+        for frame in (b"a", b"b", b"c"):
+            buffer.add(frame)
+
+        self.assertEqual(buffer.since(1), [b"b", b"c"])
+        # The first frame isn't kept anymore
+        self.assertIsNone(buffer.since(0))
+
+    def test_max_bytes(self):
+        buffer = ReplayBuffer(max_bytes=10)
+        buffer.add(b"12345")
+        buffer.add(b"123456")
+        self.assertEqual(buffer.since(1), [b"123456"])
+        self.assertIsNone(buffer.since(0))
+        self.assertEqual(buffer.bytes, 6)
@@ -0,0 +1,79 @@
+from .requests import CLIENT, SERVER, Requests, correlate
+from ..cave_world_protocol import actor
+import asyncio
+import unittest
+
+def turn_request():
+    return actor.TurnRequest(action={"type": "wait", "dx": 0, "dy": 0})
+
+def response(request):
+    message = actor.TurnResult(success=True, error=None)
+    message.correlation = request.correlation
+    return message
+
+class TestRequests(unittest.TestCase):
+    def test_complete(self):
+        requests = Requests(CLIENT)
+        first, second = turn_request(), turn_request()
+        first_future = requests.start(first)
+        second_future = requests.start(second)
+        self.assertEqual((first.correlation, second.correlation), (1, 3))
+        self.assertEqual(len(requests), 2)
+
+        # Answered in any order
+        self.assertTrue(requests.complete(response(second)))
+        self.assertFalse(first_future.done())
+        self.assertTrue(second_future.done())
+
+        result = response(first)
+        self.assertTrue(requests.complete(result))
+        self.assertIs(first_future.result(), result)
+        self.assertEqual(len(requests), 0)
+        self.assertEqual(requests.stats.latency.count, 2)
+
+        # Not a response, or answered already
+        self.assertFalse(requests.complete(actor.TurnResult(success=True, error=None)))
+        self.assertFalse(requests.complete(result))
+
+    def test_sides(self):
+        client, server = Requests(CLIENT), Requests(SERVER)
+        request = turn_request()
+        client.start(request)
+
+        # The server's own requests are numbered differently
+        server.start(turn_request())
+        self.assertFalse(server.complete(request))
+        self.assertTrue(client.complete(response(request)))
+
+    def test_fail(self):
+        requests = Requests(CLIENT)
+        future = requests.start(turn_request())
+        requests.fail(ConnectionError("Disconnected"))
+
+        with self.assertRaises(ConnectionError):
+            future.result()
+        self.assertEqual(requests.stats.failed, 1)
+        self.assertEqual(len(requests), 0)
+
+    def test_event_loop(self):
+        async def test():
+            requests = Requests(CLIENT, threaded=False)
+            request = turn_request()
+            future = requests.start(request)
+            asyncio.get_event_loop().call_soon(requests.complete, response(request))
+            result = await future
+            self.assertEqual(result.correlation, request.correlation)
+
+        asyncio.run(test())
+
+    def test_correlated_once(self):
+        requests = Requests(CLIENT)
+        request = turn_request()
+        requests.start(request)
+
+        # Sending it again would leak the id into another request
+        with self.assertRaises(ValueError):
+            requests.start(request)
+        with self.assertRaises(ValueError):
+            correlate(request, 8)
+        self.assertEqual(request.correlation, 1)
@@ -0,0 +1,108 @@
+from .send_queue import COALESCE, DISCONNECT, DROP_OLDEST, QueueStats, SendQueue
+from threading import Thread
+import asyncio
+import unittest
+
+class Item:
+    """
+    Item coalescing with the previous one when both are even.
+    """
+    def __init__(self, value):
+        self.value = value
+
+    def coalesce(self, previous):
+        if self.value % 2 == 0 and previous.value % 2 == 0:
+            return Item(previous.value + self.value)
+        return None
+
+class TestSendQueue(unittest.TestCase):
+    def test_drains_everything(self):
+        async def test():
+            queue = SendQueue(asyncio.get_running_loop())
+            for i in range(5):
+                queue.put(i)
+
+            self.assertEqual(await queue.get_all(), [0, 1, 2, 3, 4])
+            self.assertEqual(len(queue), 0)
+
+        asyncio.run(test())
+
+    def test_put_before_bind(self):
+        async def test():
+            queue = SendQueue()
+            queue.put("early")
+            queue.bind(asyncio.get_running_loop())
+
+            self.assertEqual(await asyncio.wait_for(queue.get_all(), 1), ["early"])
+
+        asyncio.run(test())
+
+    def test_wakeup_from_thread(self):
+        async def test():
+            queue = SendQueue(asyncio.get_running_loop())
+            received = []
+
+            def produce():
+                for i in range(1000):
+                    queue.put(i)
+
+            getter = asyncio.ensure_future(queue.get_all())
+            await asyncio.sleep(0)
+            self.assertFalse(getter.done())
+
+            thread = Thread(target=produce)
+            thread.start()
+
+            received += await asyncio.wait_for(getter, 1)
+            while len(received) < 1000:
+                received += await asyncio.wait_for(queue.get_all(), 1)
+            thread.join()
+
+            self.assertEqual(received, list(range(1000)))
+
+        asyncio.run(test())
+
+    def test_disconnect(self):
+        stats = QueueStats()
+        queue = SendQueue(limit=2, policy=DISCONNECT, stats=stats)
+        self.assertTrue(queue.put(0))
+        self.assertTrue(queue.put(1, critical=False))
+        self.assertTrue(queue.full())
+        self.assertFalse(queue.put(2, critical=False))
+
+        self.assertEqual(list(queue.items), [0, 1])
+        self.assertEqual(stats.refused, 1)
+        self.assertEqual(stats.depth.max, 2)
+
+    def test_drop_oldest(self):
+        stats = QueueStats()
+        queue = SendQueue(limit=3, policy=DROP_OLDEST, stats=stats)
+        queue.put("a")
+        queue.put("b", critical=False)
+        queue.put("c", critical=False)
+        self.assertTrue(queue.put("d"))
+        self.assertTrue(queue.put("e", critical=False))
+        self.assertEqual(list(queue.items), ["a", "d", "e"])
+
+        queue.put("f")
+        # Only critical items left, a non-critical one can still be dropped
+        self.assertTrue(queue.put("g", critical=False))
+        self.assertEqual(list(queue.items), ["a", "d", "f"])
+        self.assertFalse(queue.put("h"))
+
+        self.assertEqual(stats.dropped, 4)
+        self.assertEqual(stats.refused, 1)
+
+    def test_coalesce(self):
+        stats = QueueStats()
+        queue = SendQueue(limit=2, policy=COALESCE, stats=stats)
+        queue.put(Item(1))
+        queue.put(Item(2), critical=False)
+        self.assertTrue(queue.put(Item(4)))
+        self.assertEqual([i.value for i in queue.items], [1, 6])
+        # Critical, because one of the coalesced items is
+        self.assertEqual(list(queue.critical), [True, True])
+
+        self.assertFalse(queue.put(Item(3)))
+        self.assertEqual(stats.coalesced, 1)
+        self.assertEqual(stats.refused, 1)
@@ -6,7 +6,31 @@ class Message(Model, ABC):
     A single unit of information to be sent over to the other side.
     When loaded from a 'raw' dict object, the underlying types are validated.
     """
-    
+
+    """
+    Whether the message can't be dropped when the connection can't keep up
+    with the sent messages.
+    """
+    critical = True
+
+    """
+    Correlation id of the request, or of the request the message responds to
+    (see `shared.net.network.requests`), None for the other messages. It's
+    sent along with the message, not as one of its fields.
+    """
+    correlation = None
+
+    def coalesce(self, previous):
+        """
+        Called when the message is going to be sent right after the `previous`
+        one, in the same batch. Returns the message to be sent instead of both
+        of them, or None when both have to be sent.
+
+        Must not modify either of the messages, they can be shared by many
+        batches.
+        """
+        return None
+
 class Protocol:
     """
     Protocol class provides the functionality of wrapping and unwrapping
@@ -0,0 +1,264 @@
+from .codec import BinaryCodec, CompressionStats, DEFLATE, JsonCodec, ZLIB, \
+    ZlibCodec, codec_for, subprotocols, websocket_compression
+from .model import ValidationException
+from .cave_world_protocol import actor, client, world
+from .cave_world_protocol.protocol import CaveWorldProtocol
+import unittest
+import zlib
+
+def sensation(traits, x, y):
+    return {"traits": traits, "x": x, "y": y}
+
+def prepare_turn_request():
+    return actor.PrepareTurnRequest(actor={
+        "type": "caveman",
+        "x": 3,
+        "y": -4,
+        "senses": {
+            "sight": [
+                sensation(["fruit", "red", "small"], 4, -4),
+                sensation(["fruit", "red", "big"], 2, -3),
+            ],
+            "hearing": [],
+            "smell": [sensation(["fruit"], 4, -4)],
+        },
+        "condition": {
+            "hunger": 12.5,
+            "thirst": 0.0,
+            "temperature": 36.6,
+            "health": 100.0,
+        },
+    })
+
+def data_response():
+    return world.DataResponse(
+        width=2,
+        height=2,
+        tiles=[
+            [
+                {"type": 0, "z": 1.5, "object": None},
+                {"type": 1, "z": -2.0, "object": {"repr": "stone"}},
+            ],
+            [
+                {"type": 2, "z": 0.25, "object": {"repr": "stone"}},
+                {"type": 0, "z": 0.0, "object": None},
+            ],
+        ]
+    )
+
+def messages():
+    return [
+        actor.ActorRequest(type="caveman"),
+        prepare_turn_request(),
+        actor.TurnRequest(action={"type": "move", "dx": -1, "dy": 1}),
+        actor.TurnResult(success=False, error="Can't move there"),
+        actor.TurnResult(success=True, error=None),
+        client.Introduction(name="Zażółć"),
+        world.DataRequest({}),
+        data_response(),
+    ]
+
+class TestCodec(unittest.TestCase):
+    def test_round_trip(self):
+        for codec in (JsonCodec(CaveWorldProtocol()), BinaryCodec(CaveWorldProtocol())):
+            for message in messages():
+                decoded = codec.decode(codec.encode(message))
+                self.assertIs(decoded.__class__, message.__class__)
+                self.assertDictEqual(decoded.as_dict(), message.as_dict())
+
+    def test_frame_types(self):
+        message = prepare_turn_request()
+        self.assertIsInstance(JsonCodec(CaveWorldProtocol()).encode(message), str)
+        self.assertIsInstance(BinaryCodec(CaveWorldProtocol()).encode(message), bytes)
+
+    def test_interned_strings(self):
+        data = BinaryCodec(CaveWorldProtocol()).encode(prepare_turn_request())
+        self.assertEqual(data.count(b"fruit"), 1)
+        self.assertEqual(data.count(b"red"), 1)
+
+    def test_smaller(self):
+        protocol = CaveWorldProtocol()
+        for message in (prepare_turn_request(), data_response()):
+            self.assertLess(
+                len(BinaryCodec(protocol).encode(message)),
+                len(JsonCodec(protocol).encode(message).encode())
+            )
+
+    def test_malformed(self):
+        codec = BinaryCodec(CaveWorldProtocol())
+        data = codec.encode(prepare_turn_request())
+
+        with self.assertRaises(ValidationException):
+            codec.decode(data[:-3])
+        with self.assertRaises(ValidationException):
+            codec.decode(b"\xff\xff")
+        with self.assertRaises(ValidationException):
+            codec.decode(data.decode("latin-1"))
+
+    def test_truncated(self):
+        codec = BinaryCodec(CaveWorldProtocol())
+        for message in (prepare_turn_request(), data_response()):
+            data = codec.encode(message)
+            for length in range(len(data)):
+                with self.assertRaises(ValidationException):
+                    codec.decode(data[:length])
+
+    def test_many_strings(self):
+        # The indices past 127 take more than a byte
+        traits = [f"trait{i}" for i in range(300)]
+        message = actor.PrepareTurnRequest(actor={
+            "type": "caveman",
+            "x": 0,
+            "y": 0,
+            "senses": {
+                "sight": [sensation(traits[i:i + 3], i, -i) for i in range(0, 300, 3)],
+                "hearing": [sensation([], 0, 0)],
+                "smell": [sensation(traits[::-1], 1, 1)],
+            },
+            "condition": {
+                "hunger": 0.0, "thirst": 0.0, "temperature": 0.0, "health": 0.0
+            },
+        })
+        codec = BinaryCodec(CaveWorldProtocol())
+        decoded = codec.decode(codec.encode(message))
+        self.assertDictEqual(decoded.as_dict(), message.as_dict())
+
+    def test_out_of_range(self):
+        codec = BinaryCodec(CaveWorldProtocol())
+        message = actor.TurnRequest(action={"type": "move", "dx": 1 << 40, "dy": 0})
+        with self.assertRaises(ValidationException):
+            codec.encode(message)
+
+    def test_negotiation(self):
+        protocol = CaveWorldProtocol()
+        self.assertIsInstance(codec_for(BinaryCodec.name, protocol), BinaryCodec)
+        self.assertIsInstance(codec_for(JsonCodec.name, protocol), JsonCodec)
+        self.assertIsInstance(codec_for(None, protocol), JsonCodec)
+
+    def test_batch(self):
+        for codec in (JsonCodec(CaveWorldProtocol()), BinaryCodec(CaveWorldProtocol())):
+            frame = codec.join([codec.encode_piece(m) for m in messages()])
+            decoded = codec.decode_all(frame)
+            self.assertEqual(
+                [m.as_dict() for m in decoded],
+                [m.as_dict() for m in messages()]
+            )
+
+            single = codec.encode(prepare_turn_request())
+            self.assertEqual(codec.join([single]), single)
+            self.assertEqual(len(codec.decode_all(single)), 1)
+
+        codec = BinaryCodec(CaveWorldProtocol())
+        frame = codec.join([codec.encode_piece(m) for m in messages()])
+        with self.assertRaises(ValidationException):
+            codec.decode_all(frame[:-4])
+
+    def test_trusted(self):
+        for codec in (JsonCodec(CaveWorldProtocol()), BinaryCodec(CaveWorldProtocol())):
+            for message in messages():
+                trusted = message.__class__.trusted(message.as_dict())
+                self.assertEqual(codec.encode(trusted), codec.encode(message))
+
+    def test_correlation(self):
+        for codec in (JsonCodec(CaveWorldProtocol()), BinaryCodec(CaveWorldProtocol())):
+            correlated = prepare_turn_request()
+            correlated.correlation = 300
+
+            decoded = codec.decode(codec.encode(correlated))
+            self.assertEqual(decoded.correlation, 300)
+            self.assertEqual(decoded.as_dict(), correlated.as_dict())
+            self.assertIsNone(codec.decode(codec.encode(prepare_turn_request())).correlation)
+
+            frame = codec.join([codec.encode_piece(m) for m in (correlated, data_response())])
+            self.assertEqual([m.correlation for m in codec.decode_all(frame)], [300, None])
+
+        codec = JsonCodec(CaveWorldProtocol())
+        with self.assertRaises(ValidationException):
+            codec.decode('{"id": 0, "message": {"type": "caveman"}, "correlation": "1"}')
+
+    def test_correlated_batch(self):
+        codec = BinaryCodec(CaveWorldProtocol())
+        correlated = actor.TurnResult(success=True, error=None)
+        correlated.correlation = 5
+        batch = [prepare_turn_request(), correlated, data_response()]
+
+        frame = codec.join([codec.encode_piece(m) for m in batch])
+        self.assertEqual(codec.HEADER.unpack_from(frame)[0], BinaryCodec.BATCH)
+        decoded = codec.decode_all(frame)
+        self.assertEqual([m.correlation for m in decoded], [None, 5, None])
+        self.assertEqual([m.as_dict() for m in decoded], [m.as_dict() for m in batch])
+
+        # Cut inside the correlated piece
+        piece = codec.encode_piece(correlated)
+        with self.assertRaises(ValidationException):
+            codec.decode(piece[:3])
+
+    def test_subprotocols(self):
+        self.assertEqual(subprotocols(ZLIB), [
+            "caveworld.binary+zlib", "caveworld.binary",
+            "caveworld.json+zlib", "caveworld.json",
+        ])
+        self.assertEqual(subprotocols(DEFLATE), ["caveworld.binary", "caveworld.json"])
+        self.assertEqual(subprotocols(None), ["caveworld.binary", "caveworld.json"])
+
+        # The server offers permessage-deflate to the clients requesting it
+        self.assertEqual(websocket_compression(ZLIB, server=True), "deflate")
+        self.assertIsNone(websocket_compression(None, server=True))
+        self.assertIsNone(websocket_compression(ZLIB))
+        self.assertEqual(websocket_compression(DEFLATE), "deflate")
+
+        codec = codec_for("caveworld.json+zlib", CaveWorldProtocol())
+        self.assertIsInstance(codec, ZlibCodec)
+        self.assertIsInstance(codec.codec, JsonCodec)
+        self.assertEqual(codec.name, "caveworld.json+zlib")
+
+class TestZlibCodec(unittest.TestCase):
+    def test_round_trip(self):
+        protocol = CaveWorldProtocol()
+        for inner in (JsonCodec(protocol), BinaryCodec(protocol)):
+            for threshold in (0, 1 << 20):
+                codec = ZlibCodec(inner, threshold)
+                for message in messages():
+                    decoded = codec.decode(codec.encode(message))
+                    self.assertDictEqual(decoded.as_dict(), message.as_dict())
+
+    def test_batch(self):
+        protocol = CaveWorldProtocol()
+        for inner in (JsonCodec(protocol), BinaryCodec(protocol)):
+            codec = ZlibCodec(inner, 100)
+            frame = codec.join([codec.encode_piece(m) for m in messages()])
+            self.assertEqual(frame[0], ZlibCodec.COMPRESSED)
+            self.assertEqual(len(codec.decode_all(frame)), len(messages()))
+
+    def test_threshold(self):
+        protocol = CaveWorldProtocol()
+        stats = CompressionStats()
+        small = actor.TurnResult(success=True, error=None)
+        big = data_response()
+
+        json = ZlibCodec(JsonCodec(protocol), 200, stats=stats)
+        self.assertEqual(json.encode(small), JsonCodec(protocol).encode(small))
+        self.assertIsInstance(json.encode(big), bytes)
+
+        binary = ZlibCodec(BinaryCodec(protocol), 200, stats=stats)
+        self.assertEqual(binary.encode(small), b"\x00" + BinaryCodec(protocol).encode(small))
+
+        self.assertEqual(stats.skipped, 2)
+        self.assertEqual(stats.compress.count, 1)
+        self.assertLess(stats.compressed_bytes, stats.original_bytes)
+        self.assertLess(stats.ratio.mean, 1.0)
+
+    def test_malformed(self):
+        codec = ZlibCodec(BinaryCodec(CaveWorldProtocol()), 0)
+        with self.assertRaises(ValidationException):
+            codec.decode(b"")
+        with self.assertRaises(ValidationException):
+            codec.decode(b"\x07abc")
+        with self.assertRaises(ValidationException):
+            codec.decode(b"\x01not zlib")
+
+    def test_too_big(self):
+        codec = ZlibCodec(JsonCodec(CaveWorldProtocol()), 0)
+        codec.MAX_SIZE = 1000
+        with self.assertRaises(ValidationException):
+            codec.decode(b"\x01" + zlib.compress(b" " * 10000))
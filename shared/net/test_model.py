@@ -234,4 +234,135 @@ class ValidatorTestCase(unittest.TestCase):
 
         with self.assertRaises(ValidationException):
             Option(Type(int))(1.0)
-            Option(Type(str))(1.0)
\ No newline at end of file
+            Option(Type(str))(1.0)
+
+    def test_enum(self):
+        self.assertEqual(
+            Enum("a", "b")("a"),
+            "a"
+        )
+
+        with self.assertRaises(ValidationException):
+            Enum("a", "b")("c")
+
+    def test_bytes(self):
+        self.assertEqual(
+            Bytes()(b"\x00\xff"),
+            b"\x00\xff"
+        )
+
+        self.assertEqual(
+            Bytes()("AP8="),
+            b"\x00\xff"
+        )
+
+        with self.assertRaises(ValidationException):
+            Bytes()("not base64!")
+
+        with self.assertRaises(ValidationException):
+            Bytes()([0, 255])
+
+    def test_schema(self):
+        class A(Model):
+            def model(self):
+                self.a = Type(int)
+                self.b = Option(List(Enum("x", "y")))
+
+        schema = A.schema()
+        self.assertIs(A.schema(), schema)
+        self.assertEqual([name for name, _ in schema.fields], ["a", "b"])
+
+        a = A(a=1, b=["x"])
+        self.assertEqual(list(vars(a)), ["a", "b"])
+        self.assertIsInstance(A().a, Type)
+
+        with self.assertRaises(ValidationException):
+            A(a=1, b=["z"])
+        with self.assertRaises(ValidationException):
+            A(a=1, b=None, c=2)
+
+    def test_schema_per_class(self):
+        class A(Model):
+            def model(self):
+                self.a = Type(int)
+
+        class B(A):
+            def model(self):
+                super().model()
+                self.b = Type(str)
+
+        A.schema()
+        self.assertEqual([name for name, _ in B.schema().fields], ["a", "b"])
+        self.assertEqual(B(a=1, b="one").as_dict(), {"a": 1, "b": "one"})
+
+    def test_compiled(self):
+        class A(Model):
+            def model(self):
+                self.value = Type(int)
+
+        validators = [
+            Any(), Type(int), Type(A), List(int), List(Type(A)), Option(Type(str)),
+            AnyOf(Type(int), Type(str)), Enum("a", "b"), Bytes(),
+        ]
+        values = [1, "a", 1.5, None, [1, 2], [{"value": 1}], {"value": 2}, b"\x00"]
+        for validator in validators:
+            validate = validator.compile()
+            for value in values:
+                try:
+                    expected = validator(value)
+                except ValidationException:
+                    with self.assertRaises(ValidationException):
+                        validate(value)
+                    continue
+
+                self.assertEqual(as_dict(validate(value)), as_dict(expected))
+
+    def test_trusted(self):
+        class A(Model):
+            def model(self):
+                self.value = Type(int)
+
+        class B(Model):
+            def model(self):
+                self.a = Type(A)
+                self.list = List(List(A))
+
+        d = {"a": {"value": 1}, "list": [[{"value": 2}], []]}
+        b = B.trusted(d)
+        self.assertIs(b.a, d["a"])
+        self.assertDictEqual(b.as_dict(), B(d).as_dict())
+
+        # Nothing is validated
+        self.assertEqual(A.trusted(value="one").value, "one")
+
+    def test_as_dict(self):
+        class A(Model):
+            def model(self):
+                self.value = Type(int)
+
+        class B(Model):
+            def model(self):
+                self.a = Type(A)
+                self.list = List(Option(Type(A)))
+                self.names = List(str)
+                self.any = Any()
+
+        d = {
+            "a": {"value": 1},
+            "list": [None, {"value": 2}],
+            "names": ["one"],
+            "any": {"nested": [A(value=3)]},
+        }
+        b = B(d)
+        result = b.as_dict()
+        self.assertDictEqual(result, {
+            "a": {"value": 1},
+            "list": [None, {"value": 2}],
+            "names": ["one"],
+            "any": {"nested": [{"value": 3}]},
+        })
+        self.assertIsNot(result["names"], b.names)
+        self.assertDictEqual(B.trusted(d).as_dict(), result)
+
+        # An empty model is serialized into its validators
+        self.assertIsInstance(B().as_dict()["a"], Type)
@@ -0,0 +1,94 @@
+"""
+Columnar representation of the world, sent in `world.PackedDataResponse`.
+
+Instead of a dict per tile, the tile types and heights are packed into byte
+arrays, which the client decodes straight into numpy arrays, and only the
+tiles with an object are listed.
+"""
+
+from array import array
+import sys
+
+import numpy as np
+
+from shared.net.model import ValidationException
+
+def pack_world(world):
+    """
+    Returns the fields of a `world.PackedDataResponse` of the world (any
+    object with `w`, `h` and `data` indexed `[x][y]`, like `shared.world.World`).
+    """
+    return pack_region(world, 0, 0, world.w, world.h)
+
+def pack_region(world, x0, y0, width, height):
+    """
+    Returns the packed `width` x `height` rectangle of the world's tiles at
+    `x0`, `y0` (the fields of a `world.Chunk`, but its position, see
+    `pack_world`), with the objects' positions relative to the rectangle.
+    """
+    types = bytearray(width * height)
+    heights = array("f", bytes(4 * width * height))
+    objects = []
+
+    i = 0
+    for x in range(width):
+        column = world.data[x0 + x]
+        for y in range(height):
+            tile = column[y0 + y]
+            types[i] = tile.type
+            heights[i] = tile.z
+            i += 1
+
+            if tile.object is not None:
+                objects.append({
+                    "x": x,
+                    "y": y,
+                    "repr": tile.object.representation()
+                })
+
+    if sys.byteorder != "little":
+        heights.byteswap()
+
+    return {
+        "width": width,
+        "height": height,
+        "types": bytes(types),
+        "heights": heights.tobytes(),
+        "objects": objects
+    }
+
+class PackedWorld:
+    """
+    Decoded `world.PackedDataResponse`: `types` (uint8) and `heights`
+    (float32) are arrays of shape `(w, h)`, `objects` is a list of
+    `(x, y, representation)`.
+    """
+    def __init__(self, w, h, types, heights, objects):
+        self.w = w
+        self.h = h
+        self.types = types
+        self.heights = heights
+        self.objects = objects
+
+    @staticmethod
+    def from_message(message):
+        w, h = message.width, message.height
+        if w < 0 or h < 0:
+            raise ValidationException(f"Invalid world size {w}x{h}")
+        if len(message.types) != w * h or len(message.heights) != 4 * w * h:
+            raise ValidationException(
+                f"Packed tiles don't match the world size {w}x{h}"
+            )
+
+        objects = []
+        for o in message.objects:
+            if not (0 <= o.x < w and 0 <= o.y < h):
+                raise ValidationException(f"Object outside of the world at {o.x}, {o.y}")
+            objects.append((o.x, o.y, o.repr))
+
+        return PackedWorld(
+            w, h,
+            np.frombuffer(message.types, dtype=np.uint8).reshape(w, h),
+            np.frombuffer(message.heights, dtype="<f4").reshape(w, h),
+            objects
+        )
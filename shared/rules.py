@@ -0,0 +1,81 @@
+"""
+Rules of the world which are shared between the server, which enforces them,
+and the clients, which can use them to plan their actions.
+
+Nothing in here depends on the graphics, so it can be used by headless code.
+"""
+
+"""
+Offsets of the tiles an actor can reach in a single step.
+"""
+DIRECTIONS = (
+    (-1, -1), (0, -1), (1, -1),
+    (-1,  0),          (1,  0),
+    (-1,  1), (0,  1), (1,  1)
+)
+
+"""
+Bit of the direction in the movement tables, keyed by `(dx, dy)`
+"""
+DIRECTION_BITS = {
+    direction: 1 << i for i, direction in enumerate(DIRECTIONS)
+}
+
+"""
+Whether a tile of the given type (used as an index) can be walked on.
+"""
+WALKABLE_TILES = (True, True, True)
+
+"""
+The biggest height difference an actor can climb (or jump down) in one step.
+"""
+MAX_CLIMB = 2.0
+
+def is_walkable(tile_type):
+    """
+    Returns True when the tile type can be walked on, unknown types are not.
+    """
+    return 0 <= tile_type < len(WALKABLE_TILES) and WALKABLE_TILES[tile_type]
+
+def can_step(z_from, z_to):
+    """
+    Returns True when the height difference between two neighbouring tiles
+    is small enough to step over.
+    """
+    return abs(z_to - z_from) <= MAX_CLIMB
+
+def movement_tables(world):
+    """
+    Precomputes for every tile of the world the bitmask of directions (bits
+    as in `DIRECTION_BITS`) which lead to a tile inside of the world
+    (`neighbours`) and which can also be walked to (`moves`), regardless of
+    the objects.
+
+    Returns `(moves, neighbours)`, both are bytearrays indexed by
+    `x * world.h + y`.
+    """
+    w, h = world.w, world.h
+    data = world.data
+
+    moves = bytearray(w * h)
+    neighbours = bytearray(w * h)
+
+    for x in range(w):
+        for y in range(h):
+            tile = data[x][y]
+            tile_moves = 0
+            tile_neighbours = 0
+            for (dx, dy), bit in DIRECTION_BITS.items():
+                nx, ny = x + dx, y + dy
+                if nx < 0 or nx >= w or ny < 0 or ny >= h:
+                    continue
+
+                tile_neighbours |= bit
+                other = data[nx][ny]
+                if is_walkable(other.type) and can_step(tile.z, other.z):
+                    tile_moves |= bit
+
+            moves[x * h + y] = tile_moves
+            neighbours[x * h + y] = tile_neighbours
+
+    return moves, neighbours
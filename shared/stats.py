@@ -0,0 +1,77 @@
+"""
+Lightweight running statistics used to measure the cost of various
+operations (action execution, network traffic, etc.) without keeping every
+single sample around.
+"""
+
+from contextlib import contextmanager
+from time import perf_counter
+
+class Stats:
+    """
+    Running summary of the measured samples: their count, sum, minimum and
+    maximum value.
+
+    Example:
+    ```
+    latency = Stats()
+    with latency.time():
+        do_work()
+    print(latency)
+    ```
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, value):
+        """
+        Records a single sample.
+        """
+        self.count += 1
+        self.total += value
+        self.last = value
+
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @contextmanager
+    def time(self):
+        """
+        Measures the wall time (in seconds) of the `with` block and records
+        it as a sample.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(perf_counter() - start)
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def reset(self):
+        self.__init__()
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max
+        }
+
+    def __repr__(self):
+        if self.count == 0:
+            return "Stats(empty)"
+        return f"Stats(count={self.count}, mean={self.mean:.6f}, " \
+            f"min={self.min:.6f}, max={self.max:.6f})"
@@ -0,0 +1,72 @@
+from shared.net.codec import BinaryCodec, JsonCodec
+from shared.net.cave_world_protocol.protocol import CaveWorldProtocol
+from shared.net.cave_world_protocol.world import PackedDataResponse
+from shared.net.model import ValidationException
+from shared.packing import PackedWorld, pack_world
+import unittest
+
+class Object:
+    def __init__(self, representation):
+        self._representation = representation
+
+    def representation(self):
+        return self._representation
+
+class Tile:
+    def __init__(self, type, z, object=None):
+        self.type = type
+        self.z = z
+        self.object = object
+
+class World:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.data = [
+            [Tile((x + y) % 3, float(x - 2*y)) for y in range(h)]
+            for x in range(w)
+        ]
+
+class TestPacking(unittest.TestCase):
+    def world(self):
+        world = World(3, 5)
+        world.data[1][4].object = Object("stone")
+        world.data[2][0].object = Object("fruit_red")
+        world.data[0][1].z = -0.5
+        return world
+
+    def check(self, world, packed):
+        self.assertEqual((packed.w, packed.h), (world.w, world.h))
+        self.assertEqual(packed.types.shape, (world.w, world.h))
+        for x in range(world.w):
+            for y in range(world.h):
+                self.assertEqual(packed.types[x, y], world.data[x][y].type)
+                self.assertEqual(packed.heights[x, y], world.data[x][y].z)
+
+        self.assertEqual(
+            sorted(packed.objects),
+            [(1, 4, "stone"), (2, 0, "fruit_red")]
+        )
+
+    def test_round_trip(self):
+        world = self.world()
+        message = PackedDataResponse(version=0, **pack_world(world))
+        self.check(world, PackedWorld.from_message(message))
+
+    def test_codecs(self):
+        world = self.world()
+        message = PackedDataResponse(version=0, **pack_world(world))
+        for codec in (JsonCodec(CaveWorldProtocol()), BinaryCodec(CaveWorldProtocol())):
+            decoded = codec.decode(codec.encode(message))
+            self.check(world, PackedWorld.from_message(decoded))
+
+    def test_invalid(self):
+        fields = pack_world(self.world())
+        fields["height"] = 4
+        with self.assertRaises(ValidationException):
+            PackedWorld.from_message(PackedDataResponse(version=0, **fields))
+
+        fields = pack_world(self.world())
+        fields["objects"].append({"x": 3, "y": 0, "repr": "stone"})
+        with self.assertRaises(ValidationException):
+            PackedWorld.from_message(PackedDataResponse(version=0, **fields))